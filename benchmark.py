@@ -0,0 +1,291 @@
+"""
+This module serves for benchmarking of SeznamEmail flows
+
+Results are stored into archive/benchmark_<timestamp>.json and compared with baseline.
+Flows verified by local IMAP stand-in are labelled and excluded from comparison.
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from typing import Dict, List, Optional
+
+BASEDIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASEDIR, "tests"))
+
+from helpers.browser_pool import BrowserPool
+from helpers.email_manipulation import EmailInputs, SeznamEmail
+from helpers.har_network import DEFAULT_HAR_FILE, NETWORK_MODES, REPLAY, HarNetwork
+from helpers.imap_stand_in import ImapStandIn, verification_backend_for
+from helpers.instrumentation import FLOW, StepRecorder, percentile
+from helpers.launch_profile import LaunchProfile
+
+ARCHIVE_DIR = os.path.join(BASEDIR, "archive")
+DEFAULT_EMAIL_CONTEXT = os.path.join(BASEDIR, "input_files", "email_context.json")
+COMPARED_STATISTICS = ("p50", "p95")
+VERIFICATIONS = ("ui", "imap", "stand-in")
+# with stand-in these flows measure local IMAP round-trip, not the webmail
+STAND_IN_FLOWS = ("check_last_received_email",)
+
+
+def parse_arguments() -> argparse.Namespace:
+    """
+    Function to parse command line arguments
+
+    :return: parsed arguments
+    """
+    parser = argparse.ArgumentParser(description="Benchmark SeznamEmail flows")
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--network-mode", choices=NETWORK_MODES, default="replay")
+    parser.add_argument("--har-file", default=DEFAULT_HAR_FILE)
+    parser.add_argument(
+        "--verification",
+        choices=VERIFICATIONS,
+        default=None,
+        help="check received emails in UI, over IMAP or in local IMAP stand-in "
+        "which gets every sent email delivered by the benchmark, "
+        "default is stand-in for replay and ui otherwise",
+    )
+    parser.add_argument("--imap-host", default="imap.seznam.cz")
+    parser.add_argument("--credential", default="testing_email")
+    parser.add_argument("--email-context", default=DEFAULT_EMAIL_CONTEXT)
+    parser.add_argument(
+        "--baseline",
+        default=None,
+        help='path to archived benchmark or "latest" for the newest one',
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=10.0,
+        help="allowed slowdown against baseline in percent",
+    )
+    parser.add_argument(
+        "--launch-profile",
+        type=LaunchProfile.parse,
+        default=os.environ.get("SEZNAM_LAUNCH_PROFILE", "firefox:headless"),
+        help='browser as "engine[:headless|headed][:slow_mo]", '
+        "engine is chromium, firefox or webkit",
+    )
+    parser.add_argument(
+        "--headed", action="store_true", help="show browser of --launch-profile"
+    )
+    arguments = parser.parse_args()
+    if arguments.headed:
+        arguments.launch_profile.headless = False
+    if arguments.verification is None:
+        arguments.verification = (
+            "stand-in" if arguments.network_mode == REPLAY else "ui"
+        )
+    if arguments.network_mode == REPLAY and arguments.verification == "ui":
+        parser.error(
+            "replayed HAR archive never shows new email, "
+            "use --verification stand-in or imap"
+        )
+    return arguments
+
+
+def run_iterations(arguments: argparse.Namespace, recorder: StepRecorder) -> float:
+    """
+    Function to run login, send, verify and logout flows repeatedly
+
+    :param arguments: parsed command line arguments
+    :param recorder: recorder collecting latency of flows
+    :return: number of seconds spent by all iterations
+    """
+    credentials = EmailInputs.get_email_login(arguments.credential)
+    email_context = EmailInputs.load_email_context(arguments.email_context)
+    if credentials is None or email_context is None:
+        raise SystemExit("Invalid credential or email context")
+    email, password = credentials
+    subject, message, attachment, receiver_email = email_context
+    pool = BrowserPool.from_launch_profile(arguments.launch_profile)
+    network = HarNetwork(arguments.network_mode, arguments.har_file)
+    stand_in = (
+        ImapStandIn(username=None).start()
+        if arguments.verification == "stand-in"
+        else None
+    )
+    started = time.perf_counter()
+    try:
+        for _ in range(arguments.iterations):
+            testing_email = SeznamEmail(
+                pool,
+                network=network,
+                recorder=recorder,
+                verification_backend=verification_backend_for(
+                    arguments.verification, arguments.imap_host, stand_in
+                ),
+            )
+            try:
+                testing_email.login(email, password)
+                testing_email.check_successful_login()
+                sent, _ = testing_email.send_email(
+                    receiver_email, subject, message, attachment
+                )
+                if sent and stand_in is not None:
+                    stand_in.deliver(
+                        receiver_email, receiver_email, subject, message, attachment
+                    )
+                testing_email.check_last_received_email(
+                    receiver_email, subject, message, attachment
+                )
+                testing_email.logout()
+                testing_email.check_successful_logout()
+            finally:
+                testing_email.clear()
+    finally:
+        pool.close()
+        if stand_in is not None:
+            stand_in.stop()
+    return time.perf_counter() - started
+
+
+def flow_results(
+    recorder: StepRecorder, elapsed: float, verification: str = "ui"
+) -> Dict[str, dict]:
+    """
+    Function to compute throughput and latency percentiles per flow
+
+    :param recorder: recorder with collected flows
+    :param elapsed: number of seconds spent by all iterations
+    :param verification: "ui", "imap" or "stand-in", labels verifying flows
+    :return: dictionary keyed by flow name
+    """
+    durations: Dict[str, List[float]] = {}
+    failures: Dict[str, int] = {}
+    for record in recorder.records:
+        if record.kind != FLOW:
+            continue
+        durations.setdefault(record.name, []).append(record.duration)
+        failures[record.name] = failures.get(record.name, 0) + (
+            record.outcome != "pass"
+        )
+    return {
+        name: {
+            "count": len(values),
+            "failures": failures[name],
+            "throughput_per_minute": round(len(values) / elapsed * 60, 3),
+            "p50": round(percentile(values, 0.50), 4),
+            "p95": round(percentile(values, 0.95), 4),
+            "max": round(max(values), 4),
+            "stand_in": verification == "stand-in" and name in STAND_IN_FLOWS,
+        }
+        for name, values in durations.items()
+    }
+
+
+def find_baseline(baseline: str, current_path: str) -> Optional[str]:
+    """
+    Function to resolve baseline argument into path of archived benchmark
+
+    :param baseline: path to archived benchmark or "latest"
+    :param current_path: path of benchmark stored by this run
+    :return: path to baseline, None when no baseline exists
+    """
+    if baseline != "latest":
+        return baseline
+    archived = sorted(
+        (
+            path
+            for path in glob.glob(os.path.join(ARCHIVE_DIR, "benchmark_*.json"))
+            if os.path.abspath(path) != os.path.abspath(current_path)
+        ),
+        key=os.path.getmtime,
+    )
+    return archived[-1] if archived else None
+
+
+def compare(
+    current: Dict[str, dict], baseline: Dict[str, dict], threshold: float
+) -> List[str]:
+    """
+    Function to find flows which fail more often than in baseline, are slower
+    than baseline more than threshold or did not run at all,
+    flows verified by IMAP stand-in are not compared
+
+    :param current: flow results of this run
+    :param baseline: flow results of baseline run
+    :param threshold: allowed slowdown in percent
+    :return: list of regression descriptions, empty when there is no regression
+    """
+    regressions = [
+        f"{name} missing: {reference['count']} runs in baseline, none now"
+        for name, reference in sorted(baseline.items())
+        if name not in current
+    ]
+    for name, result in sorted(current.items()):
+        reference = baseline.get(name)
+        if reference is None:
+            continue
+        if result.get("stand_in") or reference.get("stand_in"):
+            continue
+        # failing flow often ends early, so it would look faster
+        failure_rate = result["failures"] / result["count"]
+        reference_failure_rate = reference["failures"] / max(reference["count"], 1)
+        if failure_rate > reference_failure_rate:
+            regressions.append(
+                f"{name} failures: {reference['failures']}/{reference['count']} -> "
+                f"{result['failures']}/{result['count']}"
+            )
+        for statistic in COMPARED_STATISTICS:
+            limit = reference[statistic] * (1 + threshold / 100)
+            if reference[statistic] > 0 and result[statistic] > limit:
+                change = (result[statistic] / reference[statistic] - 1) * 100
+                regressions.append(
+                    f"{name} {statistic}: {reference[statistic]:.3f}s -> "
+                    f"{result[statistic]:.3f}s (+{change:.1f} %)"
+                )
+    return regressions
+
+
+def main() -> None:
+    """
+    Function to run benchmark, store it into archive and compare it with baseline
+
+    :return:
+    """
+    arguments = parse_arguments()
+    recorder = StepRecorder()
+    elapsed = run_iterations(arguments, recorder)
+    results = {
+        "created": time.time(),
+        "iterations": arguments.iterations,
+        "network_mode": arguments.network_mode,
+        "verification": arguments.verification,
+        "launch_profile": arguments.launch_profile.name,
+        "elapsed": round(elapsed, 3),
+        "flows": flow_results(recorder, elapsed, arguments.verification),
+        "steps": recorder.summary(),
+    }
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    path = os.path.join(ARCHIVE_DIR, f"benchmark_{results['created']}.json")
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(results, file, indent=2)
+    for name, result in sorted(results["flows"].items()):
+        print(
+            f"{name}: {result['throughput_per_minute']}/min "
+            f"p50={result['p50']}s p95={result['p95']}s max={result['max']}s "
+            f"failures={result['failures']}"
+            + (" (local IMAP stand-in, not compared)" if result["stand_in"] else "")
+        )
+    print(f"Stored into {path}")
+    if arguments.baseline is None:
+        return
+    baseline_path = find_baseline(arguments.baseline, path)
+    if baseline_path is None:
+        print("No baseline available")
+        return
+    with open(baseline_path, encoding="utf-8") as file:
+        baseline = json.load(file)
+    regressions = compare(results["flows"], baseline["flows"], arguments.threshold)
+    for regression in regressions:
+        print(f"Regression: {regression}")
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
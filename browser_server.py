@@ -0,0 +1,133 @@
+"""
+This module serves for running long-lived browser server which tests connect to
+
+    python browser_server.py start     # runs in foreground until Ctrl+C
+    python browser_server.py status
+    python browser_server.py stop
+
+While the server runs, BrowserPool connects to its browser instead of launching
+a new one, SEZNAM_BROWSER_SERVER=off makes tests launch their own browser anyway.
+"""
+import argparse
+import os
+import sys
+
+BASEDIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASEDIR, "tests"))
+
+from helpers.browser_server import (
+    DEFAULT_PORT,
+    DEFAULT_STATE_FILE,
+    BrowserServer,
+    port_open,
+    read_state,
+    request_stop,
+)
+
+
+def parse_arguments() -> argparse.Namespace:
+    """
+    Function to parse command line arguments
+
+    :return: parsed arguments
+    """
+    parser = argparse.ArgumentParser(description="Run long-lived browser server")
+    parser.add_argument("command", choices=("start", "status", "stop"))
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--state-file", default=DEFAULT_STATE_FILE)
+    parser.add_argument(
+        "--health-interval",
+        type=float,
+        default=2.0,
+        help="number of seconds between health checks",
+    )
+    parser.add_argument(
+        "--no-reuse-browser",
+        action="store_true",
+        help="launch new browser for every connection instead of keeping one running",
+    )
+    return parser.parse_args()
+
+
+def start(arguments: argparse.Namespace) -> int:
+    """
+    Function to start server and supervise it until interrupted
+
+    :param arguments: parsed command line arguments
+    :return: exit code
+    """
+    if read_state(arguments.state_file) is not None:
+        print("Browser server is already running")
+        return 1
+    server = BrowserServer(
+        arguments.port,
+        arguments.host,
+        arguments.state_file,
+        reuse_browser=not arguments.no_reuse_browser,
+    )
+    try:
+        if not server.start():
+            print("Browser server did not start")
+            return 1
+        print(f"Browser server listens on {server.ws_endpoint}")
+        server.supervise(arguments.health_interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+        print(f"Browser server stopped after {server.restarts} restarts")
+    return 0
+
+
+def status(arguments: argparse.Namespace) -> int:
+    """
+    Function to print state of running server
+
+    :param arguments: parsed command line arguments
+    :return: 0 - server is healthy, 1 - otherwise
+    """
+    state = read_state(arguments.state_file)
+    if state is None:
+        print("Browser server is not running")
+        return 1
+    healthy = port_open(state["host"], state["port"])
+    print(
+        f"Browser server {state['ws_endpoint']} supervised by pid {state['pid']} "
+        f"is {'healthy' if healthy else 'not responding'}"
+    )
+    return 0 if healthy else 1
+
+
+def stop(arguments: argparse.Namespace) -> int:
+    """
+    Function to stop running server
+
+    :param arguments: parsed command line arguments
+    :return: exit code
+    """
+    state = read_state(arguments.state_file)
+    if state is None:
+        print("Browser server is not running")
+        return 1
+    # stop file instead of signal, so supervisor stops the server on Windows too
+    if not request_stop(arguments.state_file):
+        print(f"Browser server supervised by pid {state['pid']} did not stop in time")
+        return 1
+    print(f"Browser server supervised by pid {state['pid']} stopped")
+    return 0
+
+
+def main() -> None:
+    """
+    Function to run the requested command
+
+    :return:
+    """
+    arguments = parse_arguments()
+    commands = {"start": start, "status": status, "stop": stop}
+    sys.exit(commands[arguments.command](arguments))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,7 @@
+import os
 import time
 
+from helpers.browser_pool import BrowserPool
 from helpers.email_manipulation import EmailInputs, SeznamEmail
 
 
@@ -9,7 +11,9 @@ def main():
     testing_email = SeznamEmail()
     testing_email.login(email, password)
     login_result = testing_email.check_successful_login()
-    email_contex_path = "D:/PYTHON/PROJECTS/PlayWright/input_files/email_context.json"
+    email_contex_path = os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "input_files/email_context.json"
+    )
     subject, message, attachment, receiver_email = EmailInputs.load_email_context(email_contex_path)
     print(login_result)
     testing_email.send_email(receiver_email, subject, message, attachment)
@@ -20,6 +24,7 @@ def main():
     print(logout_result)
     time.sleep(1)
     testing_email.clear()
+    BrowserPool.shared().close()
 
 
 if __name__ == "__main__":
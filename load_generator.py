@@ -0,0 +1,369 @@
+"""
+This module serves for generating load by many concurrent simulated users
+
+Every user repeats login, check_successful_login, send_email,
+check_last_received_email and logout on its own AsyncSeznamEmail,
+iterations are started at target rate shared by all users.
+Results are stored into archive/load_<timestamp>.json.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import Dict, List
+
+BASEDIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASEDIR, "tests"))
+
+from helpers.async_email_manipulation import AsyncSeznamEmail
+from helpers.browser_pool import AsyncBrowserPool
+from helpers.email_manipulation import EmailInputs
+from helpers.har_network import DEFAULT_HAR_FILE, NETWORK_MODES, REPLAY, HarNetwork
+from helpers.imap_stand_in import ImapStandIn, verification_backend_for
+from helpers.instrumentation import FLOW, StepRecorder, percentile
+from helpers.resource_monitor import ResourceMonitor
+
+ARCHIVE_DIR = os.path.join(BASEDIR, "archive")
+DEFAULT_EMAIL_CONTEXT = os.path.join(BASEDIR, "input_files", "email_context.json")
+PHASES = (
+    "login",
+    "check_successful_login",
+    "send_email",
+    "check_last_received_email",
+    "logout",
+)
+
+
+def parse_arguments() -> argparse.Namespace:
+    """
+    Function to parse command line arguments
+
+    :return: parsed arguments
+    """
+    parser = argparse.ArgumentParser(description="Generate load of SeznamEmail flows")
+    parser.add_argument("--users", type=int, default=5, help="concurrent users")
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=1.0,
+        help="target number of started iterations per second for all users",
+    )
+    parser.add_argument(
+        "--duration", type=float, default=60.0, help="number of seconds of load"
+    )
+    parser.add_argument(
+        "--window", type=float, default=10.0, help="seconds per reported time window"
+    )
+    parser.add_argument(
+        "--credentials",
+        default=os.environ.get("SEZNAM_CREDENTIAL_POOL", "testing_email"),
+        help="comma separated credential names, users take them round-robin",
+    )
+    parser.add_argument("--email-context", default=DEFAULT_EMAIL_CONTEXT)
+    parser.add_argument("--network-mode", choices=NETWORK_MODES, default="replay")
+    parser.add_argument("--har-file", default=DEFAULT_HAR_FILE)
+    parser.add_argument(
+        "--verification",
+        choices=("ui", "imap", "stand-in"),
+        default=None,
+        help="check received emails in UI, over IMAP or in local IMAP stand-in "
+        "which gets every sent email delivered by the generator, "
+        "default is stand-in for replay and ui otherwise",
+    )
+    parser.add_argument("--imap-host", default="imap.seznam.cz")
+    parser.add_argument(
+        "--subjects",
+        choices=("unique", "same"),
+        default=None,
+        help="unique - user and iteration appended to subject, "
+        "same - subject of --email-context, needs one account per user "
+        "unless every user has its own IMAP stand-in, "
+        "default is same for replay, which needs recorded subject, "
+        "and unique otherwise",
+    )
+    parser.add_argument(
+        "--recycle-flows",
+        type=int,
+        default=200,
+        help="number of flows after which context of user is recycled, 0 - never",
+    )
+    parser.add_argument(
+        "--recycle-rss-mb",
+        type=int,
+        default=0,
+        help="RSS of browser processes which triggers recycling (needs psutil)",
+    )
+    parser.add_argument(
+        "--recycle-heap-mb",
+        type=int,
+        default=512,
+        help="JS heap of page which triggers recycling (Chromium only)",
+    )
+    parser.add_argument("--max-browsers", type=int, default=1)
+    parser.add_argument("--headed", action="store_true")
+    arguments = parser.parse_args()
+    if arguments.verification is None:
+        arguments.verification = (
+            "stand-in" if arguments.network_mode == REPLAY else "ui"
+        )
+    if arguments.network_mode == REPLAY and arguments.verification == "ui":
+        parser.error(
+            "replayed HAR archive never shows new email, "
+            "use --verification stand-in or imap"
+        )
+    if arguments.subjects is None:
+        arguments.subjects = "same" if arguments.network_mode == REPLAY else "unique"
+    accounts = {name.strip() for name in arguments.credentials.split(",")} - {""}
+    # users sharing mailbox could verify email sent by each other
+    if (
+        arguments.subjects == "same"
+        and arguments.verification != "stand-in"
+        and arguments.users > len(accounts)
+    ):
+        parser.error(
+            f"{arguments.users} users share {len(accounts)} accounts by --credentials, "
+            "use --subjects unique or one account per user"
+        )
+    return arguments
+
+
+class RateLimiter:
+    """
+    Start times of iterations spread evenly by target rate
+    """
+
+    def __init__(self, rate: float, end: float):
+        """
+        :param rate: number of iterations per second
+        :param end: monotonic time after which no iteration is started
+        """
+        self._interval: float = 1 / rate if rate > 0 else 0.0
+        self._next: float = time.monotonic()
+        self._end: float = end
+
+    async def acquire(self) -> bool:
+        """
+        Method used for waiting for start of next iteration
+
+        :return: True - iteration may start, False - load duration is over
+        """
+        slot = max(self._next, time.monotonic())
+        if slot >= self._end:
+            return False
+        self._next = slot + self._interval
+        await asyncio.sleep(slot - time.monotonic())
+        return True
+
+
+async def run_user(
+    user: int,
+    arguments: argparse.Namespace,
+    pool: AsyncBrowserPool,
+    network: HarNetwork,
+    recorder: StepRecorder,
+    limiter: RateLimiter,
+) -> int:
+    """
+    Function to repeat iterations of one simulated user until duration is over,
+    --verification stand-in gives every user its own local IMAP server
+
+    :param user: index of user
+    :param arguments: parsed command line arguments
+    :param pool: pool shared by all users
+    :param network: live network, HAR recording or HAR replay
+    :param recorder: recorder collecting latency of flows
+    :param limiter: limiter shared by all users
+    :return: number of started iterations
+    """
+    names = [name.strip() for name in arguments.credentials.split(",") if name.strip()]
+    credentials = EmailInputs.get_email_login(names[user % len(names)])
+    email_context = EmailInputs.load_email_context(arguments.email_context)
+    if credentials is None or email_context is None:
+        raise SystemExit("Invalid credential or email context")
+    email, password = credentials
+    subject, message, attachment, receiver_email = email_context
+    stand_in = (
+        ImapStandIn(username=None).start()
+        if arguments.verification == "stand-in"
+        else None
+    )
+    testing_email = await AsyncSeznamEmail.create(
+        pool,
+        network=network,
+        recorder=recorder,
+        verification_backend=verification_backend_for(
+            arguments.verification, arguments.imap_host, stand_in
+        ),
+        resource_monitor=ResourceMonitor(
+            arguments.recycle_flows,
+            arguments.recycle_rss_mb,
+            arguments.recycle_heap_mb,
+            recorder=recorder,
+        ),
+    )
+    iterations = 0
+    try:
+        while await limiter.acquire():
+            iteration_subject = (
+                f"{subject} [{user}-{iterations}]"
+                if arguments.subjects == "unique"
+                else subject
+            )
+            iterations += 1
+            if not (await testing_email.login(email, password))[0]:
+                continue
+            if not (await testing_email.check_successful_login())[0]:
+                continue
+            sent, _ = await testing_email.send_email(
+                receiver_email, iteration_subject, message, attachment
+            )
+            if sent and stand_in is not None:
+                stand_in.deliver(
+                    receiver_email,
+                    receiver_email,
+                    iteration_subject,
+                    message,
+                    attachment,
+                )
+            if sent:
+                await testing_email.check_last_received_email(
+                    receiver_email, iteration_subject, message, attachment
+                )
+            await testing_email.logout()
+    finally:
+        await testing_email.clear()
+        if stand_in is not None:
+            stand_in.stop()
+    return iterations
+
+
+async def run_load(arguments: argparse.Namespace, recorder: StepRecorder) -> float:
+    """
+    Function to run all simulated users concurrently
+
+    :param arguments: parsed command line arguments
+    :param recorder: recorder collecting latency of flows
+    :return: number of seconds spent by the load
+    """
+    pool = AsyncBrowserPool(
+        max_browsers=arguments.max_browsers,
+        launch_options={"headless": not arguments.headed},
+    )
+    network = HarNetwork(arguments.network_mode, arguments.har_file)
+    started = time.monotonic()
+    limiter = RateLimiter(arguments.rate, started + arguments.duration)
+    try:
+        await asyncio.gather(
+            *(
+                run_user(user, arguments, pool, network, recorder, limiter)
+                for user in range(max(1, arguments.users))
+            )
+        )
+    finally:
+        await pool.close()
+    return time.monotonic() - started
+
+
+def phase_results(recorder: StepRecorder, elapsed: float) -> Dict[str, dict]:
+    """
+    Function to compute throughput, error rate and latency percentiles per phase
+
+    :param recorder: recorder with collected flows
+    :param elapsed: number of seconds spent by the load
+    :return: dictionary keyed by phase name
+    """
+    results = {}
+    for phase in PHASES:
+        records = [
+            record
+            for record in recorder.records
+            if record.kind == FLOW and record.name == phase
+        ]
+        durations = [record.duration for record in records]
+        errors = sum(1 for record in records if record.outcome != "pass")
+        results[phase] = {
+            "count": len(records),
+            "errors": errors,
+            "error_rate": round(errors / len(records), 4) if records else 0.0,
+            "throughput_per_minute": round(len(records) / elapsed * 60, 3),
+            "p50": round(percentile(durations, 0.50), 4),
+            "p95": round(percentile(durations, 0.95), 4),
+            "p99": round(percentile(durations, 0.99), 4),
+            "max": round(max(durations, default=0.0), 4),
+        }
+    return results
+
+
+def window_results(recorder: StepRecorder, started: float, window: float) -> List[dict]:
+    """
+    Function to compute completed iterations and errors per time window,
+    iteration is completed by passed logout
+
+    :param recorder: recorder with collected flows
+    :param started: wall clock time when load started
+    :param window: number of seconds per window
+    :return: list of windows ordered by time
+    """
+    windows: Dict[int, dict] = {}
+    for record in recorder.records:
+        if record.kind != FLOW or record.name not in PHASES:
+            continue
+        index = int(max(0.0, record.started + record.duration - started) // window)
+        counters = windows.setdefault(
+            index, {"start": index * window, "finished": 0, "errors": 0}
+        )
+        counters["finished"] += record.name == "logout" and record.outcome == "pass"
+        counters["errors"] += record.outcome != "pass"
+    return [windows[index] for index in sorted(windows)]
+
+
+def main() -> None:
+    """
+    Function to run load, print its results and store them into archive
+
+    :return:
+    """
+    arguments = parse_arguments()
+    recorder = StepRecorder()
+    started = time.time()
+    elapsed = asyncio.run(run_load(arguments, recorder))
+    phases = phase_results(recorder, elapsed)
+    windows = window_results(recorder, started, arguments.window)
+    finished = phases["logout"]["count"] - phases["logout"]["errors"]
+    results = {
+        "created": started,
+        "users": arguments.users,
+        "target_rate_per_second": arguments.rate,
+        "achieved_rate_per_second": round(finished / elapsed, 4) if elapsed else 0.0,
+        "network_mode": arguments.network_mode,
+        "verification": arguments.verification,
+        "elapsed": round(elapsed, 3),
+        "phases": phases,
+        "windows": windows,
+    }
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    path = os.path.join(ARCHIVE_DIR, f"load_{started}.json")
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(results, file, indent=2)
+    print(
+        f"{arguments.users} users, target {arguments.rate}/s, "
+        f"achieved {results['achieved_rate_per_second']}/s"
+    )
+    for name, result in phases.items():
+        print(
+            f"{name}: {result['throughput_per_minute']}/min "
+            f"p50={result['p50']}s p95={result['p95']}s p99={result['p99']}s "
+            f"errors={result['errors']} ({result['error_rate'] * 100:.1f} %)"
+        )
+    for window in windows:
+        print(
+            f"{window['start']:>7.0f}s: {window['finished']} iterations, "
+            f"{window['errors']} errors"
+        )
+    print(f"Stored into {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,246 @@
 """
 This module serves for running pytest
 """
+import argparse
 import os
+import subprocess
+import sys
+from typing import List
 
 import pytest
 
-BASEDIR = os.path.dirname(__file__)
+BASEDIR = os.path.dirname(os.path.abspath(__file__))
+TESTS_DIR = os.path.join(BASEDIR, "tests")
+sys.path.insert(0, TESTS_DIR)
+
+from helpers.launch_profile import DEFAULT_LAUNCH_PROFILE, LaunchProfile
+from helpers.report_renderer import EngineComparison
+
+TEST_FILE = os.path.join(TESTS_DIR, "step_definitions/test_email.py")
+NETWORK_MODES = ("live", "record", "replay")
+REPORT_MODES = ("full", "compact")
+PROFILE_MODES = ("fresh", "persistent")
+MATRIX_DIR = os.path.join(BASEDIR, "reports", "matrix")
+
+
+def parse_matrix(text: str) -> List[LaunchProfile]:
+    """
+    Function to parse launch profiles of matrix mode
+
+    :param text: comma separated launch profiles
+    :return: list of LaunchProfile, ValueError is raised for invalid profile
+    """
+    return [LaunchProfile.parse(item) for item in text.split(",") if item.strip()]
+
+
+def parse_arguments() -> argparse.Namespace:
+    """
+    Function to parse command line arguments
+
+    :return: parsed arguments
+    """
+    parser = argparse.ArgumentParser(description="Run pytest-BDD email scenarios")
+    parser.add_argument(
+        "--network-mode",
+        choices=NETWORK_MODES,
+        default="live",
+        help="live network, recording of HAR archive or replay of HAR archive",
+    )
+    parser.add_argument(
+        "--har-file",
+        default=None,
+        help="HAR archive used for recording or replay",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="number of worker processes which scenarios are sharded across",
+    )
+    parser.add_argument(
+        "--credentials",
+        default=os.environ.get("SEZNAM_CREDENTIAL_POOL", ""),
+        help="comma separated credential names assigned to workers",
+    )
+    parser.add_argument(
+        "--report",
+        choices=REPORT_MODES,
+        default="full",
+        help="full - self-contained HTML reports besides streamed results, "
+        "compact - only streamed results.jsonl and paginated compact report",
+    )
+    parser.add_argument(
+        "--launch-profile",
+        type=LaunchProfile.parse,
+        default=os.environ.get("SEZNAM_LAUNCH_PROFILE", DEFAULT_LAUNCH_PROFILE),
+        help='browser as "engine[:headless|headed][:slow_mo]", '
+        "engine is chromium, firefox or webkit",
+    )
+    parser.add_argument(
+        "--matrix",
+        type=parse_matrix,
+        default=[],
+        help="comma separated launch profiles run in parallel and compared, "
+        "e.g. chromium:headless,firefox:headless,webkit:headless",
+    )
+    parser.add_argument(
+        "--profile-mode",
+        choices=PROFILE_MODES,
+        default="fresh",
+        help="fresh - new browser context per session, "
+        "persistent - browser profile per account with disk cache kept between runs",
+    )
+    return parser.parse_args()
+
+
+def network_arguments(arguments: argparse.Namespace) -> List[str]:
+    """
+    Function to translate network and profile options into pytest arguments
+
+    :param arguments: parsed command line arguments
+    :return: list of pytest arguments
+    """
+    pytest_arguments = [
+        "--network-mode=" + arguments.network_mode,
+        "--profile-mode=" + arguments.profile_mode,
+    ]
+    if arguments.har_file:
+        pytest_arguments.append("--har-file=" + arguments.har_file)
+    return pytest_arguments
+
+
+def report_arguments(report_mode: str, report_dir: str) -> List[str]:
+    """
+    Function to translate report mode into pytest arguments
+
+    :param report_mode: "full" or "compact"
+    :param report_dir: folder where reports of the run are written
+    :return: list of pytest arguments
+    """
+    pytest_arguments = [
+        "--results-file=" + os.path.join(report_dir, "results.jsonl"),
+        "--compact-report-dir=" + os.path.join(report_dir, "compact"),
+    ]
+    if report_mode == "compact":
+        return pytest_arguments + ["-p", "no:html", "-p", "no:reporter"]
+    return pytest_arguments + [
+        "--html=" + os.path.join(report_dir, "report_v1.html"),
+        "--html-report=" + os.path.join(report_dir, "report_v2.html"),
+        "--self-contained-html",
+    ]
+
+
+def run_matrix(
+    arguments: argparse.Namespace, extra_arguments: List[str], environment: dict
+) -> int:
+    """
+    Function to run all scenarios once per launch profile in parallel processes
+    and write comparison of their step latency
+
+    :param arguments: parsed command line arguments
+    :param extra_arguments: pytest arguments passed to every run
+    :param environment: environment variables of the runs
+    :return: the highest return code of the runs
+    """
+    accounts = [
+        name.strip() for name in arguments.credentials.split(",") if name.strip()
+    ]
+    # parallel runs of one account would collide in mailbox checks
+    parallel = max(1, min(len(arguments.matrix), len(accounts)))
+    if parallel < len(arguments.matrix):
+        print(
+            f"Warning: {len(accounts)} accounts configured by --credentials for "
+            f"{len(arguments.matrix)} launch profiles, running {parallel} at a time"
+        )
+    return_codes = []
+    for first in range(0, len(arguments.matrix), parallel):
+        processes = []
+        for index, profile in enumerate(arguments.matrix[first : first + parallel]):
+            run_environment = dict(environment)
+            run_environment["SEZNAM_LAUNCH_PROFILE"] = profile.name
+            if accounts:
+                run_environment["SEZNAM_CREDENTIAL_POOL"] = accounts[index]
+            command = [
+                sys.executable,
+                "-m",
+                "pytest",
+                TEST_FILE,
+                "--verbose",
+                *report_arguments(
+                    arguments.report, os.path.join(MATRIX_DIR, profile.slug)
+                ),
+                *extra_arguments,
+                "--launch-profile=" + profile.name,
+            ]
+            processes.append(
+                subprocess.Popen(command, cwd=TESTS_DIR, env=run_environment)
+            )
+        return_codes.extend(process.wait() for process in processes)
+    comparison = EngineComparison(MATRIX_DIR)
+    for profile in arguments.matrix:
+        comparison.add_run(
+            profile.name, os.path.join(MATRIX_DIR, profile.slug, "results.jsonl")
+        )
+    print(comparison.write())
+    return max(return_codes)
+
+
+def collect_scenarios() -> List[str]:
+    """
+    Function to collect node ids of all scenarios
+
+    :return: list of node ids relative to tests directory
+    """
+    collected = subprocess.run(
+        [sys.executable, "-m", "pytest", TEST_FILE, "--collect-only", "-q"],
+        cwd=TESTS_DIR,
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    return [line for line in collected.stdout.splitlines() if "::" in line]
+
+
+def run_workers(
+    arguments: argparse.Namespace, extra_arguments: List[str], environment: dict
+) -> int:
+    """
+    Function to shard scenarios across worker processes and wait for them
+
+    :param arguments: parsed command line arguments
+    :param extra_arguments: pytest arguments passed to every worker
+    :param environment: environment variables of worker processes
+    :return: the highest return code of workers
+    """
+    scenarios = collect_scenarios()
+    # every worker needs its own account, mailbox checks of shared account would collide
+    accounts = len([name for name in arguments.credentials.split(",") if name.strip()])
+    workers = max(1, min(arguments.workers, len(scenarios), max(accounts, 1)))
+    if workers < min(arguments.workers, len(scenarios)):
+        print(
+            f"Warning: {arguments.workers} workers requested, but only {accounts} "
+            f"accounts are configured by --credentials, running {workers} workers"
+        )
+    processes = []
+    for worker_id in range(workers):
+        worker_dir = os.path.join(BASEDIR, f"reports/worker_{worker_id}")
+        worker_environment = dict(environment)
+        worker_environment["SEZNAM_WORKER_ID"] = str(worker_id)
+        worker_environment["SEZNAM_WORKER_COUNT"] = str(workers)
+        command = [
+            sys.executable,
+            "-m",
+            "pytest",
+            *scenarios[worker_id::workers],
+            "--verbose",
+            *report_arguments(arguments.report, worker_dir),
+            *extra_arguments,
+            "--launch-profile=" + arguments.launch_profile.name,
+        ]
+        processes.append(
+            subprocess.Popen(command, cwd=TESTS_DIR, env=worker_environment)
+        )
+    return max(process.wait() for process in processes)
 
 
 def main() -> None:
@@ -14,16 +249,26 @@ def main() -> None:
 
     :return:
     """
-    ret_code = pytest.main(
-        [
-            os.path.join(BASEDIR, "tests/step_definitions/test_email.py"),
-            "--verbose",
-            "--html=" + os.path.join(BASEDIR, "reports/report_v1.html"),
-            "--html-report=" + os.path.join(BASEDIR, "reports/report_v2.html"),
-            "--self-contained-html",
-            "-s",
-        ]
-    )
+    arguments = parse_arguments()
+    environment = dict(os.environ)
+    if arguments.credentials:
+        environment["SEZNAM_CREDENTIAL_POOL"] = arguments.credentials
+        os.environ["SEZNAM_CREDENTIAL_POOL"] = arguments.credentials
+    if arguments.matrix:
+        ret_code = run_matrix(arguments, network_arguments(arguments), environment)
+    elif arguments.workers > 1:
+        ret_code = run_workers(arguments, network_arguments(arguments), environment)
+    else:
+        ret_code = pytest.main(
+            [
+                TEST_FILE,
+                "--verbose",
+                *report_arguments(arguments.report, os.path.join(BASEDIR, "reports")),
+                "-s",
+                *network_arguments(arguments),
+                "--launch-profile=" + arguments.launch_profile.name,
+            ]
+        )
     print(ret_code)
 
 
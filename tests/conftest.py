@@ -2,50 +2,437 @@
 The conftest.py file serves as a means of providing fixtures for an entire directory.
 """
 
-from typing import Generator
+import os
+from typing import Generator, Optional
 
 import pytest
 
+from helpers.browser_pool import DEFAULT_PROFILE_DIR, BrowserPool, ProfilePool
 from helpers.email_manipulation import SeznamEmail
+from helpers.har_network import DEFAULT_HAR_FILE, LIVE, NETWORK_MODES, HarNetwork
+from helpers.instrumentation import RESOURCE, StepRecorder
+from helpers.launch_profile import DEFAULT_LAUNCH_PROFILE, LaunchProfile
+from helpers.paths import BASEDIR
+from helpers.report_renderer import IncrementalReport
+from helpers.request_routing import RequestRouter
+from helpers.resource_monitor import ResourceMonitor
+from helpers.results_sink import ResultsSink, ResultsStreamPlugin
+from helpers.trace_recording import DEFAULT_MAX_BYTES, FailureTracer, TraceRingBuffer
+from helpers.verification import ImapVerificationBackend, VerificationBackend
+from helpers.web_performance import WebPerformanceCollector
+
+VERIFICATION_BACKENDS = ("ui", "imap")
+TRACING_MODES = ("failures", "off")
+PROFILE_MODES = ("fresh", "persistent")
+WEB_PERFORMANCE_MODES = ("on", "off")
+
+
+def pytest_addoption(parser) -> None:
+    """
+    Method used for registering command line options of the test suite
+
+    :param parser: pytest parser of command line options
+    :return:
+    """
+    parser.addoption(
+        "--network-mode",
+        choices=NETWORK_MODES,
+        default=LIVE,
+        help="live network, recording of HAR archive or replay of HAR archive",
+    )
+    parser.addoption(
+        "--har-file",
+        default=DEFAULT_HAR_FILE,
+        help="HAR archive used for recording or replay",
+    )
+    parser.addoption(
+        "--launch-profile",
+        default=os.environ.get("SEZNAM_LAUNCH_PROFILE", DEFAULT_LAUNCH_PROFILE),
+        help='browser as "engine[:headless|headed][:slow_mo]", '
+        "engine is chromium, firefox or webkit",
+    )
+    parser.addoption(
+        "--verification",
+        choices=VERIFICATION_BACKENDS,
+        default="ui",
+        help="check received emails in webmail UI or over IMAP",
+    )
+    parser.addoption(
+        "--imap-host",
+        default="imap.seznam.cz",
+        help="IMAP server used by --verification imap",
+    )
+    parser.addoption(
+        "--tracing",
+        choices=TRACING_MODES,
+        default="failures",
+        help="store Playwright trace of failing test cases or disable tracing",
+    )
+    parser.addoption(
+        "--trace-dir",
+        default=os.path.join(BASEDIR, "reports", "traces"),
+        help="folder with traces of failing test cases",
+    )
+    parser.addoption(
+        "--trace-max-mb",
+        type=int,
+        default=DEFAULT_MAX_BYTES // (1024 * 1024),
+        help="maximal size of --trace-dir, the oldest traces are removed",
+    )
+    parser.addoption(
+        "--results-file",
+        default=None,
+        help="JSONL file where results of steps and scenarios are streamed, "
+        "e.g. reports/results.jsonl, results are not streamed without it",
+    )
+    parser.addoption(
+        "--compact-report-dir",
+        default=os.path.join(BASEDIR, "reports", "compact"),
+        help="folder of paginated HTML report rendered from --results-file",
+    )
+    parser.addoption(
+        "--profile-mode",
+        choices=PROFILE_MODES,
+        default="fresh",
+        help="fresh - new browser context per SeznamEmail, "
+        "persistent - browser profile per account with disk cache kept between runs",
+    )
+    parser.addoption(
+        "--profile-dir",
+        default=DEFAULT_PROFILE_DIR,
+        help="folder with browser profiles used by --profile-mode persistent",
+    )
+    parser.addoption(
+        "--web-performance",
+        choices=WEB_PERFORMANCE_MODES,
+        default="on",
+        help="collect navigation, resource, paint and long task entries of steps",
+    )
+    parser.addoption(
+        "--recycle-flows",
+        type=int,
+        default=200,
+        help="number of flows after which browser context is recycled, 0 - never",
+    )
+    parser.addoption(
+        "--recycle-rss-mb",
+        type=int,
+        default=0,
+        help="RSS of browser processes triggering recycling (needs psutil), 0 - never",
+    )
+    parser.addoption(
+        "--recycle-heap-mb",
+        type=int,
+        default=512,
+        help="JS heap of page which triggers recycling (Chromium only), 0 - never",
+    )
+
+
+def _metrics_path(config) -> str:
+    # every worker and matrix run has its own report folder given by main.py,
+    # --report compact gives only --results-file
+    html_report = config.getoption("--html-report", default=None)
+    report_file = html_report or config.getoption("--results-file")
+    if report_file:
+        report_dir = os.path.dirname(os.path.abspath(report_file))
+        return os.path.join(report_dir, "output.json")
+    return os.path.join(BASEDIR, "reports", "output.json")
+
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_html_results_summary(prefix, summary, postfix) -> None:
+    """
+    Method used for embedding step latency table into pytest-html report
+
+    :param prefix: list of HTML fragments rendered before summary
+    :param summary: list of HTML fragments of summary
+    :param postfix: list of HTML fragments rendered after summary
+    :return:
+    """
+    postfix.append(StepRecorder.shared().html_table())
+
+
+def pytest_configure(config) -> None:
+    """
+    Method used for streaming results of the run into --results-file
+    and rendering compact report from it, only when --results-file is given
+
+    :param config: pytest config
+    :return:
+    """
+    results_file = config.getoption("--results-file")
+    if config.getoption("collectonly") or not results_file:
+        return
+    sink = ResultsSink(results_file)
+    StepRecorder.shared().add_listener(sink.write_record)
+    config.pluginmanager.register(
+        ResultsStreamPlugin(
+            sink,
+            IncrementalReport(results_file, config.getoption("--compact-report-dir")),
+        ),
+        "results_stream",
+    )
+
+
+@pytest.hookimpl(trylast=True)
+def pytest_unconfigure(config) -> None:
+    """
+    Method used for storing step latency metrics of the run into output.json
+    next to the reports of the run, content written by pytest-html-reporter is kept
+
+    :param config: pytest config
+    :return:
+    """
+    recorder = StepRecorder.shared()
+    if recorder.records:
+        recorder.write_json(_metrics_path(config))
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_makereport(item, call) -> Generator[None, None, None]:
+    """
+    Method used for keeping report of every phase on test item,
+    attaching web performance summary and linking stored trace of failing test case
+
+    :param item: test case
+    :param call: phase of test case
+    :return:
+    """
+    outcome = yield
+    report = outcome.get_result()
+    setattr(item, f"report_{report.when}", report)
+    if report.when != "teardown":
+        return
+    pytest_html = item.config.pluginmanager.getplugin("html")
+    extras = getattr(report, "extras", [])
+    web_performance = getattr(item, "web_performance", None)
+    if web_performance is not None:
+        report.user_properties.append(("web_performance", web_performance))
+        if pytest_html is not None:
+            extras.append(
+                pytest_html.extras.json(web_performance, name="Web performance")
+            )
+    trace_path = getattr(item, "trace_path", None)
+    if trace_path is not None:
+        item.user_properties.append(("trace", trace_path))
+        report.user_properties.append(("trace", trace_path))
+        if pytest_html is not None:
+            link = os.path.relpath(
+                trace_path, os.path.dirname(_metrics_path(item.config))
+            )
+            extras.append(pytest_html.extras.url(link, name="Playwright trace"))
+    if pytest_html is not None:
+        report.extras = extras
 
 
 @pytest.fixture(scope="function", autouse=True)
-def before_test_case(context) -> Generator[None, None, None]:
+def before_test_case(request, context, failure_tracer) -> Generator[None, None, None]:
     """
-    Method called before/after each Test Case. Now its empty
+    Method called before/after each Test Case.
+    Now recording trace chunk which is kept only when Test Case fails
+    and summing up web performance metrics of the Test Case.
 
+    :param request: pytest request giving access to test case and its reports
     :param context: variable which could be access in all steps
+    :param failure_tracer: tracer of failing test cases, None when tracing is off
     :return:
     """
-    # print("\nbefore TC")
+    testing_email = context.get("testing_email")
+    web_performance = context.get("web_performance")
+    if web_performance is not None:
+        web_performance.take_summary()
+    if failure_tracer is not None and testing_email is not None:
+        failure_tracer.start(testing_email.browser_context, request.node.nodeid)
     yield
-    # print("\nafter TC")
+    if web_performance is not None:
+        request.node.web_performance = web_performance.take_summary()
+    if failure_tracer is not None:
+        reports = [
+            getattr(request.node, f"report_{when}", None) for when in ("setup", "call")
+        ]
+        failed = any(report is not None and report.failed for report in reports)
+        request.node.trace_path = failure_tracer.stop(failed, request.node.name)
+
+
+@pytest.fixture(scope="session")
+def failure_tracer(request) -> Optional[FailureTracer]:
+    """
+    Define tracer storing traces of failing test cases selected by --tracing option
+
+    :param request: pytest request giving access to command line options
+    :return: FailureTracer, None when tracing is off
+    """
+    if request.config.getoption("--tracing") == "off":
+        return None
+    return FailureTracer(
+        TraceRingBuffer(
+            request.config.getoption("--trace-dir"),
+            request.config.getoption("--trace-max-mb") * 1024 * 1024,
+        )
+    )
 
 
 @pytest.fixture(scope="module", autouse=True)
-def before_module(context) -> Generator[None, None, None]:
+def before_module(
+    request, context, browser_pool, request_router, har_network, verification_backend
+) -> Generator[None, None, None]:
     """
     Method called before/after each Test run.
     Now creating instance of SeznamEmail nad provide it into context.
 
+    :param request: pytest request giving access to command line options
     :param context: variable which could be access in all steps
+    :param browser_pool: pool of browsers shared by all modules
+    :param request_router: router blocking requests not needed by email flows
+    :param har_network: live network, HAR recording or HAR replay
+    :param verification_backend: backend checking received emails, None for UI
     :return:
     """
     # print("\nbefore MODULE")
-    testing_email = SeznamEmail()
+    testing_email = SeznamEmail(
+        browser_pool,
+        router=request_router,
+        network=har_network,
+        verification_backend=verification_backend,
+        resource_monitor=ResourceMonitor(
+            request.config.getoption("--recycle-flows"),
+            request.config.getoption("--recycle-rss-mb"),
+            request.config.getoption("--recycle-heap-mb"),
+        ),
+    )
+    if request.config.getoption("--web-performance") == "on":
+        context["web_performance"] = WebPerformanceCollector()
+        testing_email.add_step_hook(context["web_performance"])
     context["testing_email"] = testing_email
+    # context outlives the module, new SeznamEmail has logged out browser context
+    context["logged_in"] = False
     yield
     # print("\nafter MODULE")
     context["testing_email"].clear()
     context["testing_email"] = None
+    context["web_performance"] = None
+    context["logged_in"] = False
+
+
+@pytest.fixture(scope="session")
+def launch_profile(request) -> LaunchProfile:
+    """
+    Define engine, headless and slow_mo of browsers selected by --launch-profile option
+
+    :param request: pytest request giving access to command line options
+    :return: LaunchProfile
+    """
+    try:
+        return LaunchProfile.parse(request.config.getoption("--launch-profile"))
+    except ValueError as error:
+        raise pytest.UsageError(str(error)) from error
+
+
+@pytest.fixture(scope="session")
+def browser_pool(
+    request, worker_credential, launch_profile
+) -> Generator[BrowserPool, None, None]:
+    """
+    Define pool of browsers, which are launched once for whole test session,
+    --profile-mode persistent uses profile of account assigned to this worker
+
+    :param request: pytest request giving access to command line options
+    :param worker_credential: credential assigned to this worker, names the profile
+    :param launch_profile: engine and launch options of browsers
+    :return: pool lending isolated browser context to each SeznamEmail
+    """
+    if request.config.getoption("--profile-mode") == "persistent":
+        # profile of one engine can not be opened by another one
+        pool = ProfilePool.from_launch_profile(
+            launch_profile,
+            f"{worker_credential or 'default'}-{launch_profile.engine}",
+            request.config.getoption("--profile-dir"),
+        )
+    else:
+        pool = BrowserPool.from_launch_profile(launch_profile)
+    yield pool
+    pool.close()
+
+
+@pytest.fixture(scope="session")
+def request_router() -> Generator[RequestRouter, None, None]:
+    """
+    Define router which aborts ads, trackers, images and fonts for whole test session,
+    its statistics are recorded as "request_routing" resource record at the end,
+    so they are part of results file and reports/output.json
+
+    :return: router counting blocked requests and saved bytes
+    """
+    router = RequestRouter()
+    yield router
+    with StepRecorder.shared().measure("request_routing", RESOURCE) as record:
+        record.details.update(router.stats())
+        record.outcome = "pass"
+
+
+@pytest.fixture(scope="session")
+def har_network(request) -> HarNetwork:
+    """
+    Define network mode selected by --network-mode and --har-file options
+
+    :param request: pytest request giving access to command line options
+    :return: HarNetwork used by all SeznamEmail instances
+    """
+    return HarNetwork(
+        request.config.getoption("--network-mode"),
+        request.config.getoption("--har-file"),
+    )
+
+
+@pytest.fixture(scope="module")
+def verification_backend(request) -> Optional[VerificationBackend]:
+    """
+    Define backend selected by --verification option, credentials are given by login
+
+    :param request: pytest request giving access to command line options
+    :return: ImapVerificationBackend, None when emails are checked in the UI
+    """
+    if request.config.getoption("--verification") == "imap":
+        return ImapVerificationBackend(request.config.getoption("--imap-host"))
+    return None
+
+
+@pytest.fixture(scope="session")
+def worker_id() -> int:
+    """
+    Define index of worker process running this session, main.py sets SEZNAM_WORKER_ID
+
+    :return: index of worker, 0 when suite is not sharded
+    """
+    return int(os.environ.get("SEZNAM_WORKER_ID", "0"))
+
+
+@pytest.fixture(scope="session")
+def worker_credential(worker_id) -> Optional[str]:
+    """
+    Define credential assigned to this worker from SEZNAM_CREDENTIAL_POOL,
+    which is comma separated list of credential names
+
+    :param worker_id: index of worker process
+    :return: name of credential used instead of the one named in feature file
+             None - in case credential pool is not defined
+    """
+    credential_pool = [
+        name.strip()
+        for name in os.environ.get("SEZNAM_CREDENTIAL_POOL", "").split(",")
+        if name.strip()
+    ]
+    if not credential_pool:
+        return None
+    return credential_pool[worker_id % len(credential_pool)]
 
 
 @pytest.fixture(scope="session")
 def context() -> dict:
     """
-    Define context variable which could be access in all steps
+    Define context variable which could be access in all steps,
+    every worker process has its own context
 
     :return: dictionary. which can be access in all steps
     """
     return {}
-
@@ -6,10 +6,12 @@ Feature: Email process
      Then check if logg in was successfully proceeded
 
     Scenario: Send email
-      Given load email context from D:/PYTHON/PROJECTS/PlayWright/input_files/email_context.json
+      Given logged into email with credentials from testing_email
+      And load email context from input_files/email_context.json
       When send email
       Then check if email was received
 
     Scenario: Sign out of email
+      Given logged into email with credentials from testing_email
       When log out from email
       Then check if logg out was successfully proceeded
\ No newline at end of file
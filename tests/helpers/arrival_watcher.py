@@ -0,0 +1,299 @@
+"""
+Python module for detecting arrival of new email in the inbox.
+
+Arrival is detected by MutationObserver inside the page, so a message is noticed
+as soon as the webmail renders it. When nothing is rendered, inbox is refreshed
+in-app (without full reload) and only then by page reload, with adaptive backoff.
+"""
+
+import asyncio
+import time
+from typing import Optional
+
+from playwright.sync_api import Error, Page
+from playwright.async_api import Error as AsyncError, Page as AsyncPage
+
+from helpers.inbox_index import subject_pattern
+
+# subject is source of helpers.inbox_index.subject_pattern, so "Load test 1"
+# does not match "Load test 10", sender is checked only when the list shows
+# email addresses at all, same as helpers.inbox_index.InboxIndex does
+MATCHING_MESSAGES_SCRIPT = """async (args) => {
+    const subject = args.subject ? new RegExp(args.subject) : null;
+    const text = (item) => item.innerText || item.textContent || "";
+    const addresses = (item) =>
+        Array.from(item.querySelectorAll("[title], [data-email]")).map(
+            (element) =>
+                (element.getAttribute("title") || "") + " " +
+                (element.getAttribute("data-email") || "")
+        );
+    const showsAddress = (item) =>
+        text(item).includes("@") || addresses(item).some((value) => value.includes("@"));
+    const fromSender = (item) =>
+        text(item).includes(args.sender) ||
+        addresses(item).some((value) => value.includes(args.sender));
+    const count = () => {
+        const items = Array.from(
+            new Set(
+                document.querySelectorAll(
+                    ".message-list [role='listitem'], .message-list li"
+                )
+            )
+        );
+        // list showing only display names can not be matched by sender
+        const checkSender = args.sender && items.some(showsAddress);
+        return items.filter(
+            (item) =>
+                (!subject || subject.test(text(item))) &&
+                (!checkSender || fromSender(item))
+        ).length;
+    };
+    const current = count();
+    if (args.known === null || current > args.known || args.timeout <= 0) {
+        return current;
+    }
+    return await new Promise((resolve) => {
+        const observer = new MutationObserver(() => {
+            const updated = count();
+            if (updated > args.known) {
+                observer.disconnect();
+                clearTimeout(timer);
+                resolve(updated);
+            }
+        });
+        const timer = setTimeout(() => {
+            observer.disconnect();
+            resolve(count());
+        }, args.timeout);
+        observer.observe(document.body, {
+            childList: true,
+            subtree: true,
+            characterData: true,
+        });
+    });
+}"""
+
+
+class _ArrivalSchedule:
+    """
+    Schedule of observation slices growing by backoff factor up to max_slice
+    """
+
+    def __init__(
+        self,
+        timeout: float,
+        first_slice: float,
+        max_slice: float,
+        backoff: float,
+        soft_refreshes: int,
+    ):
+        self.deadline: float = time.monotonic() + timeout
+        self.slice: float = first_slice
+        self.max_slice: float = max_slice
+        self.backoff: float = backoff
+        self.soft_refreshes: int = soft_refreshes
+        self.refreshes: int = 0
+
+    def next_slice_ms(self) -> int:
+        remaining = self.deadline - time.monotonic()
+        current = min(self.slice, max(remaining, 0))
+        self.slice = min(self.slice * self.backoff, self.max_slice)
+        return int(current * 1000)
+
+    def expired(self) -> bool:
+        return time.monotonic() >= self.deadline
+
+    def use_reload(self) -> bool:
+        self.refreshes += 1
+        return self.refreshes % (self.soft_refreshes + 1) == 0
+
+
+class ArrivalWatcher:
+    """
+    Class waiting for email matching subject/sender in '.message-list',
+    like :   matching_count
+            wait
+    """
+
+    def __init__(
+        self,
+        page: Page,
+        subject: Optional[str] = None,
+        sender: Optional[str] = None,
+        timeout: float = 120,
+        first_slice: float = 1.0,
+        max_slice: float = 10.0,
+        backoff: float = 1.5,
+        soft_refreshes: int = 3,
+    ):
+        """
+        :param page: page with opened inbox
+        :param subject: subject which new email has to contain as whole words
+        :param sender: sender address which new email has to contain, checked only
+                       when the list shows email addresses
+        :param timeout: maximal number of seconds spent by waiting
+        :param first_slice: number of seconds observed before first refresh of inbox
+        :param max_slice: maximal number of seconds observed between refreshes
+        :param backoff: factor used for prolonging of observed slices
+        :param soft_refreshes: number of in-app refreshes done before page reload
+        """
+        self._page: Page = page
+        self._subject: Optional[str] = subject
+        self._subject_source: Optional[str] = (
+            subject_pattern(subject).pattern if subject else None
+        )
+        self._sender: Optional[str] = sender
+        self._timeout: float = timeout
+        self._first_slice: float = first_slice
+        self._max_slice: float = max_slice
+        self._backoff: float = backoff
+        self._soft_refreshes: int = soft_refreshes
+
+    def _observe(self, known: Optional[int], timeout_ms: int) -> int:
+        return self._page.evaluate(
+            MATCHING_MESSAGES_SCRIPT,
+            {
+                "subject": self._subject_source,
+                "sender": self._sender,
+                "known": known,
+                "timeout": timeout_ms,
+            },
+        )
+
+    def _refresh(self, reload: bool) -> None:
+        if not reload:
+            try:
+                self._page.get_by_role("link", name="Doručené").click(timeout=5000)
+                return
+            except Error:
+                pass
+        self._page.reload(wait_until="domcontentloaded")
+
+    def matching_count(self) -> int:
+        """
+        Method used for counting emails in inbox which match subject/sender
+
+        :return: number of matching emails currently rendered in inbox
+        """
+        try:
+            return self._observe(None, 0)
+        except Error:
+            return 0
+
+    def wait(self, baseline: Optional[int] = None) -> bool:
+        """
+        Method used for waiting until new matching email appears in inbox
+
+        :param baseline: number of matching emails known before sending,
+                         current number of matching emails is used when missing
+        :return: True - if new matching email appeared within timeout
+                 False - if no new matching email appeared within timeout
+        """
+        known = self.matching_count() if baseline is None else baseline
+        schedule = _ArrivalSchedule(
+            self._timeout,
+            self._first_slice,
+            self._max_slice,
+            self._backoff,
+            self._soft_refreshes,
+        )
+        while not schedule.expired():
+            try:
+                if self._observe(known, schedule.next_slice_ms()) > known:
+                    return True
+                if not schedule.expired():
+                    self._refresh(schedule.use_reload())
+            except Error:
+                time.sleep(min(schedule.slice, 1.0))
+        return False
+
+
+class AsyncArrivalWatcher:
+    """
+    Asyncio variant of ArrivalWatcher,
+    like :   matching_count
+            wait
+    """
+
+    def __init__(
+        self,
+        page: AsyncPage,
+        subject: Optional[str] = None,
+        sender: Optional[str] = None,
+        timeout: float = 120,
+        first_slice: float = 1.0,
+        max_slice: float = 10.0,
+        backoff: float = 1.5,
+        soft_refreshes: int = 3,
+    ):
+        self._page: AsyncPage = page
+        self._subject: Optional[str] = subject
+        self._subject_source: Optional[str] = (
+            subject_pattern(subject).pattern if subject else None
+        )
+        self._sender: Optional[str] = sender
+        self._timeout: float = timeout
+        self._first_slice: float = first_slice
+        self._max_slice: float = max_slice
+        self._backoff: float = backoff
+        self._soft_refreshes: int = soft_refreshes
+
+    async def _observe(self, known: Optional[int], timeout_ms: int) -> int:
+        return await self._page.evaluate(
+            MATCHING_MESSAGES_SCRIPT,
+            {
+                "subject": self._subject_source,
+                "sender": self._sender,
+                "known": known,
+                "timeout": timeout_ms,
+            },
+        )
+
+    async def _refresh(self, reload: bool) -> None:
+        if not reload:
+            try:
+                await self._page.get_by_role("link", name="Doručené").click(
+                    timeout=5000
+                )
+                return
+            except AsyncError:
+                pass
+        await self._page.reload(wait_until="domcontentloaded")
+
+    async def matching_count(self) -> int:
+        """
+        Method used for counting emails in inbox which match subject/sender
+
+        :return: number of matching emails currently rendered in inbox
+        """
+        try:
+            return await self._observe(None, 0)
+        except AsyncError:
+            return 0
+
+    async def wait(self, baseline: Optional[int] = None) -> bool:
+        """
+        Method used for waiting until new matching email appears in inbox
+
+        :param baseline: number of matching emails known before sending,
+                         current number of matching emails is used when missing
+        :return: True - if new matching email appeared within timeout
+                 False - if no new matching email appeared within timeout
+        """
+        known = await self.matching_count() if baseline is None else baseline
+        schedule = _ArrivalSchedule(
+            self._timeout,
+            self._first_slice,
+            self._max_slice,
+            self._backoff,
+            self._soft_refreshes,
+        )
+        while not schedule.expired():
+            try:
+                if await self._observe(known, schedule.next_slice_ms()) > known:
+                    return True
+                if not schedule.expired():
+                    await self._refresh(schedule.use_reload())
+            except AsyncError:
+                await asyncio.sleep(min(schedule.slice, 1.0))
+        return False
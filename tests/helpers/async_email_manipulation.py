@@ -0,0 +1,622 @@
+"""
+Python module for manipulation with seznam email on top of asyncio.
+
+Mirrors SeznamEmail from email_manipulation.py, so many mailbox sessions
+can run their flows concurrently on one event loop.
+"""
+
+import asyncio
+from typing import Dict, List, Tuple, Optional, Union
+from urllib.parse import urljoin
+
+from playwright.async_api import (
+    TimeoutError as PlaywrightTimeoutError,
+    BrowserContext,
+    Error,
+    Page,
+)
+
+from helpers.arrival_watcher import AsyncArrivalWatcher
+from helpers.attachments import Attachment, as_attachment, digest, iter_file
+from helpers.browser_pool import AsyncBrowserPool, PooledContext
+from helpers.deadline import clamp_timeout
+from helpers.har_network import HarNetwork
+from helpers.instrumentation import FLOW, RESOURCE, StepHook, StepRecorder, recorded
+from helpers.page_elements import NAVIGATION_TIMEOUT, AsyncSeznamPage
+from helpers.request_routing import RequestRouter
+from helpers.resource_monitor import JS_HEAP_SCRIPT, ResourceMonitor
+from helpers.session_cache import RESTORE_PATH, RESTORE_STORAGE_SCRIPT, SessionCache
+from helpers.url_cache import UrlCache
+from helpers.verification import VerificationBackend
+
+INBOX_URL = "https://email.seznam.cz/"
+LOGIN_PAGE = "login_page"
+
+
+class AsyncSeznamEmail:
+    """
+    Asyncio variant of SeznamEmail with the same public methods and results,
+    like :   login
+            check_successful_login
+            logout
+            check_successful_logout
+            send_email
+            check_last_received_email
+            add_step_hook
+            clear
+
+    Instances have to be created by awaiting AsyncSeznamEmail.create(),
+    because borrowing the browser context is asynchronous.
+    """
+
+    def __init__(
+        self,
+        pool: AsyncBrowserPool,
+        lease: PooledContext,
+        owns_pool: bool = False,
+        session_cache: Optional[SessionCache] = None,
+        router: Optional[RequestRouter] = None,
+        network: Optional[HarNetwork] = None,
+        recorder: Optional[StepRecorder] = None,
+        verification_backend: Optional[VerificationBackend] = None,
+        resource_monitor: Optional[ResourceMonitor] = None,
+        url_cache: Optional[UrlCache] = None,
+    ):
+        self._recorder: StepRecorder = (
+            recorder if recorder is not None else StepRecorder.shared()
+        )
+        self._pool: AsyncBrowserPool = pool
+        self._lease: PooledContext = lease
+        self._owns_pool: bool = owns_pool
+        self._page: Page = lease.page
+        self._ui: AsyncSeznamPage = AsyncSeznamPage(self._page, self._recorder)
+        self._router: Optional[RequestRouter] = router
+        self._network: HarNetwork = network if network is not None else HarNetwork()
+        self._session_cache: SessionCache = (
+            session_cache if session_cache is not None else SessionCache()
+        )
+        self._url_cache: UrlCache = url_cache if url_cache is not None else UrlCache()
+        self._pending_session: Optional[str] = None
+        self._session_name: Optional[str] = None
+        self._arrival_baselines: Dict[Tuple[str, str], int] = {}
+        self._verification_backend: Optional[VerificationBackend] = verification_backend
+        self._resource_monitor: Optional[ResourceMonitor] = resource_monitor
+        self._step_hooks: List[StepHook] = []
+
+    @classmethod
+    async def create(
+        cls,
+        pool: Optional[AsyncBrowserPool] = None,
+        session_cache: Optional[SessionCache] = None,
+        router: Optional[RequestRouter] = None,
+        network: Optional[HarNetwork] = None,
+        recorder: Optional[StepRecorder] = None,
+        verification_backend: Optional[VerificationBackend] = None,
+        resource_monitor: Optional[ResourceMonitor] = None,
+        url_cache: Optional[UrlCache] = None,
+    ) -> "AsyncSeznamEmail":
+        """
+        Method used for creating instance with browser context borrowed from the pool
+
+        :param pool: pool shared by concurrent sessions, private pool is used when missing
+        :param session_cache: storage of authenticated sessions used by login
+        :param router: router of requests, e.g. blocking ads, images and fonts
+        :param network: live network, HAR recording or HAR replay
+        :param recorder: collector of step latencies, shared recorder is used when missing
+        :param verification_backend: backend used by check_last_received_email,
+                                     received email is checked in the UI when None
+        :param resource_monitor: monitor recycling context which uses too much memory
+                                 or served too many flows, never recycled when None
+        :param url_cache: storage of resolved URLs, e.g. login page, used by login
+        :return: ready to use instance of AsyncSeznamEmail
+        """
+        owns_pool = pool is None
+        if pool is None:
+            pool = AsyncBrowserPool()
+        lease = await pool.acquire()
+        if network is not None:
+            await network.attach_async(lease.context)
+        if router is not None:
+            await router.attach_async(lease.context)
+        return cls(
+            pool,
+            lease,
+            owns_pool,
+            session_cache,
+            router,
+            network,
+            recorder,
+            verification_backend,
+            resource_monitor,
+            url_cache,
+        )
+
+    async def _recycle_context(self, reason: str) -> None:
+        with self._recorder.measure("recycle_context", RESOURCE) as record:
+            record.details["reason"] = reason
+            try:
+                cookies = await self._lease.context.cookies()
+                url = self._page.url
+            except Error:
+                cookies, url = [], ""
+            if self._router is not None:
+                await self._router.detach_async(self._lease.context)
+            await self._pool.release(self._lease, discard=True)
+            self._lease = await self._pool.acquire()
+            self._page = self._lease.page
+            self._ui = AsyncSeznamPage(self._page, self._recorder)
+            await self._network.attach_async(self._lease.context)
+            if self._router is not None:
+                await self._router.attach_async(self._lease.context)
+            self._resource_monitor.recycled()
+            try:
+                # logged in session survives in cookies of the old context
+                if cookies:
+                    await self._lease.context.add_cookies(cookies)
+                if url.startswith("http"):
+                    await self._ui.goto(url, wait_until="domcontentloaded")
+                record.outcome = "pass"
+            except Error:
+                record.outcome = "fail"
+
+    async def _maintain_resources(self) -> None:
+        if self._resource_monitor is None:
+            return
+        try:
+            js_heap = await self._page.evaluate(JS_HEAP_SCRIPT)
+        except Error:
+            js_heap = None
+        reason = self._resource_monitor.flow_started(js_heap)
+        if reason is not None:
+            await self._recycle_context(reason)
+
+    async def _restore_session(self, session_name: str) -> bool:
+        storage_state = self._session_cache.load(session_name)
+        if storage_state is None:
+            return False
+        try:
+            await self._lease.context.add_cookies(storage_state["cookies"])
+            await self._restore_local_storage(storage_state.get("origins", []))
+            await self._ui.goto(INBOX_URL, wait_until="domcontentloaded")
+            await self._ui.wait_visible("new_email_link")
+            return True
+        except Error:
+            self._session_cache.invalidate(session_name)
+            await self._lease.context.clear_cookies()
+            return False
+
+    async def _restore_local_storage(self, origins: List[dict]) -> None:
+        if not origins:
+            return
+        await self._page.route(
+            f"**{RESTORE_PATH}",
+            lambda route: route.fulfill(body="", content_type="text/html"),
+        )
+        try:
+            for origin in origins:
+                await self._page.goto(
+                    origin["origin"] + RESTORE_PATH,
+                    timeout=clamp_timeout(NAVIGATION_TIMEOUT),
+                )
+                await self._page.evaluate(
+                    RESTORE_STORAGE_SCRIPT, origin.get("localStorage", [])
+                )
+        finally:
+            await self._page.unroute(f"**{RESTORE_PATH}")
+
+    async def _store_session(self) -> None:
+        if self._pending_session is None:
+            return
+        try:
+            self._session_cache.save(
+                self._pending_session, await self._lease.context.storage_state()
+            )
+        except (Error, OSError):
+            pass
+        self._pending_session = None
+
+    @recorded()
+    async def _fill_user_name(self, email: str) -> bool:
+        try:
+            await self._ui.fill("user_name_field", email)
+            await self._ui.click("continue_button")
+            return True
+        except PlaywrightTimeoutError:
+            return False
+
+    @recorded(idempotent=True)
+    async def _go_to_login(self) -> bool:
+        try:
+            login_page_href = await self._ui.attribute("portal_login_link", "href")
+            if login_page_href:
+                login_page_url = urljoin(self._page.url, login_page_href)
+                await self._ui.goto(login_page_url, wait_until="load")
+                self._url_cache.put(LOGIN_PAGE, login_page_url)
+                return True
+            return False
+        except PlaywrightTimeoutError:
+            return False
+
+    @recorded()
+    async def _go_to_cached_login(self, login_page_url: str) -> bool:
+        try:
+            await self._ui.goto(login_page_url, wait_until="domcontentloaded")
+            await self._ui.wait_visible("user_name_field")
+            return True
+        except Error:
+            self._url_cache.invalidate(LOGIN_PAGE)
+            return False
+
+    @recorded()
+    async def _fill_password(self, password: str) -> bool:
+        try:
+            await self._ui.fill("password_field", password)
+            return True
+        except PlaywrightTimeoutError:
+            return False
+
+    @recorded(idempotent=True)
+    async def _go_to_seznam_page(self) -> bool:
+        try:
+            await self._ui.goto("https://www.seznam.cz/", wait_until="load")
+            return True
+        except Error:
+            return False
+
+    @recorded()
+    async def _click_login_button(self) -> bool:
+        try:
+            await self._ui.click("sign_in_button")
+            return True
+        except PlaywrightTimeoutError:
+            return False
+
+    @recorded()
+    async def _click_to_send_email(self):
+        try:
+            await self._ui.click("send_email_button")
+            return True
+        except PlaywrightTimeoutError:
+            return False
+
+    @recorded()
+    async def _open_new_email(self):
+        try:
+            await self._ui.click("new_email_link")
+            return True
+        except PlaywrightTimeoutError:
+            return False
+
+    @recorded()
+    async def _add_message(self, message: str) -> bool:
+        try:
+            await self._ui.fill("message_field", message)
+            return True
+        except PlaywrightTimeoutError:
+            return False
+
+    @recorded()
+    async def _add_subject(self, subject: str) -> bool:
+        try:
+            await self._ui.fill("subject_field", subject)
+            return True
+        except PlaywrightTimeoutError:
+            return False
+
+    @recorded()
+    async def _add_attachment(self, path: Union[str, Attachment]) -> bool:
+        try:
+            # generating or staging large payload would block the event loop
+            payload = await asyncio.to_thread(as_attachment(path).payload)
+            async with self._page.expect_file_chooser(
+                timeout=clamp_timeout(NAVIGATION_TIMEOUT)
+            ) as fc_info:
+                await self._ui.click("add_attachment_button")
+            file_chooser = await fc_info.value
+            await file_chooser.set_files(payload)
+            return True
+        except (Error, OSError):  # e.g. missing file or payload rejected by playwright
+            return False
+
+    @recorded()
+    async def _add_receiver(self, receiver_email: str) -> bool:
+        try:
+            await self._ui.click("receiver_button")
+            await self._ui.click("receiver_contact", email=receiver_email)
+            await self._ui.click("receiver_button")
+            return True
+        except PlaywrightTimeoutError:
+            return False
+
+    @recorded()
+    async def _wait_until_received_email(self, subject: str, sender: str) -> bool:
+        watcher = AsyncArrivalWatcher(
+            self._page,
+            subject=subject,
+            sender=sender,
+            timeout=clamp_timeout(120000) / 1000,
+        )
+        return await watcher.wait(self._arrival_baselines.pop((subject, sender), None))
+
+    @recorded(idempotent=True)
+    async def _load_last_received_email(self) -> bool:
+        try:
+            await self._ui.click("inbox_link")
+            await self._ui.click("received_email", index=0)
+            return True
+        except PlaywrightTimeoutError:
+            return False
+
+    @recorded()
+    async def _check_message(self, message_expected: str) -> bool:
+        try:
+            message = await self._ui.text("message_body")
+            if message == message_expected:
+                return True
+            return False
+        except PlaywrightTimeoutError:
+            return False
+
+    @recorded()
+    async def _check_attachment(
+        self, attachment_expected: Union[str, Attachment]
+    ) -> bool:
+        expected = as_attachment(attachment_expected)
+        try:
+            attachment = await self._ui.text("attachment_name")
+            if attachment != expected.name:
+                return False
+            async with self._page.expect_download(
+                timeout=clamp_timeout(NAVIGATION_TIMEOUT)
+            ) as download_info:
+                await self._ui.click("attachment_download")
+            download = await download_info.value
+            received_path = await download.path()
+            # hashing of downloaded and expected content runs off the event loop
+            received = await asyncio.to_thread(digest, iter_file(received_path))
+            await download.delete()
+            return received == await asyncio.to_thread(expected.sha256)
+        except (PlaywrightTimeoutError, OSError):
+            return False
+
+    @recorded()
+    async def _check_subject(self, subject_expected: str) -> bool:
+        try:
+            subject = await self._ui.text("message_subject")
+            if subject == subject_expected:
+                return True
+            return False
+        except PlaywrightTimeoutError:
+            return False
+
+    @recorded()
+    async def _check_sender_email(self, receiver_email: str) -> bool:
+        try:
+            sender_email = await self._ui.text("message_sender")
+            if sender_email == receiver_email:
+                return True
+            return False
+        except PlaywrightTimeoutError:
+            return False
+
+    @recorded(FLOW, budget=60)
+    async def login(
+        self, email: str, password: str, session_name: Optional[str] = None
+    ) -> Tuple[bool, str]:
+        """
+        Method used for sign up to seznam email
+
+        :param email: user email, which should be used for sign up
+        :param password: user password, which should be used for sign up
+        :param session_name: name of credentials used as key of cached session,
+                             cached session is used instead of UI login when still valid
+        :return: True - if sign up was successfully done
+                 False - if sign up was not successfully done
+                 message - provide more information, like reason of fail, etc.
+        """
+        await self._maintain_resources()
+        self._session_name = session_name
+        if self._verification_backend is not None:
+            # switching credentials may log out over network, keep event loop free
+            await asyncio.to_thread(
+                self._verification_backend.use_credentials, email, password
+            )
+        if session_name is not None:
+            if await self._restore_session(session_name):
+                return True, "Login restored from cached session"
+            self._pending_session = session_name
+        login_page_url = self._url_cache.get(LOGIN_PAGE)
+        if login_page_url is None or not await self._go_to_cached_login(login_page_url):
+            if not await self._go_to_seznam_page():
+                return False, "Not able to load seznam page"
+            if not await self._go_to_login():
+                return False, "Not able to load up login page"
+        if not await self._fill_user_name(email):
+            return False, "Not possible to fill in user"
+        if not await self._fill_password(password):
+            return False, "Not able to fill in password"
+        if not await self._click_login_button():
+            return False, "Not able to click on login button"
+        return True, "Login successfully done"
+
+    @recorded(FLOW, budget=45)
+    async def check_successful_login(self) -> Tuple[bool, str]:
+        """
+        Method used for checking if sign up was succesfully done
+
+        :return: True - if sign up was successfully done (additional check)
+                 False - if sign up was not successfully done (additional check)
+                 message - provide more information, like reason of fail, etc.
+        """
+        try:
+            signal = await self._ui.first_visible(
+                "new_email_link", "login_error", timeout=NAVIGATION_TIMEOUT
+            )
+        except PlaywrightTimeoutError:
+            return False, "Not able to do login check"
+        if signal == "new_email_link":
+            await self._store_session()
+            return True, "Login successful"
+        if signal == "login_error":
+            return False, "Login not successful"
+        return False, "Not able to do login check"
+
+    @recorded(FLOW, budget=45)
+    async def check_successful_logout(self) -> Tuple[bool, str]:
+        """
+        Method used for checking if sign out was succesfully done
+
+        :return: True - if sign out was successfully done (additional check)
+                 False - if sign out was not successfully done (additional check)
+                 message - provide more information, like reason of fail, etc.
+        """
+        try:
+            await self._ui.wait_visible("login_form", timeout=NAVIGATION_TIMEOUT)
+            return True, "Logout successful"
+        except PlaywrightTimeoutError:
+            return False, "Logout not successful"
+
+    @recorded(FLOW, budget=30)
+    async def logout(self) -> Tuple[bool, str]:
+        """
+        Method used for sign out to seznam email
+
+        :return: True - if sign out was successfully done
+                 False - if sign out was not successfully done
+                 message - provide more information, like reason of fail, etc.
+        """
+        try:
+            await self._ui.click("user_menu_button")
+            await self._ui.click("logout_link")
+            if self._session_name is not None:
+                self._session_cache.invalidate(self._session_name)
+                self._session_name = None
+            return True, "Successfully logout"
+        except PlaywrightTimeoutError:
+            return False, "Unsuccessfully logout"
+
+    @property
+    def browser_context(self) -> BrowserContext:
+        """
+        Browser context borrowed from the pool, e.g. for tracing
+        """
+        return self._lease.context
+
+    @property
+    def page(self) -> Page:
+        """
+        Page of the borrowed browser context, e.g. for step hooks
+        """
+        return self._page
+
+    def add_step_hook(self, hook: StepHook) -> None:
+        """
+        Method used for registering callbacks called before and after every step,
+        e.g. AsyncWebPerformanceCollector
+
+        :param hook: StepHook, its methods may be coroutines
+        """
+        self._step_hooks.append(hook)
+
+    async def clear(self) -> None:
+        """
+        Method used to give the browser context back to the pool,
+        private pool is closed together with the browser
+        """
+        if self._router is not None:
+            await self._router.detach_async(self._lease.context)
+        if self._verification_backend is not None:
+            await asyncio.to_thread(self._verification_backend.close)
+        await self._pool.release(
+            self._lease, discard=self._network.requires_new_context()
+        )
+        if self._owns_pool:
+            await self._pool.close()
+
+    @recorded(FLOW, budget=90)
+    async def send_email(
+        self,
+        receiver_email: str,
+        subject: str,
+        message: str,
+        path: Union[str, Attachment],
+    ) -> Tuple[bool, str]:
+        """
+        Method used for sending email
+
+        :param receiver_email: email address where email should be sent
+        :param subject: define subject of email
+        :param message: define message of email
+        :param path: define path to file or Attachment which should be attached to the email
+        :return: True - if sending of email was successfully done
+                 False - if sending of email was not successfully done
+                 message - provide more information, like reason of fail, etc.
+        """
+        await self._maintain_resources()
+        if self._verification_backend is None:
+            self._arrival_baselines[(subject, receiver_email)] = (
+                await AsyncArrivalWatcher(
+                    self._page, subject=subject, sender=receiver_email
+                ).matching_count()
+            )
+        else:
+            await asyncio.to_thread(
+                self._verification_backend.record_baseline, receiver_email, subject
+            )
+        if not await self._open_new_email():
+            return False, "Not able to open new email"
+        if not await self._add_receiver(receiver_email):
+            return False, "Not able to add receiver"
+        if not await self._add_subject(subject):
+            return False, "Not able to add subject"
+        if not await self._add_attachment(path):
+            return False, "Not able to add attachment"
+        if not await self._add_message(message):
+            return False, "Not able to add message"
+        if not await self._click_to_send_email():
+            return False, "Not able to click on send email"
+        return True, "Email was sent successfully"
+
+    @recorded(FLOW, budget=180)
+    async def check_last_received_email(
+        self,
+        receiver_email: str,
+        subject: str,
+        message: str,
+        path: Union[str, Attachment],
+    ) -> Tuple[bool, str]:
+        """
+        Method used for checking if email was correctly received,
+        configured verification backend is used instead of the UI
+
+        :param receiver_email: email address where email should be sent
+        :param subject: define subject of email
+        :param message: define message of email
+        :param path: define path to file or Attachment which should be attached to the email
+        :return: True - if the last received email has correct attributes
+                 False - if the last received email has not correct attributes
+                 message - provide more information, like reason of fail, etc.
+        """
+        if self._verification_backend is not None:
+            # backend is blocking, it must not stop other sessions on the event loop
+            return await asyncio.to_thread(
+                self._verification_backend.check_received_email,
+                receiver_email,
+                subject,
+                message,
+                path,
+            )
+        await self._maintain_resources()
+        if not await self._wait_until_received_email(subject, receiver_email):
+            return False, "Email was not received"
+        if not await self._load_last_received_email():
+            return False, "Not able to load last received email"
+        if not await self._check_sender_email(receiver_email):
+            return False, "Invalid email sender"
+        if not await self._check_subject(subject):
+            return False, "Invalid email subject"
+        if not await self._check_message(message):
+            return False, "Invalid email message context"
+        if not await self._check_attachment(path):
+            return False, "Invalid email attachment file"
+        return True, "Received email is valid"
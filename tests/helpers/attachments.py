@@ -0,0 +1,230 @@
+"""
+Python module with email attachments sent from file, memory buffer or generator.
+
+Every attachment gives payload accepted by FileChooser.set_files and sha256
+digest computed over chunks of its content, so received attachment can be
+verified byte by byte without holding two copies of large file in memory.
+Playwright rejects buffer payloads over 50 MB, so larger content is written
+to staging file named by its digest and passed to the browser by path.
+"""
+
+import hashlib
+import mimetypes
+import os
+import random
+import tempfile
+from typing import Iterable, Iterator, Union
+
+from helpers.paths import CACHE_DIR
+
+DEFAULT_STAGING_DIR = os.path.join(CACHE_DIR, "attachments")
+CHUNK_SIZE = 1024 * 1024
+MAX_BUFFER_PAYLOAD = 50 * 1024 * 1024
+DEFAULT_MIME_TYPE = "application/octet-stream"
+
+
+class Attachment:
+    """
+    Attachment held in memory buffer,
+    like :   payload
+            chunks
+            sha256
+    """
+
+    def __init__(self, name: str, content: bytes, mime_type: str = ""):
+        """
+        :param name: file name shown in email
+        :param content: bytes of attachment
+        :param mime_type: MIME type, guessed from name when empty
+        """
+        self.name: str = name
+        self.mime_type: str = (
+            mime_type or mimetypes.guess_type(name)[0] or DEFAULT_MIME_TYPE
+        )
+        self._content: bytes = content
+        self.size: int = len(content)
+        self.staging_dir: str = DEFAULT_STAGING_DIR
+
+    @property
+    def content(self) -> bytes:
+        """
+        Whole content of attachment
+        """
+        return self._content
+
+    def payload(self) -> Union[str, dict]:
+        """
+        Method used for getting value accepted by FileChooser.set_files
+
+        :return: buffer payload up to MAX_BUFFER_PAYLOAD bytes,
+                 path to staging file for larger content, OSError is raised
+                 when staging file can not be written
+        """
+        if self.size <= MAX_BUFFER_PAYLOAD:
+            return {
+                "name": self.name,
+                "mimeType": self.mime_type,
+                "buffer": self.content,
+            }
+        return self._stage()
+
+    def _stage(self) -> str:
+        # staging file is kept, browser may read it until the email is sent
+        os.makedirs(self.staging_dir, exist_ok=True)
+        descriptor, temporary_path = tempfile.mkstemp(".tmp", dir=self.staging_dir)
+        sha256 = hashlib.sha256()
+        with os.fdopen(descriptor, "wb") as file:
+            for chunk in self.chunks():
+                sha256.update(chunk)
+                file.write(chunk)
+        directory = os.path.join(self.staging_dir, sha256.hexdigest())
+        path = os.path.join(directory, self.name)
+        os.makedirs(directory, exist_ok=True)
+        os.replace(temporary_path, path)
+        return path
+
+    def chunks(self) -> Iterator[bytes]:
+        """
+        Method used for iterating over content by CHUNK_SIZE pieces
+
+        :return: iterator of bytes
+        """
+        content = self.content
+        for start in range(0, len(content), CHUNK_SIZE):
+            yield content[start : start + CHUNK_SIZE]
+
+    def sha256(self) -> str:
+        """
+        Method used for getting digest of content
+
+        :return: hex sha256 digest
+        """
+        return digest(self.chunks())
+
+
+class GeneratedAttachment(Attachment):
+    """
+    Attachment of given size with deterministic pseudo-random content,
+    content is generated again from seed whenever it is needed
+    """
+
+    def __init__(self, name: str, size: int, mime_type: str = "", seed: int = 0):
+        """
+        :param name: file name shown in email
+        :param size: number of bytes
+        :param mime_type: MIME type, guessed from name when empty
+        :param seed: seed of generator, the same seed gives the same content
+        """
+        super().__init__(name, b"", mime_type)
+        self.size: int = size
+        self.seed: int = seed
+
+    @property
+    def content(self) -> bytes:
+        return b"".join(self.chunks())
+
+    def chunks(self) -> Iterator[bytes]:
+        generator = random.Random(self.seed)
+        remaining = self.size
+        while remaining > 0:
+            chunk = generator.randbytes(min(CHUNK_SIZE, remaining))
+            remaining -= len(chunk)
+            yield chunk
+
+
+class FileAttachment(Attachment):
+    """
+    Attachment stored in file, file is read by chunks only for digest
+    """
+
+    def __init__(self, path: str, mime_type: str = ""):
+        """
+        :param path: path to file
+        :param mime_type: MIME type, guessed from file name when empty
+        """
+        super().__init__(os.path.basename(path), b"", mime_type)
+        self.path: str = path
+
+    @property
+    def content(self) -> bytes:
+        with open(self.path, "rb") as file:
+            return file.read()
+
+    def payload(self) -> Union[str, dict]:
+        return self.path
+
+    def chunks(self) -> Iterator[bytes]:
+        return iter_file(self.path)
+
+
+def iter_file(path: str) -> Iterator[bytes]:
+    """
+    Function to read file by CHUNK_SIZE pieces
+
+    :param path: path to file
+    :return: iterator of bytes
+    """
+    with open(path, "rb") as file:
+        while True:
+            chunk = file.read(CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+
+def digest(chunks: Iterable[bytes]) -> str:
+    """
+    Function to compute sha256 digest over chunks of content
+
+    :param chunks: iterable of bytes
+    :return: hex sha256 digest
+    """
+    sha256 = hashlib.sha256()
+    for chunk in chunks:
+        sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def as_attachment(value: Union[str, Attachment]) -> Attachment:
+    """
+    Function to convert attachment of email context into Attachment
+
+    :param value: path to file or Attachment
+    :return: Attachment
+    """
+    if isinstance(value, Attachment):
+        return value
+    return FileAttachment(value)
+
+
+def parse_attachment(record: dict) -> Attachment:
+    """
+    Function to create attachment from email context record,
+    like {"generate": {"name": "big.bin", "size": 1048576, "mime_type": "...", "seed": 1}}
+    or {"name": "note.txt", "content": "text of file", "mime_type": "text/plain"}
+
+    :param record: dictionary loaded from json
+    :return: GeneratedAttachment or Attachment
+    """
+    if "generate" in record:
+        generate = record["generate"]
+        if not isinstance(generate, dict):
+            raise ValueError("'generate' has to be JSON object")
+        size = generate.get("size")
+        if not isinstance(size, int) or isinstance(size, bool) or size < 0:
+            raise ValueError("'generate.size' has to be non-negative int")
+        return GeneratedAttachment(
+            str(generate.get("name", "generated.bin")),
+            size,
+            str(generate.get("mime_type", "")),
+            int(generate.get("seed", 0)),
+        )
+    if not isinstance(record.get("name"), str) or not isinstance(
+        record.get("content"), str
+    ):
+        raise ValueError("attachment needs 'generate' or str 'name' and 'content'")
+    return Attachment(
+        record["name"],
+        record["content"].encode("utf-8"),
+        str(record.get("mime_type", "")),
+    )
@@ -0,0 +1,73 @@
+"""
+Python module with result of operations done over batch of emails.
+"""
+
+from typing import List, Optional, Tuple
+
+
+class BatchReport:
+    """
+    Result per message of batch operation together with its duration,
+    error is set when the whole batch was aborted, e.g. by deadline
+    """
+
+    __slots__ = ("results", "elapsed", "error")
+
+    def __init__(self):
+        self.results: List[Tuple[bool, str]] = []
+        self.elapsed: float = 0.0
+        self.error: Optional[str] = None
+
+    @classmethod
+    def aborted(cls, error: str) -> "BatchReport":
+        """
+        Method used for creating failed report of batch which could not be processed
+
+        :param error: reason why the batch was aborted
+        :return: BatchReport evaluated as False
+        """
+        report = cls()
+        report.error = error
+        return report
+
+    def __len__(self) -> int:
+        return len(self.results)
+
+    def __bool__(self) -> bool:
+        return self.error is None and all(result for result, _ in self.results)
+
+    @property
+    def succeeded(self) -> int:
+        """
+        Number of messages which were processed successfully
+        """
+        return sum(1 for result, _ in self.results if result)
+
+    @property
+    def failed(self) -> int:
+        """
+        Number of messages which were not processed successfully
+        """
+        return len(self.results) - self.succeeded
+
+    @property
+    def messages_per_minute(self) -> float:
+        """
+        Number of successfully processed messages per minute
+        """
+        if self.elapsed <= 0:
+            return 0.0
+        return self.succeeded / self.elapsed * 60
+
+    def summary(self) -> str:
+        """
+        Method used for getting human readable summary of the batch
+
+        :return: summary with number of succeeded/failed messages and rate
+        """
+        if self.error is not None:
+            return f"Batch aborted: {self.error}"
+        return (
+            f"{self.succeeded}/{len(self.results)} messages processed, "
+            f"{self.failed} failed, {self.messages_per_minute:.1f} messages per minute"
+        )
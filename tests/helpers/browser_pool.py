@@ -0,0 +1,571 @@
+"""
+Python module with pool of launched browsers, which hands out isolated browser contexts.
+
+Launching a browser takes seconds, creating a new context takes milliseconds,
+so browsers are launched once per process and every SeznamEmail gets
+its own BrowserContext and page from the pool. When browser_server.py runs,
+the pool connects to its long-lived browser and launches local one only as fallback.
+ProfilePool instead keeps persistent context with user data directory per account,
+so HTTP cache of webmail assets survives between runs.
+"""
+
+import atexit
+import asyncio
+import os
+import re
+from typing import List, Optional
+
+from playwright.sync_api import (
+    sync_playwright,
+    Error,
+    Browser,
+    BrowserContext,
+    Page,
+    Playwright,
+)
+from playwright.async_api import (
+    async_playwright,
+    Error as AsyncError,
+    Browser as AsyncBrowser,
+    BrowserContext as AsyncBrowserContext,
+    Page as AsyncPage,
+    Playwright as AsyncPlaywright,
+)
+
+from helpers.browser_server import DEFAULT_STATE_FILE, connect_headers, find_endpoint
+from helpers.launch_profile import LaunchProfile
+from helpers.paths import CACHE_DIR
+
+DEFAULT_PROFILE_DIR = os.path.join(CACHE_DIR, "profiles")
+DEFAULT_LAUNCH_OPTIONS = {"headless": False, "slow_mo": 1}
+
+CONNECT_TIMEOUT = 5000
+
+RESET_STORAGE_SCRIPT = """() => {
+    try { window.localStorage.clear(); window.sessionStorage.clear(); } catch (e) {}
+}"""
+# empty document served by the pool itself, so storage of any origin is cleared offline
+RESET_PATH = "/__pool_reset__"
+
+
+def _fulfill_blank(route) -> None:
+    route.fulfill(body="", content_type="text/html")
+
+
+async def _fulfill_blank_async(route) -> None:
+    await route.fulfill(body="", content_type="text/html")
+
+
+class PooledContext:
+    """
+    Browser context borrowed from the pool together with its page
+    """
+
+    __slots__ = ("browser", "context", "page", "uses")
+
+    def __init__(self, browser, context, page):
+        self.browser = browser
+        self.context = context
+        self.page = page
+        self.uses = 1
+
+
+class BrowserPool:
+    """
+    Class launching bounded number of browsers and lending their contexts,
+    like :   acquire
+            release
+            close
+            shared
+
+    Sync playwright is bound to the thread which started it, so one pool
+    should be used only from one thread.
+    """
+
+    _shared: Optional["BrowserPool"] = None
+
+    def __init__(
+        self,
+        max_browsers: int = 1,
+        max_context_uses: int = 20,
+        browser_name: str = "firefox",
+        launch_options: Optional[dict] = None,
+        server_state_file: Optional[str] = DEFAULT_STATE_FILE,
+    ):
+        self._max_browsers: int = max(1, max_browsers)
+        self._max_context_uses: int = max(1, max_context_uses)
+        self._browser_name: str = browser_name
+        self._launch_options: dict = (
+            dict(DEFAULT_LAUNCH_OPTIONS) if launch_options is None else launch_options
+        )
+        # None disables connecting to browser server
+        self._server_state_file: Optional[str] = server_state_file
+        self._playwright: Optional[Playwright] = None
+        self._browsers: List[Browser] = []
+        self._idle: List[PooledContext] = []
+
+    @classmethod
+    def from_launch_profile(
+        cls, launch_profile: LaunchProfile, *args, **kwargs
+    ) -> "BrowserPool":
+        """
+        Method used for creating pool launching browsers described by launch profile
+
+        :param launch_profile: engine, headless and slow_mo of launched browsers
+        :param args: other positional arguments of the pool
+        :param kwargs: other keyword arguments of the pool
+        :return: new pool
+        """
+        return cls(
+            *args,
+            browser_name=launch_profile.engine,
+            launch_options=launch_profile.launch_options(),
+            **kwargs,
+        )
+
+    @classmethod
+    def shared(cls) -> "BrowserPool":
+        """
+        Method used for getting the pool shared by whole process,
+        browsers are launched by SEZNAM_LAUNCH_PROFILE (default "firefox:headed:1"),
+        the pool is closed automatically when the interpreter exits
+
+        :return: process wide instance of BrowserPool
+        """
+        if cls._shared is None:
+            cls._shared = cls.from_launch_profile(LaunchProfile.from_environment())
+            atexit.register(cls._shared.close)
+        return cls._shared
+
+    def _launch(self) -> Browser:
+        browser_type = getattr(self._playwright, self._browser_name)
+        endpoint = (
+            find_endpoint(self._server_state_file) if self._server_state_file else None
+        )
+        if endpoint is not None:
+            try:
+                return browser_type.connect(
+                    endpoint,
+                    timeout=CONNECT_TIMEOUT,
+                    slow_mo=self._launch_options.get("slow_mo"),
+                    headers=connect_headers(self._browser_name, self._launch_options),
+                )
+            except Error:
+                pass
+        return browser_type.launch(**self._launch_options)
+
+    def _pick_browser(self) -> Browser:
+        self._browsers = [
+            browser for browser in self._browsers if browser.is_connected()
+        ]
+        if self._playwright is None:
+            self._playwright = sync_playwright().start()
+        least_used = min(
+            self._browsers, key=lambda browser: len(browser.contexts), default=None
+        )
+        if least_used is None or (
+            least_used.contexts and len(self._browsers) < self._max_browsers
+        ):
+            least_used = self._launch()
+            self._browsers.append(least_used)
+        return least_used
+
+    def _reset(self, lease: PooledContext) -> bool:
+        # localStorage is cleared for every origin which stored something,
+        # new page drops sessionStorage of all origins, IndexedDB, service workers
+        # and HTTP cache are kept, release(discard=True) gives full isolation
+        try:
+            origins = [
+                origin["origin"] for origin in lease.context.storage_state()["origins"]
+            ]
+            page = lease.context.new_page()
+            for old_page in lease.context.pages:
+                if old_page != page:
+                    old_page.close()
+            lease.page = page
+            if origins:
+                page.route(f"**{RESET_PATH}", _fulfill_blank)
+                for origin in origins:
+                    page.goto(origin + RESET_PATH)
+                    page.evaluate(RESET_STORAGE_SCRIPT)
+                page.unroute(f"**{RESET_PATH}")
+                page.goto("about:blank")
+            lease.context.clear_cookies()
+            lease.context.clear_permissions()
+            return True
+        except Error:
+            return False
+
+    @staticmethod
+    def _close_context(lease: PooledContext) -> None:
+        try:
+            lease.context.close()
+        except Error:
+            pass
+
+    def acquire(self) -> PooledContext:
+        """
+        Method used for borrowing isolated browser context with opened page
+
+        :return: PooledContext - browser, context and page which can be used by caller
+        """
+        while self._idle:
+            lease = self._idle.pop()
+            if lease.browser.is_connected():
+                lease.uses += 1
+                return lease
+        browser = self._pick_browser()
+        context: BrowserContext = browser.new_context()
+        page: Page = context.new_page()
+        return PooledContext(browser, context, page)
+
+    def release(self, lease: PooledContext, discard: bool = False) -> None:
+        """
+        Method used for returning borrowed context back to the pool,
+        context is closed instead of reused when it reaches recycle limit
+
+        :param lease: context borrowed by acquire
+        :param discard: True - context is closed and never reused
+        """
+        if discard or lease.uses >= self._max_context_uses or not self._reset(lease):
+            self._close_context(lease)
+            return
+        self._idle.append(lease)
+
+    def close(self) -> None:
+        """
+        Method used to close all contexts, browsers and stop sync_playwright(),
+        browsers of browser server are only disconnected and keep running
+        """
+        for lease in self._idle:
+            self._close_context(lease)
+        self._idle = []
+        for browser in self._browsers:
+            try:
+                browser.close()
+            except Error:
+                pass
+        self._browsers = []
+        if self._playwright is not None:
+            self._playwright.stop()
+            self._playwright = None
+        if BrowserPool._shared is self:
+            BrowserPool._shared = None
+
+
+class AsyncBrowserPool:
+    """
+    Asyncio variant of BrowserPool,
+    like :   acquire
+            release
+            close
+    """
+
+    def __init__(
+        self,
+        max_browsers: int = 1,
+        max_context_uses: int = 20,
+        browser_name: str = "firefox",
+        launch_options: Optional[dict] = None,
+        server_state_file: Optional[str] = DEFAULT_STATE_FILE,
+    ):
+        self._max_browsers: int = max(1, max_browsers)
+        self._max_context_uses: int = max(1, max_context_uses)
+        self._browser_name: str = browser_name
+        self._launch_options: dict = (
+            dict(DEFAULT_LAUNCH_OPTIONS) if launch_options is None else launch_options
+        )
+        self._server_state_file: Optional[str] = server_state_file
+        self._playwright: Optional[AsyncPlaywright] = None
+        self._browsers: List[AsyncBrowser] = []
+        self._idle: List[PooledContext] = []
+        self._lock: Optional[asyncio.Lock] = None
+
+    @classmethod
+    def from_launch_profile(
+        cls, launch_profile: LaunchProfile, *args, **kwargs
+    ) -> "AsyncBrowserPool":
+        """
+        Method used for creating pool launching browsers described by launch profile
+
+        :param launch_profile: engine, headless and slow_mo of launched browsers
+        :param args: other positional arguments of the pool
+        :param kwargs: other keyword arguments of the pool
+        :return: new pool
+        """
+        return cls(
+            *args,
+            browser_name=launch_profile.engine,
+            launch_options=launch_profile.launch_options(),
+            **kwargs,
+        )
+
+    async def _launch(self) -> AsyncBrowser:
+        browser_type = getattr(self._playwright, self._browser_name)
+        endpoint = (
+            find_endpoint(self._server_state_file) if self._server_state_file else None
+        )
+        if endpoint is not None:
+            try:
+                return await browser_type.connect(
+                    endpoint,
+                    timeout=CONNECT_TIMEOUT,
+                    slow_mo=self._launch_options.get("slow_mo"),
+                    headers=connect_headers(self._browser_name, self._launch_options),
+                )
+            except AsyncError:
+                pass
+        return await browser_type.launch(**self._launch_options)
+
+    async def _pick_browser(self) -> AsyncBrowser:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            self._browsers = [
+                browser for browser in self._browsers if browser.is_connected()
+            ]
+            if self._playwright is None:
+                self._playwright = await async_playwright().start()
+            least_used = min(
+                self._browsers, key=lambda browser: len(browser.contexts), default=None
+            )
+            if least_used is None or (
+                least_used.contexts and len(self._browsers) < self._max_browsers
+            ):
+                least_used = await self._launch()
+                self._browsers.append(least_used)
+            return least_used
+
+    async def _reset(self, lease: PooledContext) -> bool:
+        try:
+            state = await lease.context.storage_state()
+            origins = [origin["origin"] for origin in state["origins"]]
+            page = await lease.context.new_page()
+            for old_page in lease.context.pages:
+                if old_page != page:
+                    await old_page.close()
+            lease.page = page
+            if origins:
+                await page.route(f"**{RESET_PATH}", _fulfill_blank_async)
+                for origin in origins:
+                    await page.goto(origin + RESET_PATH)
+                    await page.evaluate(RESET_STORAGE_SCRIPT)
+                await page.unroute(f"**{RESET_PATH}")
+                await page.goto("about:blank")
+            await lease.context.clear_cookies()
+            await lease.context.clear_permissions()
+            return True
+        except AsyncError:
+            return False
+
+    @staticmethod
+    async def _close_context(lease: PooledContext) -> None:
+        try:
+            await lease.context.close()
+        except AsyncError:
+            pass
+
+    async def acquire(self) -> PooledContext:
+        """
+        Method used for borrowing isolated browser context with opened page
+
+        :return: PooledContext - browser, context and page which can be used by caller
+        """
+        while self._idle:
+            lease = self._idle.pop()
+            if lease.browser.is_connected():
+                lease.uses += 1
+                return lease
+        browser = await self._pick_browser()
+        context: AsyncBrowserContext = await browser.new_context()
+        page: AsyncPage = await context.new_page()
+        return PooledContext(browser, context, page)
+
+    async def release(self, lease: PooledContext, discard: bool = False) -> None:
+        """
+        Method used for returning borrowed context back to the pool,
+        context is closed instead of reused when it reaches recycle limit
+
+        :param lease: context borrowed by acquire
+        :param discard: True - context is closed and never reused
+        """
+        if (
+            discard
+            or lease.uses >= self._max_context_uses
+            or not await self._reset(lease)
+        ):
+            await self._close_context(lease)
+            return
+        self._idle.append(lease)
+
+    async def close(self) -> None:
+        """
+        Method used to close all contexts, browsers and stop async_playwright()
+        """
+        for lease in self._idle:
+            await self._close_context(lease)
+        self._idle = []
+        for browser in self._browsers:
+            try:
+                await browser.close()
+            except AsyncError:
+                pass
+        self._browsers = []
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+
+def profile_directory(profile: str, directory: str = DEFAULT_PROFILE_DIR) -> str:
+    """
+    Function to get user data directory of profile
+
+    :param profile: name of profile, e.g. credential name of account
+    :param directory: folder with all profiles
+    :return: path to user data directory
+    """
+    return os.path.join(directory, re.sub(r"[^A-Za-z0-9_.-]", "_", profile))
+
+
+class ProfilePool(BrowserPool):
+    """
+    Pool lending one persistent context launched with user data directory of profile,
+    like :   acquire
+            release
+            close
+
+    Browser locks its user data directory, so the context can be borrowed
+    only once at a time and profile should not be shared between processes.
+    Cookies and storage are cleared like in BrowserPool, disk cache is kept.
+    """
+
+    def __init__(
+        self,
+        profile: str,
+        directory: str = DEFAULT_PROFILE_DIR,
+        max_context_uses: int = 20,
+        browser_name: str = "firefox",
+        launch_options: Optional[dict] = None,
+    ):
+        """
+        :param profile: name of profile, e.g. credential name of account
+        :param directory: folder with user data directories of all profiles
+        """
+        super().__init__(
+            1, max_context_uses, browser_name, launch_options, server_state_file=None
+        )
+        self._user_data_dir: str = profile_directory(profile, directory)
+        self._borrowed: bool = False
+
+    def acquire(self) -> PooledContext:
+        """
+        Method used for borrowing persistent context with opened page
+
+        :return: PooledContext - context and page, browser is None for persistent context
+        """
+        if self._borrowed:
+            raise RuntimeError(f"Profile {self._user_data_dir} is already borrowed")
+        lease = self._idle.pop() if self._idle else None
+        if lease is not None and lease.page.is_closed():
+            lease = None
+        if lease is not None:
+            lease.uses += 1
+        else:
+            if self._playwright is None:
+                self._playwright = sync_playwright().start()
+            os.makedirs(self._user_data_dir, exist_ok=True)
+            context: BrowserContext = getattr(
+                self._playwright, self._browser_name
+            ).launch_persistent_context(self._user_data_dir, **self._launch_options)
+            page: Page = context.pages[0] if context.pages else context.new_page()
+            lease = PooledContext(None, context, page)
+            # session of previous run is stored in the profile too
+            if not self._reset(lease):
+                self._close_context(lease)
+                raise RuntimeError(f"Profile {self._user_data_dir} can not be reset")
+        self._borrowed = True
+        return lease
+
+    def release(self, lease: PooledContext, discard: bool = False) -> None:
+        """
+        Method used for returning borrowed context, closed context is launched
+        again from the same user data directory by next acquire
+
+        :param lease: context borrowed by acquire
+        :param discard: True - context is closed and never reused
+        """
+        self._borrowed = False
+        super().release(lease, discard)
+
+
+class AsyncProfilePool(AsyncBrowserPool):
+    """
+    Asyncio variant of ProfilePool,
+    like :   acquire
+            release
+            close
+    """
+
+    def __init__(
+        self,
+        profile: str,
+        directory: str = DEFAULT_PROFILE_DIR,
+        max_context_uses: int = 20,
+        browser_name: str = "firefox",
+        launch_options: Optional[dict] = None,
+    ):
+        """
+        :param profile: name of profile, e.g. credential name of account
+        :param directory: folder with user data directories of all profiles
+        """
+        super().__init__(
+            1, max_context_uses, browser_name, launch_options, server_state_file=None
+        )
+        self._user_data_dir: str = profile_directory(profile, directory)
+        self._borrowed: bool = False
+
+    async def acquire(self) -> PooledContext:
+        """
+        Method used for borrowing persistent context with opened page
+
+        :return: PooledContext - context and page, browser is None for persistent context
+        """
+        if self._borrowed:
+            raise RuntimeError(f"Profile {self._user_data_dir} is already borrowed")
+        self._borrowed = True
+        lease = self._idle.pop() if self._idle else None
+        if lease is not None and lease.page.is_closed():
+            lease = None
+        if lease is not None:
+            lease.uses += 1
+            return lease
+        try:
+            if self._playwright is None:
+                self._playwright = await async_playwright().start()
+            os.makedirs(self._user_data_dir, exist_ok=True)
+            context: AsyncBrowserContext = await getattr(
+                self._playwright, self._browser_name
+            ).launch_persistent_context(self._user_data_dir, **self._launch_options)
+            page: AsyncPage = (
+                context.pages[0] if context.pages else await context.new_page()
+            )
+            lease = PooledContext(None, context, page)
+            # session of previous run is stored in the profile too
+            if not await self._reset(lease):
+                await self._close_context(lease)
+                raise RuntimeError(f"Profile {self._user_data_dir} can not be reset")
+        except BaseException:
+            self._borrowed = False
+            raise
+        return lease
+
+    async def release(self, lease: PooledContext, discard: bool = False) -> None:
+        """
+        Method used for returning borrowed context, closed context is launched
+        again from the same user data directory by next acquire
+
+        :param lease: context borrowed by acquire
+        :param discard: True - context is closed and never reused
+        """
+        self._borrowed = False
+        await super().release(lease, discard)
@@ -0,0 +1,318 @@
+"""
+Python module with long-lived Playwright browser server and discovery of its endpoint.
+
+BrowserServer runs "playwright run-server" in browser reusing mode, checks its
+health, restarts it when it dies and publishes endpoint into state file.
+BrowserPool reads the state file and connects to the running server instead of
+launching its own browser, so repeated runs skip browser start-up.
+Supervisor is stopped through stop file next to the state file, so it can
+stop the server and remove the state file on Windows as well as on POSIX.
+"""
+
+import ctypes
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from typing import Optional
+
+from helpers.paths import CACHE_DIR
+
+try:
+    import psutil
+except ImportError:  # liveness is checked by OS specific calls without psutil
+    psutil = None
+
+DEFAULT_STATE_FILE = os.path.join(CACHE_DIR, "browser_server.json")
+DEFAULT_PORT = 3789
+
+_WINDOWS_STILL_ACTIVE = 259
+_WINDOWS_QUERY_LIMITED_INFORMATION = 0x1000
+
+
+def _windows_process_alive(pid: int) -> bool:
+    # os.kill(pid, 0) would send CTRL_C_EVENT on Windows
+    kernel32 = ctypes.windll.kernel32
+    handle = kernel32.OpenProcess(_WINDOWS_QUERY_LIMITED_INFORMATION, False, pid)
+    if not handle:
+        return False
+    try:
+        exit_code = ctypes.c_ulong()
+        if not kernel32.GetExitCodeProcess(handle, ctypes.byref(exit_code)):
+            return False
+        return exit_code.value == _WINDOWS_STILL_ACTIVE
+    finally:
+        kernel32.CloseHandle(handle)
+
+
+def _process_alive(pid: int) -> bool:
+    if pid <= 0:
+        return False
+    if psutil is not None:
+        return psutil.pid_exists(pid)
+    if sys.platform == "win32":
+        return _windows_process_alive(pid)
+    try:
+        os.kill(pid, 0)
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+    return True
+
+
+def stop_file_path(state_file: str = DEFAULT_STATE_FILE) -> str:
+    """
+    Function to get path of file which asks supervisor to stop the server
+
+    :param state_file: file written by BrowserServer
+    :return: path of the stop file
+    """
+    return f"{state_file}.stop"
+
+
+def request_stop(state_file: str = DEFAULT_STATE_FILE, timeout: float = 30) -> bool:
+    """
+    Function to ask running supervisor to stop the server and wait until it is done
+
+    :param state_file: file written by BrowserServer
+    :param timeout: number of seconds to wait for removal of the state file
+    :return: True - if server stopped, False - if it did not stop in time
+    """
+    with open(stop_file_path(state_file), "w", encoding="utf-8"):
+        pass
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if read_state(state_file) is None:
+            return True
+        time.sleep(0.2)
+    return False
+
+
+def port_open(host: str, port: int, timeout: float = 0.2) -> bool:
+    """
+    Function to check if server accepts connections
+
+    :param host: host of server
+    :param port: port of server
+    :param timeout: number of seconds to wait for connection
+    :return: True - if connection was accepted
+    """
+    try:
+        with socket.create_connection((host, port), timeout=timeout):
+            return True
+    except OSError:
+        return False
+
+
+def read_state(state_file: str = DEFAULT_STATE_FILE) -> Optional[dict]:
+    """
+    Function to read state of running browser server
+
+    :param state_file: file written by BrowserServer
+    :return: state with ws_endpoint, host, port and pids, None if server does not run
+    """
+    try:
+        with open(state_file, encoding="utf-8") as file:
+            state = json.load(file)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(state, dict) or not _process_alive(int(state.get("pid", 0))):
+        return None
+    return state
+
+
+def find_endpoint(state_file: str = DEFAULT_STATE_FILE) -> Optional[str]:
+    """
+    Function to get endpoint of healthy browser server
+
+    :param state_file: file written by BrowserServer
+    :return: ws endpoint, None when no healthy server is running
+    """
+    if os.environ.get("SEZNAM_BROWSER_SERVER", "").lower() == "off":
+        return None
+    state = read_state(state_file)
+    if state is None or not port_open(state["host"], state["port"]):
+        return None
+    return state["ws_endpoint"]
+
+
+def connect_headers(browser_name: str, launch_options: dict) -> dict:
+    """
+    Function to build headers telling browser server which browser to provide
+
+    :param browser_name: firefox, chromium or webkit
+    :param launch_options: options of browser launch, e.g. headless
+    :return: headers for BrowserType.connect
+    """
+    options = {key: value for key, value in launch_options.items() if key != "slow_mo"}
+    return {
+        "x-playwright-browser": browser_name,
+        "x-playwright-launch-options": json.dumps(options),
+    }
+
+
+class BrowserServer:
+    """
+    Supervised "playwright run-server" process,
+    like :   start
+            healthy
+            supervise
+            stop
+    """
+
+    def __init__(
+        self,
+        port: int = DEFAULT_PORT,
+        host: str = "127.0.0.1",
+        state_file: str = DEFAULT_STATE_FILE,
+        reuse_browser: bool = True,
+    ):
+        """
+        :param port: port of the server
+        :param host: interface which server listens on
+        :param state_file: file where endpoint is published for BrowserPool
+        :param reuse_browser: True - browser is kept running between connections
+        """
+        self.host: str = host
+        self.port: int = port
+        self.state_file: str = state_file
+        self.stop_file: str = stop_file_path(state_file)
+        self._reuse_browser: bool = reuse_browser
+        self._process: Optional[subprocess.Popen] = None
+        self.restarts: int = 0
+
+    @property
+    def ws_endpoint(self) -> str:
+        return f"ws://{self.host}:{self.port}/"
+
+    def _write_state(self) -> None:
+        os.makedirs(os.path.dirname(self.state_file), exist_ok=True)
+        temporary_path = self.state_file + ".tmp"
+        with open(temporary_path, "w", encoding="utf-8") as file:
+            json.dump(
+                {
+                    "ws_endpoint": self.ws_endpoint,
+                    "host": self.host,
+                    "port": self.port,
+                    "pid": os.getpid(),
+                    "server_pid": self._process.pid if self._process else None,
+                    "started": time.time(),
+                },
+                file,
+            )
+        os.replace(temporary_path, self.state_file)
+
+    def start(self, timeout: float = 30) -> bool:
+        """
+        Method used for starting server and waiting until it accepts connections
+
+        :param timeout: number of seconds to wait for the server
+        :return: True - if server is ready, False - if it did not start in time
+        """
+        command = [
+            sys.executable,
+            "-m",
+            "playwright",
+            "run-server",
+            "--host",
+            self.host,
+            "--port",
+            str(self.port),
+        ]
+        if self._reuse_browser:
+            command += ["--mode", "extension"]
+        self._remove(self.stop_file)
+        self._process = subprocess.Popen(command)
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self._process.poll() is not None:
+                return False
+            if port_open(self.host, self.port):
+                self._write_state()
+                return True
+            time.sleep(0.1)
+        return False
+
+    def healthy(self) -> bool:
+        """
+        Method used for checking if server process runs and accepts connections
+
+        :return: True - if server is healthy
+        """
+        return (
+            self._process is not None
+            and self._process.poll() is None
+            and port_open(self.host, self.port, timeout=1)
+        )
+
+    def _terminate(self) -> None:
+        if self._process is None:
+            return
+        self._process.terminate()
+        try:
+            self._process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self._process.kill()
+            self._process.wait()
+        self._process = None
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def stop_requested(self) -> bool:
+        """
+        Method used for checking if stop was requested by request_stop
+
+        :return: True - if stop file exists
+        """
+        return os.path.exists(self.stop_file)
+
+    def _wait(self, seconds: float) -> bool:
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            if self.stop_requested():
+                return False
+            time.sleep(min(0.2, max(deadline - time.monotonic(), 0)))
+        return not self.stop_requested()
+
+    def supervise(self, interval: float = 2, failures_before_restart: int = 3) -> None:
+        """
+        Method used for checking health of server and restarting it until stop is requested,
+        restarts are delayed by growing backoff when server keeps failing
+
+        :param interval: number of seconds between health checks
+        :param failures_before_restart: number of failed checks which trigger restart
+        """
+        failures = 0
+        backoff = 1.0
+        while self._wait(interval):
+            if self.healthy():
+                failures = 0
+                backoff = 1.0
+                continue
+            failures += 1
+            process_died = self._process is None or self._process.poll() is not None
+            if not process_died and failures < failures_before_restart:
+                continue
+            self._terminate()
+            if not self._wait(backoff):
+                return
+            backoff = min(backoff * 2, 60.0)
+            self.restarts += 1
+            if self.start():
+                failures = 0
+
+    def stop(self) -> None:
+        """
+        Method used for stopping server and removing its state and stop files
+        """
+        self._terminate()
+        self._remove(self.state_file)
+        self._remove(self.stop_file)
@@ -0,0 +1,98 @@
+"""
+Python module with deadline budget shared by all steps of one flow.
+
+Flow activates Deadline, every wait of its steps gets at most the remaining
+budget and no further wait is started once the budget is used up.
+"""
+
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+_CURRENT: contextvars.ContextVar = contextvars.ContextVar("deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    """
+    Raised when step wants to wait and budget of the flow is already used up
+    """
+
+
+class Deadline:
+    """
+    Time budget of one flow,
+    like :   remaining
+            expired
+            clamp
+            activate
+            current
+    """
+
+    def __init__(self, seconds: float):
+        """
+        :param seconds: budget of the flow in seconds
+        """
+        self.budget: float = seconds
+        self.expires: float = time.monotonic() + seconds
+        self.exhausted_by: Optional[str] = None
+
+    def remaining(self) -> float:
+        """
+        Method used for getting rest of the budget
+
+        :return: number of seconds, 0.0 when budget is used up
+        """
+        return max(0.0, self.expires - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        """
+        True when whole budget is used up
+        """
+        return self.remaining() <= 0
+
+    def clamp(self, timeout: float) -> float:
+        """
+        Method used for limiting timeout of one wait by remaining budget
+
+        :param timeout: number of milliseconds requested by the wait
+        :return: number of milliseconds which wait may take
+        """
+        remaining = self.remaining() * 1000
+        if remaining <= 0:
+            raise DeadlineExceeded(f"Deadline of {self.budget:g} s exceeded")
+        return min(timeout, remaining)
+
+    @contextmanager
+    def activate(self) -> Iterator["Deadline"]:
+        """
+        Method used for making deadline current for the block of code
+
+        :return: the deadline itself
+        """
+        token = _CURRENT.set(self)
+        try:
+            yield self
+        finally:
+            _CURRENT.reset(token)
+
+    @staticmethod
+    def current() -> Optional["Deadline"]:
+        """
+        Method used for getting deadline of running flow
+
+        :return: active Deadline, None outside of flow with budget
+        """
+        return _CURRENT.get()
+
+
+def clamp_timeout(timeout: float) -> float:
+    """
+    Function to limit timeout by deadline of running flow
+
+    :param timeout: number of milliseconds requested by the wait
+    :return: number of milliseconds which wait may take
+    """
+    deadline = Deadline.current()
+    return timeout if deadline is None else deadline.clamp(timeout)
@@ -0,0 +1,163 @@
+"""
+Python module for lazy loading of email contexts.
+
+Contexts are read one by one from .json, .jsonl files or directory of such files,
+every record is validated and attachment path is resolved relative to its file.
+Attachment can be also object describing in-memory or generated content.
+"""
+
+import json
+import os
+from typing import Iterator, Optional, Tuple, Union
+
+from helpers.attachments import Attachment, parse_attachment
+
+SCHEMA = {
+    "subject": str,
+    "message": str,
+    "attachment": (str, dict),
+    "receiver_email": str,
+}
+CONTEXT_SUFFIXES = (".json", ".jsonl")
+
+
+class InvalidEmailContext(ValueError):
+    """
+    Raised when email context does not match SCHEMA
+    """
+
+
+class EmailContext:
+    """
+    Validated email context, attachment is absolute path or Attachment
+    """
+
+    __slots__ = ("subject", "message", "attachment", "receiver_email", "source")
+
+    def __init__(
+        self,
+        subject: str,
+        message: str,
+        attachment: Union[str, Attachment],
+        receiver_email: str,
+        source: str = "",
+    ):
+        self.subject: str = subject
+        self.message: str = message
+        self.attachment: Union[str, Attachment] = attachment
+        self.receiver_email: str = receiver_email
+        self.source: str = source
+
+    def as_tuple(self) -> Tuple[str, str, Union[str, Attachment], str]:
+        """
+        Method used for getting context in order returned by EmailInputs.load_email_context
+
+        :return: subject, message, attachment, receiver_email
+        """
+        return self.subject, self.message, self.attachment, self.receiver_email
+
+
+def parse_email_context(record, base_dir: str, source: str = "") -> EmailContext:
+    """
+    Function to validate one record and convert it into EmailContext
+
+    :param record: dictionary loaded from json
+    :param base_dir: folder which relative attachment path is resolved against
+    :param source: description of record origin used in error messages, e.g. file:line
+    :return: validated EmailContext
+    """
+    if not isinstance(record, dict):
+        raise InvalidEmailContext(f"{source}: email context has to be JSON object")
+    for key, expected_type in SCHEMA.items():
+        if key not in record:
+            raise InvalidEmailContext(f"{source}: missing key '{key}'")
+        if not isinstance(record[key], expected_type):
+            kinds = (
+                expected_type if isinstance(expected_type, tuple) else (expected_type,)
+            )
+            names = " or ".join(kind.__name__ for kind in kinds)
+            raise InvalidEmailContext(f"{source}: key '{key}' has to be {names}")
+    attachment = record["attachment"]
+    if isinstance(attachment, dict):
+        try:
+            attachment = parse_attachment(attachment)
+        except ValueError as error:
+            raise InvalidEmailContext(f"{source}: {error}") from error
+    elif not os.path.isabs(attachment):
+        attachment = os.path.normpath(os.path.join(base_dir, attachment))
+    return EmailContext(
+        record["subject"],
+        record["message"],
+        attachment,
+        record["receiver_email"],
+        source,
+    )
+
+
+def _iter_records(path: str) -> Iterator[Tuple[object, str, Optional[str]]]:
+    with open(path, encoding="utf-8") as file:
+        if path.endswith(".jsonl"):
+            for line_number, line in enumerate(file, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    yield json.loads(line), f"{path}:{line_number}", None
+                except ValueError as error:
+                    yield None, f"{path}:{line_number}", str(error)
+            return
+        try:
+            content = json.load(file)
+        except ValueError as error:
+            yield None, path, str(error)
+            return
+    if isinstance(content, list):
+        for index, record in enumerate(content):
+            yield record, f"{path}[{index}]", None
+    else:
+        yield content, path, None
+
+
+def _iter_files(path: str) -> Iterator[str]:
+    if not os.path.isdir(path):
+        yield path
+        return
+    for entry in sorted(os.scandir(path), key=lambda entry: entry.name):
+        if entry.is_file() and entry.name.endswith(CONTEXT_SUFFIXES):
+            yield entry.path
+
+
+def iter_email_contexts(
+    path: str, skip_invalid: bool = False
+) -> Iterator[EmailContext]:
+    """
+    Function to lazily iterate over email contexts
+
+    :param path: .json file (object or list of objects), .jsonl file (object per line)
+                 or directory with such files
+    :param skip_invalid: True - invalid records are skipped
+                         False - InvalidEmailContext is raised for invalid record
+    :return: iterator of validated EmailContext
+    """
+    for file_path in _iter_files(path):
+        base_dir = os.path.dirname(os.path.abspath(file_path))
+        for record, source, error in _iter_records(file_path):
+            try:
+                if error is not None:
+                    raise InvalidEmailContext(f"{source}: {error}")
+                yield parse_email_context(record, base_dir, source)
+            except InvalidEmailContext:
+                if not skip_invalid:
+                    raise
+
+
+def load_first_email_context(path: str) -> Optional[EmailContext]:
+    """
+    Function to load the first valid email context
+
+    :param path: path accepted by iter_email_contexts
+    :return: EmailContext, None in case path does not contain valid context
+    """
+    try:
+        return next(iter_email_contexts(path), None)
+    except (OSError, InvalidEmailContext):
+        return None
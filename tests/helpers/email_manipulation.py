@@ -2,21 +2,41 @@
 Python module for manipulation with seznam email.
 """
 
-import os
-import json
 import time
-from typing import Tuple, Optional
+from typing import Dict, Iterable, Iterator, List, Tuple, Optional, Union
+from urllib.parse import urljoin
 import keyring
 
 from playwright.sync_api import (
-    sync_playwright,
     TimeoutError as PlaywrightTimeoutError,
+    BrowserContext,
     Error,
     Page,
-    Playwright,
-    Browser,
 )
 
+from helpers.arrival_watcher import ArrivalWatcher
+from helpers.attachments import Attachment, as_attachment, digest, iter_file
+from helpers.batch_report import BatchReport
+from helpers.browser_pool import BrowserPool, PooledContext
+from helpers.deadline import DeadlineExceeded, clamp_timeout
+from helpers.email_context import (
+    EmailContext,
+    iter_email_contexts,
+    load_first_email_context,
+)
+from helpers.har_network import HarNetwork
+from helpers.inbox_index import SCAN_MESSAGE_LIST_SCRIPT, InboxEntry, InboxIndex
+from helpers.instrumentation import FLOW, RESOURCE, StepHook, StepRecorder, recorded
+from helpers.page_elements import NAVIGATION_TIMEOUT, SeznamPage
+from helpers.request_routing import RequestRouter
+from helpers.resource_monitor import JS_HEAP_SCRIPT, ResourceMonitor
+from helpers.session_cache import RESTORE_PATH, RESTORE_STORAGE_SCRIPT, SessionCache
+from helpers.url_cache import UrlCache
+from helpers.verification import VerificationBackend
+
+INBOX_URL = "https://email.seznam.cz/"
+LOGIN_PAGE = "login_page"
+
 
 class SeznamEmail:
     """
@@ -26,252 +46,415 @@ class SeznamEmail:
             logout
             check_successful_logout
             send_email
+            send_emails
             check_last_received_email
+            check_received_emails
+            add_step_hook
             clear
     """
 
-    def __init__(self):
-        self._playwright: Playwright = sync_playwright().start()
-        self._browser: Browser = self._playwright.firefox.launch(
-            headless=False, slow_mo=1
+    def __init__(
+        self,
+        pool: Optional[BrowserPool] = None,
+        session_cache: Optional[SessionCache] = None,
+        router: Optional[RequestRouter] = None,
+        network: Optional[HarNetwork] = None,
+        recorder: Optional[StepRecorder] = None,
+        verification_backend: Optional[VerificationBackend] = None,
+        resource_monitor: Optional[ResourceMonitor] = None,
+        url_cache: Optional[UrlCache] = None,
+    ):
+        self._recorder: StepRecorder = (
+            recorder if recorder is not None else StepRecorder.shared()
+        )
+        self._pool: BrowserPool = pool if pool is not None else BrowserPool.shared()
+        self._network: HarNetwork = network if network is not None else HarNetwork()
+        self._router: Optional[RequestRouter] = router
+        self._use_lease(self._pool.acquire())
+        self._resource_monitor: Optional[ResourceMonitor] = resource_monitor
+        self._step_hooks: List[StepHook] = []
+        self._session_cache: SessionCache = (
+            session_cache if session_cache is not None else SessionCache()
         )
-        self._page: Page = self._browser.new_page()
+        self._url_cache: UrlCache = url_cache if url_cache is not None else UrlCache()
+        self._pending_session: Optional[str] = None
+        self._session_name: Optional[str] = None
+        self._arrival_baselines: Dict[Tuple[str, str], int] = {}
+        self._verification_backend: Optional[VerificationBackend] = verification_backend
+
+    def _use_lease(self, lease: PooledContext) -> None:
+        self._lease: PooledContext = lease
+        self._page: Page = lease.page
+        self._ui: SeznamPage = SeznamPage(self._page, self._recorder)
+        self._network.attach(lease.context)
+        if self._router is not None:
+            self._router.attach(lease.context)
+
+    def _recycle_context(self, reason: str) -> None:
+        with self._recorder.measure("recycle_context", RESOURCE) as record:
+            record.details["reason"] = reason
+            try:
+                cookies = self._lease.context.cookies()
+                url = self._page.url
+            except Error:
+                cookies, url = [], ""
+            if self._router is not None:
+                self._router.detach(self._lease.context)
+            self._pool.release(self._lease, discard=True)
+            self._use_lease(self._pool.acquire())
+            self._resource_monitor.recycled()
+            try:
+                # logged in session survives in cookies of the old context
+                if cookies:
+                    self._lease.context.add_cookies(cookies)
+                if url.startswith("http"):
+                    self._ui.goto(url, wait_until="domcontentloaded")
+                record.outcome = "pass"
+            except Error:
+                record.outcome = "fail"
+
+    def _maintain_resources(self) -> None:
+        if self._resource_monitor is None:
+            return
+        try:
+            js_heap = self._page.evaluate(JS_HEAP_SCRIPT)
+        except Error:
+            js_heap = None
+        reason = self._resource_monitor.flow_started(js_heap)
+        if reason is not None:
+            self._recycle_context(reason)
+
+    def _restore_session(self, session_name: str) -> bool:
+        storage_state = self._session_cache.load(session_name)
+        if storage_state is None:
+            return False
+        try:
+            self._lease.context.add_cookies(storage_state["cookies"])
+            self._restore_local_storage(storage_state.get("origins", []))
+            self._ui.goto(INBOX_URL, wait_until="domcontentloaded")
+            self._ui.wait_visible("new_email_link")
+            return True
+        except Error:
+            self._session_cache.invalidate(session_name)
+            self._lease.context.clear_cookies()
+            return False
 
-    def _fill_user_name(self, email: str) -> bool:
+    def _restore_local_storage(self, origins: List[dict]) -> None:
+        if not origins:
+            return
+        self._page.route(
+            f"**{RESTORE_PATH}",
+            lambda route: route.fulfill(body="", content_type="text/html"),
+        )
         try:
-            self._page.wait_for_selector(
-                "#login-username", state="visible", timeout=5000
-            )
-            user_name_field = self._page.locator("#login-username")
-            user_name_field.fill(email)
+            for origin in origins:
+                self._page.goto(
+                    origin["origin"] + RESTORE_PATH,
+                    timeout=clamp_timeout(NAVIGATION_TIMEOUT),
+                )
+                self._page.evaluate(
+                    RESTORE_STORAGE_SCRIPT, origin.get("localStorage", [])
+                )
+        finally:
+            self._page.unroute(f"**{RESTORE_PATH}")
 
-            login_button = self._page.get_by_role("button", name="Continue")
-            self._page.wait_for_selector(
-                'button:has-text("Continue")', state="visible", timeout=5000
+    def _store_session(self) -> None:
+        if self._pending_session is None:
+            return
+        try:
+            self._session_cache.save(
+                self._pending_session, self._lease.context.storage_state()
             )
-            login_button.click()
+        except (Error, OSError):
+            pass
+        self._pending_session = None
+
+    def _record_arrival_baseline(self, subject: str, sender: str) -> None:
+        self._arrival_baselines[(subject, sender)] = ArrivalWatcher(
+            self._page, subject=subject, sender=sender
+        ).matching_count()
+
+    def _compose_email(
+        self,
+        receiver_email: str,
+        subject: str,
+        message: str,
+        path: Union[str, Attachment],
+    ) -> Tuple[bool, str]:
+        if not self._open_new_email():
+            return False, "Not able to open new email"
+        if not self._add_receiver(receiver_email):
+            return False, "Not able to add receiver"
+        if not self._add_subject(subject):
+            return False, "Not able to add subject"
+        if not self._add_attachment(path):
+            return False, "Not able to add attachment"
+        if not self._add_message(message):
+            return False, "Not able to add message"
+        if not self._click_to_send_email():
+            return False, "Not able to click on send email"
+        return True, "Email was sent successfully"
+
+    def _leave_compose(self) -> None:
+        # unfinished email would block opening of the next one
+        try:
+            self._page.keyboard.press("Escape")
+            self._ui.goto(INBOX_URL, wait_until="domcontentloaded")
+        except Error:
+            pass
+
+    @recorded()
+    def _fill_user_name(self, email: str) -> bool:
+        try:
+            self._ui.fill("user_name_field", email)
+            self._ui.click("continue_button")
             return True
         except PlaywrightTimeoutError:
             return False
 
+    @recorded(idempotent=True)
     def _go_to_login(self) -> bool:
         try:
-            self._page.wait_for_selector(
-                'div.gadget__content >> role=link[name="Přihlásit"]', state="visible"
-            )
-            login_button = self._page.locator("div.gadget__content").get_by_role(
-                "link", name="Přihlásit"
-            )
-            login_page_href = login_button.get_attribute("href")
+            login_page_href = self._ui.attribute("portal_login_link", "href")
             if login_page_href:
-                self._page.goto(login_page_href, wait_until="load")
+                login_page_url = urljoin(self._page.url, login_page_href)
+                self._ui.goto(login_page_url, wait_until="load")
+                self._url_cache.put(LOGIN_PAGE, login_page_url)
                 return True
             return False
         except PlaywrightTimeoutError:
             return False
 
+    @recorded()
+    def _go_to_cached_login(self, login_page_url: str) -> bool:
+        try:
+            self._ui.goto(login_page_url, wait_until="domcontentloaded")
+            self._ui.wait_visible("user_name_field")
+            return True
+        except Error:
+            self._url_cache.invalidate(LOGIN_PAGE)
+            return False
+
+    @recorded()
     def _fill_password(self, password: str) -> bool:
         try:
-            self._page.wait_for_selector(
-                "#login-password", state="visible", timeout=5000
-            )
-            password_name_field = self._page.locator("#login-password")
-            password_name_field.fill(password)
+            self._ui.fill("password_field", password)
             return True
         except PlaywrightTimeoutError:
             return False
 
+    @recorded(idempotent=True)
     def _go_to_seznam_page(self) -> bool:
         try:
-            self._page.goto("https://www.seznam.cz/", wait_until="load")
+            self._ui.goto("https://www.seznam.cz/", wait_until="load")
             return True
         except Error:
             return False
 
+    @recorded()
     def _click_login_button(self) -> bool:
         try:
-            self._page.wait_for_selector(
-                'button:has-text("Sign in")', state="visible", timeout=5000
-            )
-            login_button = self._page.get_by_role("button", name="Sign in")
-            login_button.click()
+            self._ui.click("sign_in_button")
             return True
         except PlaywrightTimeoutError:
             return False
 
+    @recorded()
     def _click_to_send_email(self):
         try:
-            self._page.wait_for_selector(
-                'role=button[name="Odeslat e-mail"]', state="visible", timeout=5000
-            )
-            send_email_button = self._page.get_by_role("button", name="Odeslat e-mail")
-            send_email_button.click()
+            self._ui.click("send_email_button")
             return True
         except PlaywrightTimeoutError:
             return False
 
+    @recorded()
     def _open_new_email(self):
         try:
-            self._page.wait_for_selector(
-                'role=link[name="Napsat e-mail"]', state="visible", timeout=5000
-            )
-            wrote_email_button = self._page.get_by_role("link", name="Napsat e-mail")
-            wrote_email_button.click()
+            self._ui.click("new_email_link")
             return True
         except PlaywrightTimeoutError:
             return False
 
+    @recorded()
     def _add_message(self, message: str) -> bool:
         try:
-            self._page.wait_for_selector(
-                'div.area.apply-styles[contenteditable="true"][placeholder="Text e-mailu…"]',
-                state="visible",
-            )
-            email_text = self._page.locator(
-                'div.area.apply-styles[contenteditable="true"][placeholder="Text e-mailu…"]'
-            )
-            email_text.fill(message)
+            self._ui.fill("message_field", message)
             return True
         except PlaywrightTimeoutError:
             return False
 
+    @recorded()
     def _add_subject(self, subject: str) -> bool:
         try:
-            self._page.wait_for_selector(
-                '[placeholder="Předmět…"]', state="visible", timeout=5000
-            )
-            email_subject = self._page.get_by_placeholder("Předmět…")
-            email_subject.fill(subject)
+            self._ui.fill("subject_field", subject)
             return True
         except PlaywrightTimeoutError:
             return False
 
-    def _add_attachment(self, path) -> bool:
+    @recorded()
+    def _add_attachment(self, path: Union[str, Attachment]) -> bool:
         try:
-            with self._page.expect_file_chooser() as fc_info:
-                self._page.wait_for_selector(
-                    '[aria-label="Přidat přílohu"]', state="visible", timeout=5000
-                )
-                self._page.get_by_label("Přidat přílohu").click()
+            with self._page.expect_file_chooser(
+                timeout=clamp_timeout(NAVIGATION_TIMEOUT)
+            ) as fc_info:
+                self._ui.click("add_attachment_button")
             file_chooser = fc_info.value
-            file_chooser.set_files(path)
+            file_chooser.set_files(as_attachment(path).payload())
             return True
-        except PlaywrightTimeoutError:
+        except (Error, OSError):  # e.g. missing file or payload rejected by playwright
             return False
 
+    @recorded()
     def _add_receiver(self, receiver_email: str) -> bool:
         try:
-            self._page.wait_for_selector(
-                'role=button[name="Komu"]', state="visible", timeout=5000
-            )
-            user_button = self._page.get_by_role("button", name="Komu")
-            user_button.click()
-
-            self._page.wait_for_selector(
-                f'div[data-email="{receiver_email}"]', state="visible", timeout=5000
-            )
-            receiver_element = self._page.locator(f'div[data-email="{receiver_email}"]')
-            receiver_element.click()
-            user_button.click()
+            self._ui.click("receiver_button")
+            self._ui.click("receiver_contact", email=receiver_email)
+            self._ui.click("receiver_button")
             return True
         except PlaywrightTimeoutError:
             return False
 
-    def _wait_until_received_email(self) -> bool:
+    @recorded()
+    def _wait_until_received_email(self, subject: str, sender: str) -> bool:
+        watcher = ArrivalWatcher(
+            self._page,
+            subject=subject,
+            sender=sender,
+            timeout=clamp_timeout(120000) / 1000,
+        )
+        return watcher.wait(self._arrival_baselines.pop((subject, sender), None))
+
+    @recorded(idempotent=True)
+    def _load_last_received_email(self) -> bool:
         try:
-            # self._page.wait_for_selector('[data-dot="item-general.email.notification"]',
-            #                              state='visible')
-            initial_count = (
-                self._page.locator(".message-list").get_by_role("listitem").count()
-            )
-            time_limit = 120
-            time_start = time.time()
-            while abs(time.time() - time_start) <= time_limit:
-                self._page.reload()
-                end_count = (
-                    self._page.locator(".message-list").get_by_role("listitem").count()
-                )
-                if end_count != initial_count:
-                    return True
-                time.sleep(2)
-            return False
+            self._ui.click("inbox_link")
+            self._ui.click("received_email", index=0)
+            return True
         except PlaywrightTimeoutError:
             return False
 
-    def _load_last_received_email(self) -> bool:
+    @recorded(on_deadline=lambda error: InboxIndex([]))
+    def _scan_inbox(self) -> InboxIndex:
+        try:
+            self._ui.click("inbox_link")
+            self._ui.wait_visible("message_list")
+            return InboxIndex(self._page.evaluate(SCAN_MESSAGE_LIST_SCRIPT))
+        except (Error, DeadlineExceeded):
+            return InboxIndex([])
+
+    @recorded(idempotent=True)
+    def _open_listed_email(self, subject: str, occurrence: int) -> bool:
         try:
-            self._page.get_by_role("link", name="Doručené").click()
-            self._page.wait_for_selector(".message-list", state="visible", timeout=5000)
-            received_emails = self._page.locator(".message-list").get_by_role(
-                "listitem"
+            self._ui.click(
+                "received_email_with_subject", subject=subject, index=occurrence
             )
-            last_received_email = received_emails.nth(0)
-            last_received_email.highlight()
-            last_received_email.click()
             return True
         except PlaywrightTimeoutError:
             return False
 
+    def _verify_listed_email(
+        self, email_context: EmailContext, occurrence: int
+    ) -> Tuple[bool, str]:
+        try:
+            if not self._open_listed_email(email_context.subject, occurrence):
+                return False, "Not able to load received email"
+            if not self._check_sender_email(email_context.receiver_email):
+                return False, "Invalid email sender"
+            if not self._check_subject(email_context.subject):
+                return False, "Invalid email subject"
+            if email_context.message and not self._check_message(email_context.message):
+                return False, "Invalid email message context"
+            if email_context.attachment and not self._check_attachment(
+                email_context.attachment
+            ):
+                return False, "Invalid email attachment file"
+            return True, "Received email is valid"
+        finally:
+            self._leave_message()
+
+    def _leave_message(self) -> None:
+        try:
+            self._ui.click("inbox_link")
+        except Error:
+            pass
+
+    @recorded()
     def _check_message(self, message_expected: str) -> bool:
         try:
-            self._page.wait_for_selector(
-                "div.body.apply-styles", state="visible", timeout=5000
-            )
-            message = self._page.locator("div.body.apply-styles").text_content()
+            message = self._ui.text("message_body")
             if message == message_expected:
                 return True
             return False
         except PlaywrightTimeoutError:
             return False
 
-    def _check_attachment(self, attachment_expected: str) -> bool:
+    @recorded()
+    def _check_attachment(self, attachment_expected: Union[str, Attachment]) -> bool:
+        expected = as_attachment(attachment_expected)
         try:
-            self._page.wait_for_selector("li.attachment", state="visible", timeout=5000)
-            attachment = (
-                self._page.locator("li.attachment").locator("strong").text_content()
-            )
-            path = os.path.basename(attachment_expected)
-            file_name = os.path.basename(path)
-            if attachment == file_name:
-                return True
-            return False
-        except PlaywrightTimeoutError:
+            attachment = self._ui.text("attachment_name")
+            if attachment != expected.name:
+                return False
+            with self._page.expect_download(
+                timeout=clamp_timeout(NAVIGATION_TIMEOUT)
+            ) as download_info:
+                self._ui.click("attachment_download")
+            download = download_info.value
+            received = digest(iter_file(download.path()))
+            download.delete()
+            return received == expected.sha256()
+        except (PlaywrightTimeoutError, OSError):
             return False
 
+    @recorded()
     def _check_subject(self, subject_expected: str) -> bool:
         try:
-            self._page.wait_for_selector(".subject h2", state="visible", timeout=5000)
-            subject = self._page.locator(".subject h2").text_content()
+            subject = self._ui.text("message_subject")
             if subject == subject_expected:
                 return True
             return False
         except PlaywrightTimeoutError:
             return False
 
+    @recorded()
     def _check_sender_email(self, receiver_email: str) -> bool:
         try:
-            self._page.wait_for_selector(".from strong", state="visible", timeout=5000)
-            sender_email = self._page.locator(".from strong").text_content()
+            sender_email = self._ui.text("message_sender")
             if sender_email == receiver_email:
                 return True
             return False
         except PlaywrightTimeoutError:
             return False
 
-    def login(self, email: str, password: str) -> Tuple[bool, str]:
+    @recorded(FLOW, budget=60)
+    def login(
+        self, email: str, password: str, session_name: Optional[str] = None
+    ) -> Tuple[bool, str]:
         """
         Method used for sign up to seznam email
 
         :param email: user email, which should be used for sign up
         :param password: user password, which should be used for sign up
+        :param session_name: name of credentials used as key of cached session,
+                             cached session is used instead of UI login when still valid
         :return: True - if sign up was successfully done
                  False - if sign up was not successfully done
                  message - provide more information, like reason of fail, etc.
         """
-        if not self._go_to_seznam_page():
-            return False, "Not able to load seznam page"
-        if not self._go_to_login():
-            return False, "Not able to load up login page"
+        self._maintain_resources()
+        self._session_name = session_name
+        if self._verification_backend is not None:
+            self._verification_backend.use_credentials(email, password)
+        if session_name is not None:
+            if self._restore_session(session_name):
+                return True, "Login restored from cached session"
+            self._pending_session = session_name
+        login_page_url = self._url_cache.get(LOGIN_PAGE)
+        if login_page_url is None or not self._go_to_cached_login(login_page_url):
+            if not self._go_to_seznam_page():
+                return False, "Not able to load seznam page"
+            if not self._go_to_login():
+                return False, "Not able to load up login page"
         if not self._fill_user_name(email):
             return False, "Not possible to fill in user"
         if not self._fill_password(password):
@@ -280,6 +463,7 @@ class SeznamEmail:
             return False, "Not able to click on login button"
         return True, "Login successfully done"
 
+    @recorded(FLOW, budget=45)
     def check_successful_login(self) -> Tuple[bool, str]:
         """
         Method used for checking if sign up was succesfully done
@@ -289,16 +473,19 @@ class SeznamEmail:
                  message - provide more information, like reason of fail, etc.
         """
         try:
-            self._page.wait_for_load_state("networkidle")
-            error_locator = self._page.locator(
-                'div.error:text("Password or username is incorrect")'
+            signal = self._ui.first_visible(
+                "new_email_link", "login_error", timeout=NAVIGATION_TIMEOUT
             )
-            if not error_locator.is_visible(timeout=2000):
-                return True, "Login successful"
-            return False, "Login not successful"
         except PlaywrightTimeoutError:
             return False, "Not able to do login check"
+        if signal == "new_email_link":
+            self._store_session()
+            return True, "Login successful"
+        if signal == "login_error":
+            return False, "Login not successful"
+        return False, "Not able to do login check"
 
+    @recorded(FLOW, budget=45)
     def check_successful_logout(self) -> Tuple[bool, str]:
         """
         Method used for checking if sign out was succesfully done
@@ -308,14 +495,12 @@ class SeznamEmail:
                  message - provide more information, like reason of fail, etc.
         """
         try:
-            self._page.wait_for_load_state("networkidle")
-            login_locator = self._page.locator('// *[ @ id = "login"]')
-            if login_locator.is_visible(timeout=2000):
-                return True, "Logout successful"
-            return False, "Logout not successful"
+            self._ui.wait_visible("login_form", timeout=NAVIGATION_TIMEOUT)
+            return True, "Logout successful"
         except PlaywrightTimeoutError:
-            return False, "Not able to detect logout state"
+            return False, "Logout not successful"
 
+    @recorded(FLOW, budget=30)
     def logout(self) -> Tuple[bool, str]:
         """
         Method used for sign out to seznam email
@@ -325,33 +510,56 @@ class SeznamEmail:
                  message - provide more information, like reason of fail, etc.
         """
         try:
-            self._page.wait_for_selector(
-                'role=button[name="Uživatel – osobní menu"]',
-                state="visible",
-                timeout=5000,
-            )
-            user_button = self._page.get_by_role(
-                "button", name="Uživatel – osobní menu"
-            )
-            user_button.click()
-            self._page.wait_for_selector(
-                'role=link[name="Odhlásit se"]', state="visible", timeout=5000
-            )
-            logout_button = self._page.get_by_role("link", name="Odhlásit se")
-            logout_button.click()
+            self._ui.click("user_menu_button")
+            self._ui.click("logout_link")
+            if self._session_name is not None:
+                self._session_cache.invalidate(self._session_name)
+                self._session_name = None
             return True, "Successfully logout"
         except PlaywrightTimeoutError:
             return False, "Unsuccessfully logout"
 
+    @property
+    def browser_context(self) -> BrowserContext:
+        """
+        Browser context borrowed from the pool, e.g. for tracing
+        """
+        return self._lease.context
+
+    @property
+    def page(self) -> Page:
+        """
+        Page of the borrowed browser context, e.g. for step hooks
+        """
+        return self._page
+
+    def add_step_hook(self, hook: StepHook) -> None:
+        """
+        Method used for registering callbacks called before and after every step,
+        e.g. WebPerformanceCollector
+
+        :param hook: StepHook with before_step and after_step
+        """
+        self._step_hooks.append(hook)
+
     def clear(self) -> None:
         """
-        Method used to close the browser and stop sync_playwright()
+        Method used to give the browser context back to the pool,
+        browser itself is closed together with the pool
         """
-        self._browser.close()
-        self._playwright.stop()
+        if self._router is not None:
+            self._router.detach(self._lease.context)
+        if self._verification_backend is not None:
+            self._verification_backend.close()
+        self._pool.release(self._lease, discard=self._network.requires_new_context())
 
+    @recorded(FLOW, budget=90)
     def send_email(
-        self, receiver_email: str, subject: str, message: str, path: str
+        self,
+        receiver_email: str,
+        subject: str,
+        message: str,
+        path: Union[str, Attachment],
     ) -> Tuple[bool, str]:
         """
         Method used for sending email
@@ -359,40 +567,83 @@ class SeznamEmail:
         :param receiver_email: email address where email should be sent
         :param subject: define subject of email
         :param message: define message of email
-        :param path: define path to file which should be attached to the email
+        :param path: define path to file or Attachment which should be attached to the email
         :return: True - if sending of email was successfully done
                  False - if sending of email was not successfully done
                  message - provide more information, like reason of fail, etc.
         """
-        if not self._open_new_email():
-            return False, "Not able to open new email"
-        if not self._add_receiver(receiver_email):
-            return False, "Not able to add receiver"
-        if not self._add_subject(subject):
-            return False, "Not able to add subject"
-        if not self._add_attachment(path):
-            return False, "Not able to add attachment"
-        if not self._add_message(message):
-            return False, "Not able to add message"
-        if not self._click_to_send_email():
-            return False, "Not able to click on send email"
-        return True, "Email was sent successfully"
+        self._maintain_resources()
+        if self._verification_backend is None:
+            self._record_arrival_baseline(subject, receiver_email)
+        else:
+            self._verification_backend.record_baseline(receiver_email, subject)
+        return self._compose_email(receiver_email, subject, message, path)
+
+    @recorded(FLOW, on_deadline=BatchReport.aborted)
+    def send_emails(
+        self, batch: Iterable[Union[EmailContext, Tuple[str, str, str, str]]]
+    ) -> BatchReport:
+        """
+        Method used for sending many emails one by one from the same logged in session,
+        sending continues after failed email, sent emails are verified by
+        check_received_emails
+
+        :param batch: email contexts, e.g. from EmailInputs.iter_email_contexts,
+                      or tuples (subject, message, attachment, receiver_email)
+        :return: BatchReport - result (True/False, message) per email
+                 and number of sent emails per minute
+        """
+        self._maintain_resources()
+        report = BatchReport()
+        started = time.perf_counter()
+        counted = set()
+        for email_context in batch:
+            if isinstance(email_context, tuple):
+                email_context = EmailContext(*email_context)
+            key = (email_context.subject, email_context.receiver_email)
+            # baseline is taken before the first email of the key in this batch,
+            # baseline left by earlier batch is replaced
+            if self._verification_backend is None and key not in counted:
+                counted.add(key)
+                self._record_arrival_baseline(*key)
+            result = self._compose_email(
+                email_context.receiver_email,
+                email_context.subject,
+                email_context.message,
+                email_context.attachment,
+            )
+            report.results.append(result)
+            if not result[0]:
+                self._leave_compose()
+        report.elapsed = time.perf_counter() - started
+        return report
 
+    @recorded(FLOW, budget=180)
     def check_last_received_email(
-        self, receiver_email: str, subject: str, message: str, path: str
+        self,
+        receiver_email: str,
+        subject: str,
+        message: str,
+        path: Union[str, Attachment],
     ) -> Tuple[bool, str]:
         """
-        Method used for checking if email was correctly received
+        Method used for checking if email was correctly received,
+        configured verification backend is used instead of the UI
 
         :param receiver_email: email address where email should be sent
         :param subject: define subject of email
         :param message: define message of email
-        :param path: define path to file which should be attached to the email
+        :param path: define path to file or Attachment which should be attached to the email
         :return: True - if the last received email has correct attributes
                  False - if the last received email has not correct attributes
                  message - provide more information, like reason of fail, etc.
         """
-        if not self._wait_until_received_email():
+        if self._verification_backend is not None:
+            return self._verification_backend.check_received_email(
+                receiver_email, subject, message, path
+            )
+        self._maintain_resources()
+        if not self._wait_until_received_email(subject, receiver_email):
             return False, "Email was not received"
         if not self._load_last_received_email():
             return False, "Not able to load last received email"
@@ -406,12 +657,84 @@ class SeznamEmail:
             return False, "Invalid email attachment file"
         return True, "Received email is valid"
 
+    @recorded(FLOW, on_deadline=BatchReport.aborted)
+    def check_received_emails(
+        self,
+        expected_batch: Iterable[Union[EmailContext, Tuple[str, str, str, str]]],
+        timeout: float = 120,
+    ) -> BatchReport:
+        """
+        Method used for checking many received emails in one pass over the inbox,
+        email is opened only when its body, attachment or sender has to be checked,
+        messages listed before send_email/send_emails of the same subject and receiver
+        are not accepted, without recorded baseline every listed message is accepted
+
+        :param expected_batch: email contexts, e.g. from EmailInputs.iter_email_contexts,
+                               or tuples (subject, message, attachment, receiver_email),
+                               empty message/attachment is not checked
+        :param timeout: maximal number of seconds spent by waiting for missing emails
+        :return: BatchReport - result (True/False, message) per expected email
+                 in order of expected_batch
+        """
+        expected = [
+            (
+                EmailContext(*email_context)
+                if isinstance(email_context, tuple)
+                else email_context
+            )
+            for email_context in expected_batch
+        ]
+        self._maintain_resources()
+        # scan consumes the baselines, later waits count from the current inbox
+        known = {
+            key: self._arrival_baselines.pop(key, 0)
+            for key in {
+                (email_context.subject, email_context.receiver_email)
+                for email_context in expected
+            }
+        }
+        report = BatchReport()
+        started = time.perf_counter()
+        deadline = time.monotonic() + clamp_timeout(timeout * 1000) / 1000
+        delay = 1.0
+        while True:
+            index = self._scan_inbox()
+            matches: Dict[int, Tuple[InboxEntry, int]] = {}
+            for position, email_context in enumerate(expected):
+                key = (email_context.subject, email_context.receiver_email)
+                entry = index.match(*key, known[key])
+                if entry is not None:
+                    matches[position] = (
+                        entry,
+                        index.occurrence(email_context.subject, entry),
+                    )
+            if len(matches) == len(expected) or time.monotonic() + delay > deadline:
+                break
+            time.sleep(delay)
+            delay = min(delay * 1.5, 10.0)
+        for position, email_context in enumerate(expected):
+            if position not in matches:
+                report.results.append((False, "Email was not received"))
+                continue
+            entry, occurrence = matches[position]
+            if (
+                not email_context.message
+                and not email_context.attachment
+                and entry.has_sender(email_context.receiver_email)
+            ):
+                report.results.append((True, "Received email is valid"))
+                continue
+            report.results.append(self._verify_listed_email(email_context, occurrence))
+        report.elapsed = time.perf_counter() - started
+        return report
+
 
 class EmailInputs:
     """
     Class consists of methods which help to get the inputs necessary for email logging/sending
     like :
         load_email_context,
+        iter_email_contexts,
         get_email_login
     """
 
@@ -425,22 +748,30 @@ class EmailInputs:
         :param email_context_path: path to json file which consists all necessary inputs for email
         :return: subject - define subject of email
                  message - define message of email
-                 attachment - define path to file which should be attached to the email
+                 attachment - define path to file which should be attached to the email,
+                              relative path is resolved against folder of json file
                  receiver_email - email address where email should be sent
-                 None - in case of invalid email_context_path
+                 None - in case of invalid email_context_path or invalid context
         """
-        try:
-            with open(email_context_path) as file:
-                json_context = json.load(file)
-                subject = json_context["subject"]
-                message = json_context["message"]
-                attachment = json_context["attachment"]
-                receiver_email = json_context["receiver_email"]
-                return subject, message, attachment, receiver_email
-        except AttributeError:
-            return None
-        except FileNotFoundError:
+        email_context = load_first_email_context(email_context_path)
+        if email_context is None:
             return None
+        return email_context.as_tuple()
+
+    @staticmethod
+    def iter_email_contexts(
+        email_context_path: str, skip_invalid: bool = False
+    ) -> Iterator[EmailContext]:
+        """
+        Method to lazily load up many email contexts, e.g. for data driven runs
+
+        :param email_context_path: .json file, .jsonl file (context per line)
+                                   or directory with such files
+        :param skip_invalid: True - invalid contexts are skipped
+                             False - InvalidEmailContext is raised for invalid context
+        :return: iterator of validated EmailContext
+        """
+        return iter_email_contexts(email_context_path, skip_invalid)
 
     @staticmethod
     def get_email_login(credential_name: str) -> Optional[Tuple[str, str]]:
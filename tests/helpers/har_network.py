@@ -0,0 +1,116 @@
+"""
+Python module for recording and replaying of network traffic as HAR archive.
+
+In record mode traffic of live seznam.cz is stored into HAR archive,
+in replay mode the archive serves all responses from disk, so flows run
+offline and without latency of the internet.
+Every recording context writes its own part of the archive, e.g.
+seznam_email.w0-1.har for first context of worker 0, replay serves all parts.
+"""
+
+import glob
+import itertools
+import os
+from typing import List, Tuple
+
+from helpers.paths import BASEDIR
+
+DEFAULT_HAR_FILE = os.path.join(BASEDIR, "input_files", "har", "seznam_email.har")
+
+LIVE = "live"
+RECORD = "record"
+REPLAY = "replay"
+NETWORK_MODES = (LIVE, RECORD, REPLAY)
+
+
+class HarNetwork:
+    """
+    Class which connects browser context with HAR archive according to network mode,
+    like :   attach
+            attach_async
+            archives
+            requires_new_context
+    """
+
+    def __init__(self, mode: str = LIVE, har_file: str = DEFAULT_HAR_FILE):
+        """
+        :param mode: "live" - real network is used
+                     "record" - real network is used and traffic of every context
+                                is stored into its own part of har_file
+                     "replay" - responses are served from har_file and its parts,
+                                unknown requests are aborted
+        :param har_file: path to HAR archive
+        """
+        if mode not in NETWORK_MODES:
+            raise ValueError(f"Unknown network mode: {mode}")
+        self.mode: str = mode
+        self.har_file: str = har_file
+        self._stem: str = os.path.splitext(har_file)[0]
+        # parts of other workers are written concurrently, so they are never touched
+        worker_id = os.environ.get("SEZNAM_WORKER_ID", "0")
+        self._part_prefix: str = f"{self._stem}.w{worker_id}-"
+        self._parts = itertools.count(1)
+
+    def archives(self) -> List[str]:
+        """
+        Method used for listing HAR archive and parts recorded by contexts
+
+        :return: existing paths, har_file first
+        """
+        archives = [self.har_file] if os.path.isfile(self.har_file) else []
+        return archives + sorted(glob.glob(f"{glob.escape(self._stem)}.w*-*.har"))
+
+    def _routes(self) -> List[Tuple[str, dict]]:
+        if self.mode == RECORD:
+            part = next(self._parts)
+            if part == 1:
+                os.makedirs(os.path.dirname(self.har_file), exist_ok=True)
+                for path in glob.glob(f"{glob.escape(self._part_prefix)}*.har"):
+                    os.remove(path)
+            return [
+                (
+                    f"{self._part_prefix}{part}.har",
+                    {"update": True, "update_content": "embed", "update_mode": "full"},
+                )
+            ]
+        archives = self.archives()
+        if not archives:
+            raise FileNotFoundError(
+                f"HAR archive for replay does not exist: {self.har_file}"
+            )
+        # the last attached route is tried first, unknown requests fall back
+        # to earlier ones and only the first archive aborts them
+        return [
+            (path, {"not_found": "fallback" if index else "abort"})
+            for index, path in enumerate(archives)
+        ]
+
+    def attach(self, context) -> None:
+        """
+        Method used for connecting sync browser context with HAR archive
+
+        :param context: playwright BrowserContext
+        """
+        if self.mode != LIVE:
+            for path, options in self._routes():
+                context.route_from_har(path, **options)
+
+    async def attach_async(self, context) -> None:
+        """
+        Method used for connecting async browser context with HAR archive
+
+        :param context: playwright BrowserContext
+        """
+        if self.mode != LIVE:
+            for path, options in self._routes():
+                await context.route_from_har(path, **options)
+
+    def requires_new_context(self) -> bool:
+        """
+        Method used for checking if context has to be closed instead of reused,
+        HAR archive is written when recording context is closed and replay routes
+        have to not leak into other flows
+
+        :return: True - if context can not be returned to the pool for reuse
+        """
+        return self.mode != LIVE
@@ -0,0 +1,301 @@
+"""
+Python module with minimal in-process IMAP server standing in for seznam IMAP.
+
+Supports only commands used by ImapVerificationBackend (CAPABILITY, LOGIN,
+SELECT, EXAMINE, NOOP, SEARCH, FETCH, their UID variants and LOGOUT), so the
+backend can be exercised without network and real mailbox.
+benchmark.py and load_generator.py deliver every sent email into the stand-in
+and pick their backend by verification_backend_for.
+"""
+
+import re
+import socketserver
+import threading
+from email import message_from_bytes, policy
+from email.message import EmailMessage
+from typing import List, Optional, Tuple, Union
+
+from helpers.attachments import Attachment, as_attachment
+from helpers.verification import ImapVerificationBackend, VerificationBackend
+
+LITERAL = re.compile(rb"\{(\d+)\}\r\n$")
+TOKEN = re.compile(r'"((?:[^"\\]|\\.)*)"|(\()|(\))|([^\s()"]+)')
+
+
+def build_message(
+    sender: str,
+    receiver: str,
+    subject: str,
+    message: str,
+    attachment: Optional[Tuple[str, bytes]] = None,
+) -> bytes:
+    """
+    Function to build raw email which can be stored in ImapStandIn
+
+    :param sender: email address of sender
+    :param receiver: email address of receiver
+    :param subject: subject of email
+    :param message: plain text body of email
+    :param attachment: file name and content of attachment
+    :return: email in RFC 5322 format
+    """
+    email = EmailMessage()
+    email["From"] = sender
+    email["To"] = receiver
+    email["Subject"] = subject
+    email.set_content(message)
+    if attachment is not None:
+        file_name, content = attachment
+        email.add_attachment(
+            content,
+            maintype="application",
+            subtype="octet-stream",
+            filename=file_name,
+        )
+    return bytes(email)
+
+
+def _tokens(arguments: str) -> List[str]:
+    tokens = []
+    for match in TOKEN.finditer(arguments):
+        if match.group(1) is not None:
+            tokens.append(re.sub(r"\\(.)", r"\1", match.group(1)))
+        elif match.group(4) is not None:
+            tokens.append(match.group(4))
+    return tokens
+
+
+class _ImapHandler(socketserver.StreamRequestHandler):
+    """
+    One IMAP session, commands are processed sequentially
+    """
+
+    server: "_ImapServer"
+
+    def _send(self, line: str) -> None:
+        self.wfile.write(line.encode("utf-8") + b"\r\n")
+
+    def _read_command(self) -> Optional[bytes]:
+        line = self.rfile.readline()
+        if not line:
+            return None
+        command = b""
+        literal = LITERAL.search(line)
+        while literal:
+            command += line[: literal.start()]
+            self.wfile.write(b"+ Ready for literal\r\n")
+            data = self.rfile.read(int(literal.group(1)))
+            command += b'"' + data.replace(b"\\", b"\\\\").replace(b'"', b'\\"') + b'"'
+            line = self.rfile.readline()
+            literal = LITERAL.search(line)
+        return command + line.rstrip(b"\r\n")
+
+    def handle(self) -> None:
+        self._send("* OK IMAP stand-in ready")
+        authenticated = False
+        while True:
+            raw = self._read_command()
+            if raw is None:
+                return
+            parts = raw.decode("utf-8").split(" ", 2)
+            tag = parts[0]
+            command = parts[1].upper() if len(parts) > 1 else ""
+            arguments = parts[2] if len(parts) > 2 else ""
+            use_uid = command == "UID"
+            if use_uid:
+                command, _, arguments = arguments.partition(" ")
+                command = command.upper()
+            if command == "CAPABILITY":
+                self._send("* CAPABILITY IMAP4rev1")
+            elif command == "NOOP":
+                pass
+            elif command == "LOGOUT":
+                self._send("* BYE IMAP stand-in closing")
+                self._send(f"{tag} OK LOGOUT completed")
+                return
+            elif command == "LOGIN":
+                if self.server.username is not None and _tokens(arguments) != [
+                    self.server.username,
+                    self.server.password,
+                ]:
+                    self._send(f"{tag} NO LOGIN failed")
+                    continue
+                authenticated = True
+            elif not authenticated:
+                self._send(f"{tag} BAD not authenticated")
+                continue
+            elif command in ("SELECT", "EXAMINE"):
+                self._send(f"* {len(self.server.messages)} EXISTS")
+            elif command == "SEARCH":
+                found = self.server.search(_tokens(arguments))
+                self._send("* SEARCH " + " ".join(str(number) for number in found))
+            elif command == "FETCH":
+                number, _, _ = arguments.partition(" ")
+                content = self.server.fetch(int(number))
+                if content is not None:
+                    header = (
+                        f"* {number} FETCH (UID {number} BODY[] {{{len(content)}}}\r\n"
+                    )
+                    self.wfile.write(header.encode("utf-8") + content + b")\r\n")
+            else:
+                self._send(f"{tag} BAD unknown command {command}")
+                continue
+            self._send(f"{tag} OK {command} completed")
+
+
+class _ImapServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, username: Optional[str], password: Optional[str]):
+        super().__init__(("127.0.0.1", 0), _ImapHandler)
+        self.username: Optional[str] = username
+        self.password: Optional[str] = password
+        self.messages: List[bytes] = []
+        self._lock = threading.Lock()
+
+    def add(self, content: bytes) -> int:
+        with self._lock:
+            self.messages.append(content)
+            return len(self.messages)
+
+    def fetch(self, uid: int) -> Optional[bytes]:
+        with self._lock:
+            if 1 <= uid <= len(self.messages):
+                return self.messages[uid - 1]
+        return None
+
+    def search(self, criteria: List[str]) -> List[int]:
+        wanted = {}
+        tokens = iter(criteria)
+        for token in tokens:
+            key = token.upper()
+            if key == "CHARSET":
+                next(tokens, None)
+            elif key in ("FROM", "SUBJECT", "TO"):
+                wanted[key] = next(tokens, "").lower()
+        with self._lock:
+            messages = list(enumerate(self.messages, start=1))
+        found = []
+        for uid, content in messages:
+            headers = message_from_bytes(content, policy=policy.default)
+            if all(
+                value in str(headers.get(key, "")).lower()
+                for key, value in wanted.items()
+            ):
+                found.append(uid)
+        return found
+
+
+class ImapStandIn:
+    """
+    Local IMAP server running in background thread,
+    like :   start
+            add_message
+            deliver
+            stop
+    Sequence numbers and UIDs are the same, messages are never deleted.
+    """
+
+    def __init__(
+        self, username: Optional[str] = "user", password: Optional[str] = "password"
+    ):
+        """
+        :param username: login accepted by server, None - any login is accepted
+        :param password: password accepted by server
+        """
+        self._server: _ImapServer = _ImapServer(username, password)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def host(self) -> str:
+        return self._server.server_address[0]
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def start(self) -> "ImapStandIn":
+        """
+        Method used for starting the server in background thread
+
+        :return: the stand-in itself, host and port are ready to use
+        """
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._server.serve_forever, daemon=True
+            )
+            self._thread.start()
+        return self
+
+    def add_message(self, content: bytes) -> int:
+        """
+        Method used for delivering email into the mailbox
+
+        :param content: raw email, e.g. result of build_message
+        :return: UID of stored email
+        """
+        return self._server.add(content)
+
+    def deliver(
+        self,
+        sender: str,
+        receiver: str,
+        subject: str,
+        message: str,
+        attachment: Union[str, Attachment],
+    ) -> int:
+        """
+        Method used for delivering email sent through the webmail, which never
+        reaches the stand-in by itself
+
+        :param sender: email address of sender
+        :param receiver: email address of receiver
+        :param subject: subject of email
+        :param message: plain text body of email
+        :param attachment: path to file or Attachment
+        :return: UID of stored email
+        """
+        content = as_attachment(attachment)
+        return self.add_message(
+            build_message(
+                sender, receiver, subject, message, (content.name, content.content)
+            )
+        )
+
+    def stop(self) -> None:
+        """
+        Method used for stopping the server
+        """
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._server.server_close()
+
+    def __enter__(self) -> "ImapStandIn":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+
+def verification_backend_for(
+    verification: str, imap_host: str, stand_in: Optional[ImapStandIn] = None
+) -> Optional[VerificationBackend]:
+    """
+    Function to create backend selected by --verification of benchmark.py
+    and load_generator.py
+
+    :param verification: "ui", "imap" or "stand-in"
+    :param imap_host: IMAP server used by "imap"
+    :param stand_in: running stand-in used by "stand-in"
+    :return: ImapVerificationBackend, None when emails are checked in the UI
+    """
+    if verification == "stand-in" and stand_in is not None:
+        return ImapVerificationBackend(
+            stand_in.host, stand_in.port, use_ssl=False, timeout=10
+        )
+    if verification == "imap":
+        return ImapVerificationBackend(imap_host)
+    return None
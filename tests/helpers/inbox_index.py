@@ -0,0 +1,136 @@
+"""
+Python module for indexing of messages listed in the inbox.
+
+The whole '.message-list' is scraped by one evaluate call and indexed
+by subject and sender, so many expected emails are matched in one pass.
+Subject has to be surrounded by non-word characters, so "Load test 1"
+does not match message "Load test 10". Sender is checked only when the list
+shows email addresses at all, list shows the newest message first.
+"""
+
+import re
+from typing import Dict, List, Optional, Pattern
+
+# explicit class instead of \w, so the pattern means the same in Python and JavaScript
+WORD_CHARACTERS = "0-9A-Za-z_\u00c0-\u024f"
+
+SCAN_MESSAGE_LIST_SCRIPT = """() => Array.from(
+    document.querySelectorAll(".message-list [role='listitem'], .message-list li")
+).map((item) => ({
+    text: item.innerText || item.textContent || "",
+    senders: Array.from(item.querySelectorAll("[data-email], [title]")).map(
+        (element) => element.getAttribute("data-email") || element.getAttribute("title") || ""
+    ),
+}))"""
+
+
+def subject_pattern(subject: str) -> Pattern:
+    """
+    Method used for building pattern which finds subject as whole words,
+    usable also as has_text filter of playwright locator
+
+    :param subject: expected subject
+    :return: compiled pattern
+    """
+    return re.compile(
+        f"(?:^|[^{WORD_CHARACTERS}]){re.escape(subject)}(?![{WORD_CHARACTERS}])"
+    )
+
+
+class InboxEntry:
+    """
+    One message of the inbox list
+    """
+
+    __slots__ = ("text", "senders", "used")
+
+    def __init__(self, text: str, senders: List[str]):
+        self.text: str = text
+        self.senders: List[str] = senders
+        self.used: bool = False
+
+    def has_sender(self, sender: str) -> bool:
+        """
+        Method used for checking if sender is shown in the list item
+
+        :param sender: email address of sender
+        :return: True - if sender address is part of the list item
+        """
+        return sender in self.text or any(sender in value for value in self.senders)
+
+
+class InboxIndex:
+    """
+    Index of scraped inbox messages keyed by subject,
+    like :   count
+            match
+            occurrence
+    """
+
+    def __init__(self, items: List[dict]):
+        """
+        :param items: result of SCAN_MESSAGE_LIST_SCRIPT, in order of the list
+        """
+        self._entries: List[InboxEntry] = [
+            InboxEntry(item.get("text", ""), item.get("senders", [])) for item in items
+        ]
+        self._by_subject: Dict[str, List[InboxEntry]] = {}
+        # some layouts show only display names, sender can not be checked then
+        self._addresses_shown: bool = any(
+            "@" in entry.text or any("@" in value for value in entry.senders)
+            for entry in self._entries
+        )
+
+    def _candidates(self, subject: str) -> List[InboxEntry]:
+        candidates = self._by_subject.get(subject)
+        if candidates is None:
+            pattern = subject_pattern(subject)
+            candidates = [
+                entry for entry in self._entries if pattern.search(entry.text)
+            ]
+            self._by_subject[subject] = candidates
+        return candidates
+
+    def _from_sender(self, subject: str, sender: str) -> List[InboxEntry]:
+        candidates = self._candidates(subject)
+        if not self._addresses_shown:
+            return candidates
+        return [entry for entry in candidates if entry.has_sender(sender)]
+
+    def count(self, subject: str, sender: str) -> int:
+        """
+        Method used for counting listed messages with subject from sender
+
+        :param subject: expected subject
+        :param sender: expected sender
+        :return: number of matching messages, e.g. baseline before sending
+        """
+        return len(self._from_sender(subject, sender))
+
+    def match(self, subject: str, sender: str, known: int = 0) -> Optional[InboxEntry]:
+        """
+        Method used for finding the newest not yet matched message with subject
+        from sender, which arrived after the known ones
+
+        :param subject: expected subject
+        :param sender: expected sender
+        :param known: number of matching messages listed before sending,
+                      the oldest known messages are never matched
+        :return: InboxEntry marked as used, None if no new message matches
+        """
+        candidates = self._from_sender(subject, sender)
+        fresh = candidates[: max(len(candidates) - known, 0)]
+        entry = next((entry for entry in fresh if not entry.used), None)
+        if entry is not None:
+            entry.used = True
+        return entry
+
+    def occurrence(self, subject: str, entry: InboxEntry) -> int:
+        """
+        Method used for getting position of entry among messages containing subject
+
+        :param subject: subject used for filtering of the list
+        :param entry: entry returned by match
+        :return: index usable with locator filtered by subject_pattern
+        """
+        return self._candidates(subject).index(entry)
@@ -0,0 +1,484 @@
+"""
+Python module for measuring latency of SeznamEmail steps and flows.
+
+Every decorated step records wall time, time spent waiting for the browser
+and its outcome. Records are aggregated into p50/p95/max per step.
+Decorated flows also run within Deadline budget shared by their steps.
+"""
+
+import asyncio
+import contextvars
+import functools
+import html
+import inspect
+import json
+import math
+import os
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from helpers.deadline import Deadline, DeadlineExceeded
+
+STEP = "step"
+FLOW = "flow"
+RESOURCE = "resource"
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """
+    Function returning nearest-rank percentile of values
+
+    :param values: measured values
+    :param fraction: requested percentile, e.g. 0.95
+    :return: percentile of values, 0.0 for no values
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    # rank is ceil(fraction * n), rounding strips float noise like 0.07 * 100
+    rank = math.ceil(round(fraction * len(ordered), 9))
+    index = max(0, min(len(ordered) - 1, rank - 1))
+    return ordered[index]
+
+
+def _distribution(values: List[float]) -> dict:
+    return {
+        "p50": round(percentile(values, 0.50), 4),
+        "p95": round(percentile(values, 0.95), 4),
+        "max": round(max(values, default=0.0), 4),
+    }
+
+
+class StepRecord:
+    """
+    Measurement of one step or flow, times are in seconds
+    """
+
+    __slots__ = (
+        "name",
+        "kind",
+        "started",
+        "duration",
+        "wait",
+        "excluded",
+        "outcome",
+        "details",
+    )
+
+    def __init__(self, name: str, kind: str):
+        self.name: str = name
+        self.kind: str = kind
+        self.started: float = time.time()
+        self.duration: float = 0.0
+        self.wait: float = 0.0
+        self.excluded: float = 0.0
+        self.outcome: str = "error"
+        self.details: dict = {}
+
+    def to_dict(self) -> dict:
+        """
+        Method used for serialization of record into JSON compatible dictionary
+
+        :return: dictionary with all measured values
+        """
+        return {
+            "name": self.name,
+            "kind": self.kind,
+            "started": self.started,
+            "duration": round(self.duration, 4),
+            "wait": round(self.wait, 4),
+            "outcome": self.outcome,
+            "details": self.details,
+        }
+
+
+class StepHook:
+    """
+    Callbacks called around every recorded step of SeznamEmail,
+    like :   before_step
+            after_step
+
+    Hooks of AsyncSeznamEmail may be coroutines, they are awaited.
+    """
+
+    def before_step(self, owner, name: str) -> None:
+        """
+        Method called before the step
+
+        :param owner: SeznamEmail running the step
+        :param name: name of the step
+        """
+
+    def after_step(self, owner, name: str, record: StepRecord) -> None:
+        """
+        Method called after the step, before its record is published
+
+        :param owner: SeznamEmail running the step
+        :param name: name of the step
+        :param record: record of the step, e.g. for adding details
+        """
+
+
+class StepRecorder:
+    """
+    Class collecting StepRecord of every measured step and flow,
+    like :   measure
+            unmeasured
+            add_wait
+            add_listener
+            summary
+            write_json
+            html_table
+            clear
+            shared
+    """
+
+    _shared: Optional["StepRecorder"] = None
+
+    def __init__(self):
+        self.records: List[StepRecord] = []
+        self._listeners: List[Callable[[StepRecord], None]] = []
+        # separate stack of running steps for every thread and asyncio task
+        self._active: contextvars.ContextVar = contextvars.ContextVar(
+            f"active_steps_{id(self)}", default=()
+        )
+
+    @classmethod
+    def shared(cls) -> "StepRecorder":
+        """
+        Method used for getting recorder shared by whole process
+
+        :return: process wide instance of StepRecorder
+        """
+        if cls._shared is None:
+            cls._shared = cls()
+        return cls._shared
+
+    @contextmanager
+    def measure(self, name: str, kind: str = STEP) -> Iterator[StepRecord]:
+        """
+        Method used for measuring block of code as one step
+
+        :param name: name of measured step
+        :param kind: "step", "flow" or "resource"
+        :return: record which outcome should be filled in by caller
+        """
+        record = StepRecord(name, kind)
+        token = self._active.set(self._active.get() + (record,))
+        started = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record.duration = time.perf_counter() - started - record.excluded
+            if record.excluded:
+                record.details["hook_time"] = round(record.excluded, 4)
+            self._active.reset(token)
+            self.records.append(record)
+            for listener in self._listeners:
+                listener(record)
+
+    @contextmanager
+    def unmeasured(self) -> Iterator[None]:
+        """
+        Method used for running block of code whose time is not counted
+        into duration of running steps and flows, e.g. StepHook callbacks,
+        excluded time is shown as hook_time in details
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            for record in self._active.get():
+                record.excluded += elapsed
+
+    def add_listener(self, listener: Callable[[StepRecord], None]) -> None:
+        """
+        Method used for registering function called with every finished record,
+        e.g. for streaming records into file while the run is going
+
+        :param listener: function accepting StepRecord
+        """
+        self._listeners.append(listener)
+
+    def add_wait(self, seconds: float) -> None:
+        """
+        Method used for adding time spent by waiting for browser to all running steps
+
+        :param seconds: number of seconds spent by waiting
+        """
+        for record in self._active.get():
+            record.wait += seconds
+
+    def summary(self) -> Dict[str, dict]:
+        """
+        Method used for aggregation of records per step
+
+        :return: dictionary keyed by "<kind>:<name>" with count, failures
+                 and p50/p95/max of duration and wait time
+        """
+        grouped: Dict[Tuple[str, str], List[StepRecord]] = {}
+        for record in self.records:
+            grouped.setdefault((record.kind, record.name), []).append(record)
+        summary = {}
+        for (kind, name), records in grouped.items():
+            summary[f"{kind}:{name}"] = {
+                "kind": kind,
+                "name": name,
+                "count": len(records),
+                "failures": sum(1 for record in records if record.outcome != "pass"),
+                "duration": _distribution([record.duration for record in records]),
+                "wait": _distribution([record.wait for record in records]),
+            }
+        return summary
+
+    def write_json(self, path: str, key: str = "step_metrics") -> None:
+        """
+        Method used for storing summary and records into JSON file,
+        other content of existing JSON file is kept
+
+        :param path: path to JSON file
+        :param key: key under which metrics are stored
+        """
+        content = {}
+        try:
+            with open(path, encoding="utf-8") as file:
+                content = json.load(file)
+        except (OSError, ValueError):
+            pass
+        if not isinstance(content, dict):
+            content = {}
+        content[key] = {
+            "summary": self.summary(),
+            "records": [record.to_dict() for record in self.records],
+        }
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(content, file, indent=2)
+
+    def html_table(self) -> str:
+        """
+        Method used for rendering summary as HTML table
+
+        :return: HTML table with one row per step
+        """
+        rows = []
+        for item in sorted(
+            self.summary().values(), key=lambda item: (item["kind"], item["name"])
+        ):
+            duration, wait = item["duration"], item["wait"]
+            rows.append(
+                "<tr>"
+                f"<td>{html.escape(item['kind'])}</td>"
+                f"<td>{html.escape(item['name'])}</td>"
+                f"<td>{item['count']}</td><td>{item['failures']}</td>"
+                f"<td>{duration['p50'] * 1000:.0f}</td>"
+                f"<td>{duration['p95'] * 1000:.0f}</td>"
+                f"<td>{duration['max'] * 1000:.0f}</td>"
+                f"<td>{wait['p50'] * 1000:.0f}</td>"
+                f"<td>{wait['p95'] * 1000:.0f}</td>"
+                f"<td>{wait['max'] * 1000:.0f}</td>"
+                "</tr>"
+            )
+        return (
+            "<h2>Step latency [ms]</h2><table>"
+            "<tr><th>kind</th><th>step</th><th>count</th><th>failures</th>"
+            "<th>p50</th><th>p95</th><th>max</th>"
+            "<th>wait p50</th><th>wait p95</th><th>wait max</th></tr>"
+            + "".join(rows)
+            + "</table>"
+        )
+
+    def clear(self) -> None:
+        """
+        Method used to remove all collected records
+        """
+        self.records = []
+
+
+def _outcome(result) -> str:
+    if isinstance(result, tuple):
+        result = result[0] if result else False
+    return "pass" if result else "fail"
+
+
+def _flow_deadline(budget: Optional[float], kwargs: dict) -> Optional[Deadline]:
+    deadline = kwargs.pop("deadline", None)
+    if deadline is None:
+        deadline = Deadline.current()
+    if deadline is None and budget is not None:
+        deadline = Deadline(budget)
+    return deadline
+
+
+def _explain(result, deadline: Optional[Deadline]):
+    if (
+        deadline is None
+        or deadline.exhausted_by is None
+        or not isinstance(result, tuple)
+        or result[0]
+    ):
+        return result
+    return (
+        False,
+        f"{result[1]} (deadline of {deadline.budget:g} s "
+        f"exhausted by step {deadline.exhausted_by})",
+    )
+
+
+def _step_failed(name: str, record: StepRecord) -> None:
+    deadline = Deadline.current()
+    if deadline is not None and deadline.expired:
+        record.details["deadline_exhausted"] = True
+        if deadline.exhausted_by is None:
+            deadline.exhausted_by = name
+
+
+def _backoff(attempt: int, backoff: float) -> Optional[float]:
+    delay = backoff * 2**attempt
+    deadline = Deadline.current()
+    if deadline is not None and deadline.remaining() <= delay:
+        return None
+    return delay
+
+
+def _hooks(owner) -> tuple:
+    return tuple(getattr(owner, "_step_hooks", ()))
+
+
+def recorded(
+    kind: str = STEP,
+    budget: Optional[float] = None,
+    idempotent: bool = False,
+    retries: int = 2,
+    backoff: float = 0.5,
+    on_deadline: Optional[Callable[[str], object]] = None,
+):
+    """
+    Decorator measuring method of class having StepRecorder in self._recorder,
+    method returns bool (step) or (bool, message) (flow), works also for coroutines
+
+    Flow runs within Deadline given by keyword argument deadline, deadline of
+    calling flow or new Deadline(budget). Failure message of flow names the step
+    which used up the budget. Failed idempotent step is retried with backoff
+    while the deadline allows it. StepHook objects in self._step_hooks are
+    called around every step, their time is not counted into measured durations.
+
+    :param kind: "step" or "flow"
+    :param budget: number of seconds available for flow, None - no limit
+    :param idempotent: True - step can be safely repeated after failure
+    :param retries: maximal number of repetitions of idempotent step
+    :param backoff: number of seconds before first repetition, doubled afterwards
+    :param on_deadline: function building failed result of declared type from message
+                        of DeadlineExceeded, step returns False and flow (False, message)
+                        when missing
+    :return: decorated method
+    """
+    attempts = retries + 1 if idempotent else 1
+
+    def deadline_result(error: DeadlineExceeded):
+        if on_deadline is not None:
+            return on_deadline(str(error))
+        return (False, str(error)) if kind == FLOW else False
+
+    def decorator(method):
+        name = method.__name__
+
+        if inspect.iscoroutinefunction(method):
+
+            @functools.wraps(method)
+            async def async_flow_wrapper(self, *args, **kwargs):
+                deadline = _flow_deadline(budget, kwargs)
+                with self._recorder.measure(name, kind) as record:
+                    try:
+                        if deadline is None:
+                            result = await method(self, *args, **kwargs)
+                        else:
+                            with deadline.activate():
+                                result = await method(self, *args, **kwargs)
+                    except DeadlineExceeded as error:
+                        result = deadline_result(error)
+                    result = _explain(result, deadline)
+                    record.outcome = _outcome(result)
+                    return result
+
+            @functools.wraps(method)
+            async def async_step_wrapper(self, *args, **kwargs):
+                hooks = _hooks(self)
+                with self._recorder.measure(name, kind) as record:
+                    with self._recorder.unmeasured():
+                        for hook in hooks:
+                            started = hook.before_step(self, name)
+                            if inspect.isawaitable(started):
+                                await started
+                    for attempt in range(attempts):
+                        try:
+                            result = await method(self, *args, **kwargs)
+                        except DeadlineExceeded as error:
+                            result = deadline_result(error)
+                        if result or attempt + 1 == attempts:
+                            break
+                        delay = _backoff(attempt, backoff)
+                        if delay is None:
+                            break
+                        record.details["retries"] = attempt + 1
+                        await asyncio.sleep(delay)
+                    record.outcome = _outcome(result)
+                    if record.outcome != "pass":
+                        _step_failed(name, record)
+                    with self._recorder.unmeasured():
+                        for hook in hooks:
+                            finished = hook.after_step(self, name, record)
+                            if inspect.isawaitable(finished):
+                                await finished
+                    return result
+
+            return async_flow_wrapper if kind == FLOW else async_step_wrapper
+
+        @functools.wraps(method)
+        def flow_wrapper(self, *args, **kwargs):
+            deadline = _flow_deadline(budget, kwargs)
+            with self._recorder.measure(name, kind) as record:
+                try:
+                    if deadline is None:
+                        result = method(self, *args, **kwargs)
+                    else:
+                        with deadline.activate():
+                            result = method(self, *args, **kwargs)
+                except DeadlineExceeded as error:
+                    result = deadline_result(error)
+                result = _explain(result, deadline)
+                record.outcome = _outcome(result)
+                return result
+
+        @functools.wraps(method)
+        def step_wrapper(self, *args, **kwargs):
+            hooks = _hooks(self)
+            with self._recorder.measure(name, kind) as record:
+                with self._recorder.unmeasured():
+                    for hook in hooks:
+                        hook.before_step(self, name)
+                for attempt in range(attempts):
+                    try:
+                        result = method(self, *args, **kwargs)
+                    except DeadlineExceeded as error:
+                        result = deadline_result(error)
+                    if result or attempt + 1 == attempts:
+                        break
+                    delay = _backoff(attempt, backoff)
+                    if delay is None:
+                        break
+                    record.details["retries"] = attempt + 1
+                    time.sleep(delay)
+                record.outcome = _outcome(result)
+                if record.outcome != "pass":
+                    _step_failed(name, record)
+                with self._recorder.unmeasured():
+                    for hook in hooks:
+                        hook.after_step(self, name, record)
+                return result
+
+        return flow_wrapper if kind == FLOW else step_wrapper
+
+    return decorator
@@ -0,0 +1,99 @@
+"""
+Python module describing which browser engine is launched and how.
+
+Launch profile is written as "engine[:headless|headed][:slow_mo]",
+e.g. "chromium:headless:0" or "firefox:headed", so it can be passed
+on command line of main.py and pytest or in SEZNAM_LAUNCH_PROFILE.
+"""
+
+import os
+from typing import Optional
+
+ENGINES = ("chromium", "firefox", "webkit")
+DEFAULT_LAUNCH_PROFILE = "firefox:headed:1"
+
+
+class LaunchProfile:
+    """
+    Browser engine together with its launch options,
+    like :   parse
+            from_environment
+            launch_options
+            name
+            slug
+    """
+
+    __slots__ = ("engine", "headless", "slow_mo")
+
+    def __init__(
+        self, engine: str = "firefox", headless: bool = False, slow_mo: float = 1
+    ):
+        """
+        :param engine: chromium, firefox or webkit
+        :param headless: True - browser window is not shown
+        :param slow_mo: number of milliseconds every browser operation is slowed down by
+        """
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown browser engine {engine}, use one of {ENGINES}")
+        self.engine: str = engine
+        self.headless: bool = headless
+        self.slow_mo: float = slow_mo
+
+    @classmethod
+    def parse(cls, text: str) -> "LaunchProfile":
+        """
+        Method used for creating profile from its text form
+
+        :param text: "engine[:headless|headed][:slow_mo]"
+        :return: LaunchProfile, ValueError is raised for invalid text
+        """
+        parts = [part.strip().lower() for part in text.split(":")]
+        if len(parts) > 3 or not parts[0]:
+            raise ValueError(f"Invalid launch profile {text}")
+        headless = False
+        if len(parts) > 1 and parts[1]:
+            if parts[1] not in ("headless", "headed"):
+                raise ValueError(f"Invalid launch profile {text}, use headless/headed")
+            headless = parts[1] == "headless"
+        slow_mo = float(parts[2]) if len(parts) > 2 and parts[2] else 0.0
+        return cls(parts[0], headless, slow_mo)
+
+    @classmethod
+    def from_environment(cls, default: Optional[str] = None) -> "LaunchProfile":
+        """
+        Method used for creating profile from SEZNAM_LAUNCH_PROFILE
+
+        :param default: text form used when variable is not set
+        :return: LaunchProfile
+        """
+        return cls.parse(
+            os.environ.get("SEZNAM_LAUNCH_PROFILE") or default or DEFAULT_LAUNCH_PROFILE
+        )
+
+    @property
+    def name(self) -> str:
+        """
+        Text form of profile, parse(name) gives equal profile
+        """
+        return (
+            f"{self.engine}:{'headless' if self.headless else 'headed'}:"
+            f"{self.slow_mo:g}"
+        )
+
+    @property
+    def slug(self) -> str:
+        """
+        Form of name usable in file names
+        """
+        return self.name.replace(":", "_")
+
+    def launch_options(self) -> dict:
+        """
+        Method used for getting keyword arguments of BrowserType.launch
+
+        :return: dictionary with headless and slow_mo
+        """
+        return {"headless": self.headless, "slow_mo": self.slow_mo}
+
+    def __repr__(self) -> str:
+        return f"LaunchProfile({self.name!r})"
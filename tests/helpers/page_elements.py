@@ -0,0 +1,426 @@
+"""
+Python module with registry of seznam email UI elements (page object layer).
+
+Every element is declared once with its locator and timeout budget. Locators
+are built once per page and actions are single auto-waiting interactions,
+so one action costs one round-trip to the browser.
+"""
+
+import functools
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+from helpers.deadline import clamp_timeout
+from helpers.inbox_index import subject_pattern
+from helpers.instrumentation import StepRecorder
+
+NAVIGATION_TIMEOUT = 30000
+
+
+class Element:
+    """
+    Declaration of UI element, build creates locator from page and optional parameters
+    """
+
+    __slots__ = ("name", "build", "timeout")
+
+    def __init__(self, name: str, build: Callable, timeout: float = 5000):
+        """
+        :param name: unique name of element
+        :param build: function(page, **params) returning playwright Locator
+        :param timeout: number of milliseconds which actions with element may wait
+        """
+        self.name: str = name
+        self.build: Callable = build
+        self.timeout: float = timeout
+
+
+ELEMENTS: Dict[str, Element] = {
+    element.name: element
+    for element in (
+        Element(
+            "portal_login_link",
+            lambda page: page.locator("div.gadget__content").get_by_role(
+                "link", name="Přihlásit"
+            ),
+            timeout=NAVIGATION_TIMEOUT,
+        ),
+        Element("user_name_field", lambda page: page.locator("#login-username")),
+        Element(
+            "continue_button",
+            lambda page: page.get_by_role("button", name="Continue"),
+        ),
+        Element("password_field", lambda page: page.locator("#login-password")),
+        Element(
+            "sign_in_button", lambda page: page.get_by_role("button", name="Sign in")
+        ),
+        Element("login_form", lambda page: page.locator("#login")),
+        Element(
+            "login_error",
+            lambda page: page.locator(
+                'div.error:text("Password or username is incorrect")'
+            ),
+        ),
+        Element(
+            "user_menu_button",
+            lambda page: page.get_by_role("button", name="Uživatel – osobní menu"),
+        ),
+        Element(
+            "logout_link", lambda page: page.get_by_role("link", name="Odhlásit se")
+        ),
+        Element(
+            "new_email_link",
+            lambda page: page.get_by_role("link", name="Napsat e-mail"),
+        ),
+        Element(
+            "receiver_button", lambda page: page.get_by_role("button", name="Komu")
+        ),
+        Element(
+            "receiver_contact",
+            lambda page, email: page.locator(f'div[data-email="{email}"]'),
+        ),
+        Element("subject_field", lambda page: page.get_by_placeholder("Předmět…")),
+        Element(
+            "add_attachment_button", lambda page: page.get_by_label("Přidat přílohu")
+        ),
+        Element(
+            "message_field",
+            lambda page: page.locator(
+                'div.area.apply-styles[contenteditable="true"][placeholder="Text e-mailu…"]'
+            ),
+            timeout=NAVIGATION_TIMEOUT,
+        ),
+        Element(
+            "send_email_button",
+            lambda page: page.get_by_role("button", name="Odeslat e-mail"),
+        ),
+        Element("inbox_link", lambda page: page.get_by_role("link", name="Doručené")),
+        Element("message_list", lambda page: page.locator(".message-list")),
+        Element(
+            "received_emails",
+            lambda page: page.locator(".message-list").get_by_role("listitem"),
+        ),
+        Element(
+            "received_email",
+            lambda page, index: page.locator(".message-list")
+            .get_by_role("listitem")
+            .nth(index),
+        ),
+        Element(
+            "received_email_with_subject",
+            lambda page, subject, index: page.locator(".message-list")
+            .get_by_role("listitem")
+            .filter(has_text=subject_pattern(subject))
+            .nth(index),
+        ),
+        Element("message_sender", lambda page: page.locator(".from strong")),
+        Element("message_subject", lambda page: page.locator(".subject h2")),
+        Element("message_body", lambda page: page.locator("div.body.apply-styles")),
+        Element(
+            "attachment_name",
+            lambda page: page.locator("li.attachment").locator("strong"),
+        ),
+        Element(
+            "attachment_download",
+            lambda page: page.locator("li.attachment").get_by_role("link").first,
+        ),
+    )
+}
+
+
+class _ElementCache:
+    """
+    Locators of one page built on first use and reused afterwards
+    """
+
+    def __init__(self, page, recorder: StepRecorder):
+        self.page = page
+        self._recorder: StepRecorder = recorder
+        self._locators: Dict[Tuple[str, tuple], object] = {}
+
+    def locator(self, name: str, **params):
+        """
+        Method used for getting cached locator of registered element
+
+        :param name: name of element from ELEMENTS
+        :param params: parameters of element, e.g. email of receiver_contact
+        :return: playwright Locator
+        """
+        key = (name, tuple(sorted(params.items())))
+        locator = self._locators.get(key)
+        if locator is None:
+            locator = ELEMENTS[name].build(self.page, **params)
+            self._locators[key] = locator
+        return locator
+
+    def any_of(self, *names: str):
+        """
+        Method used for getting cached locator matching the first visible
+        of registered elements without parameters
+
+        :param names: names of elements from ELEMENTS
+        :return: playwright Locator
+        """
+        key = ("|".join(names), ())
+        locator = self._locators.get(key)
+        if locator is None:
+            locator = functools.reduce(
+                lambda combined, name: combined.or_(self.locator(name)),
+                names[1:],
+                self.locator(names[0]),
+            ).first
+            self._locators[key] = locator
+        return locator
+
+    @staticmethod
+    def timeout(name: str, timeout: Optional[float] = None) -> float:
+        """
+        Method used for getting timeout budget of element,
+        budget is limited by remaining time of running flow deadline
+
+        :param name: name of element from ELEMENTS
+        :param timeout: explicit budget in milliseconds which overrides declared one
+        :return: number of milliseconds
+        """
+        return clamp_timeout(ELEMENTS[name].timeout if timeout is None else timeout)
+
+    def _record_wait(self, started: float) -> None:
+        self._recorder.add_wait(time.perf_counter() - started)
+
+
+class SeznamPage(_ElementCache):
+    """
+    Page object with single auto-waiting actions over registered elements,
+    like :   click
+            fill
+            text
+            attribute
+            wait_visible
+            first_visible
+            goto
+    """
+
+    def click(self, name: str, timeout: Optional[float] = None, **params) -> None:
+        """
+        Method used for clicking on element as soon as it is actionable
+        """
+        started = time.perf_counter()
+        try:
+            self.locator(name, **params).click(timeout=self.timeout(name, timeout))
+        finally:
+            self._record_wait(started)
+
+    def fill(
+        self, name: str, value: str, timeout: Optional[float] = None, **params
+    ) -> None:
+        """
+        Method used for filling value into element as soon as it is editable
+        """
+        started = time.perf_counter()
+        try:
+            self.locator(name, **params).fill(
+                value, timeout=self.timeout(name, timeout)
+            )
+        finally:
+            self._record_wait(started)
+
+    def text(
+        self, name: str, timeout: Optional[float] = None, **params
+    ) -> Optional[str]:
+        """
+        Method used for reading text content of element as soon as it is attached
+        """
+        started = time.perf_counter()
+        try:
+            return self.locator(name, **params).text_content(
+                timeout=self.timeout(name, timeout)
+            )
+        finally:
+            self._record_wait(started)
+
+    def attribute(
+        self, name: str, attribute: str, timeout: Optional[float] = None, **params
+    ) -> Optional[str]:
+        """
+        Method used for reading attribute of element as soon as it is attached
+        """
+        started = time.perf_counter()
+        try:
+            return self.locator(name, **params).get_attribute(
+                attribute, timeout=self.timeout(name, timeout)
+            )
+        finally:
+            self._record_wait(started)
+
+    def wait_visible(
+        self, name: str, timeout: Optional[float] = None, **params
+    ) -> None:
+        """
+        Method used for waiting until element is visible
+        """
+        started = time.perf_counter()
+        try:
+            self.locator(name, **params).wait_for(
+                state="visible", timeout=self.timeout(name, timeout)
+            )
+        finally:
+            self._record_wait(started)
+
+    def first_visible(
+        self, *names: str, timeout: Optional[float] = None
+    ) -> Optional[str]:
+        """
+        Method used for racing elements, e.g. success and error signal of the app,
+        waiting ends as soon as any of them is visible
+
+        :return: name of visible element, None if it disappeared before it was identified
+        """
+        started = time.perf_counter()
+        try:
+            self.any_of(*names).wait_for(
+                state="visible", timeout=self.timeout(names[0], timeout)
+            )
+            for name in names:
+                if self.locator(name).is_visible():
+                    return name
+            return None
+        finally:
+            self._record_wait(started)
+
+    def goto(
+        self, url: str, wait_until: str = "load", timeout: Optional[float] = None
+    ) -> None:
+        """
+        Method used for navigation of page to url
+        """
+        started = time.perf_counter()
+        try:
+            self.page.goto(
+                url,
+                wait_until=wait_until,
+                timeout=clamp_timeout(
+                    NAVIGATION_TIMEOUT if timeout is None else timeout
+                ),
+            )
+        finally:
+            self._record_wait(started)
+
+
+class AsyncSeznamPage(_ElementCache):
+    """
+    Asyncio variant of SeznamPage,
+    like :   click
+            fill
+            text
+            attribute
+            wait_visible
+            first_visible
+            goto
+    """
+
+    async def click(self, name: str, timeout: Optional[float] = None, **params) -> None:
+        """
+        Method used for clicking on element as soon as it is actionable
+        """
+        started = time.perf_counter()
+        try:
+            await self.locator(name, **params).click(
+                timeout=self.timeout(name, timeout)
+            )
+        finally:
+            self._record_wait(started)
+
+    async def fill(
+        self, name: str, value: str, timeout: Optional[float] = None, **params
+    ) -> None:
+        """
+        Method used for filling value into element as soon as it is editable
+        """
+        started = time.perf_counter()
+        try:
+            await self.locator(name, **params).fill(
+                value, timeout=self.timeout(name, timeout)
+            )
+        finally:
+            self._record_wait(started)
+
+    async def text(
+        self, name: str, timeout: Optional[float] = None, **params
+    ) -> Optional[str]:
+        """
+        Method used for reading text content of element as soon as it is attached
+        """
+        started = time.perf_counter()
+        try:
+            return await self.locator(name, **params).text_content(
+                timeout=self.timeout(name, timeout)
+            )
+        finally:
+            self._record_wait(started)
+
+    async def attribute(
+        self, name: str, attribute: str, timeout: Optional[float] = None, **params
+    ) -> Optional[str]:
+        """
+        Method used for reading attribute of element as soon as it is attached
+        """
+        started = time.perf_counter()
+        try:
+            return await self.locator(name, **params).get_attribute(
+                attribute, timeout=self.timeout(name, timeout)
+            )
+        finally:
+            self._record_wait(started)
+
+    async def wait_visible(
+        self, name: str, timeout: Optional[float] = None, **params
+    ) -> None:
+        """
+        Method used for waiting until element is visible
+        """
+        started = time.perf_counter()
+        try:
+            await self.locator(name, **params).wait_for(
+                state="visible", timeout=self.timeout(name, timeout)
+            )
+        finally:
+            self._record_wait(started)
+
+    async def first_visible(
+        self, *names: str, timeout: Optional[float] = None
+    ) -> Optional[str]:
+        """
+        Method used for racing elements, e.g. success and error signal of the app,
+        waiting ends as soon as any of them is visible
+
+        :return: name of visible element, None if it disappeared before it was identified
+        """
+        started = time.perf_counter()
+        try:
+            await self.any_of(*names).wait_for(
+                state="visible", timeout=self.timeout(names[0], timeout)
+            )
+            for name in names:
+                if await self.locator(name).is_visible():
+                    return name
+            return None
+        finally:
+            self._record_wait(started)
+
+    async def goto(
+        self, url: str, wait_until: str = "load", timeout: Optional[float] = None
+    ) -> None:
+        """
+        Method used for navigation of page to url
+        """
+        started = time.perf_counter()
+        try:
+            await self.page.goto(
+                url,
+                wait_until=wait_until,
+                timeout=clamp_timeout(
+                    NAVIGATION_TIMEOUT if timeout is None else timeout
+                ),
+            )
+        finally:
+            self._record_wait(started)
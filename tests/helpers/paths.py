@@ -0,0 +1,11 @@
+"""
+Python module with paths of the repository shared by helpers and tests.
+
+Caches kept between runs (sessions, URLs, profiles, staged attachments)
+live under .cache in the repository root.
+"""
+
+import os
+
+BASEDIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+CACHE_DIR = os.path.join(BASEDIR, ".cache")
@@ -0,0 +1,363 @@
+"""
+Python module rendering compact paginated HTML report from JSONL results.
+
+Renderer reads only lines appended since its previous update, rewrites only
+pages which changed and links one shared stylesheet, so the report can be
+refreshed cheaply during the run. It can be also used from command line:
+
+    python -m helpers.report_renderer ../reports/results.jsonl ../reports/compact
+
+EngineComparison renders step latency of several runs, e.g. one per browser
+engine, side by side.
+"""
+
+import argparse
+import html
+import json
+import os
+from typing import Dict, List, Optional, Tuple
+
+from helpers.instrumentation import FLOW, STEP, percentile
+
+STYLESHEET = "report.css"
+CSS = """body { font-family: sans-serif; margin: 1.5em; color: #222; }
+table { border-collapse: collapse; margin-bottom: 1.5em; }
+th, td { border: 1px solid #ccc; padding: 0.25em 0.6em; text-align: left; }
+th { background: #f0f0f0; }
+td.number { text-align: right; }
+tr.passed td.outcome { color: #1a7f37; }
+tr.failed td.outcome { color: #cf222e; font-weight: bold; }
+tr.skipped td.outcome { color: #9a6700; }
+nav a { margin-right: 0.6em; }
+td.fastest { background: #dafbe1; }
+td.slow { background: #ffebe9; }
+"""
+
+
+def _write_atomic(path: str, content: str) -> None:
+    # readers of report during the run never see half written file
+    temporary_path = path + ".tmp"
+    with open(temporary_path, "w", encoding="utf-8") as file:
+        file.write(content)
+    os.replace(temporary_path, path)
+
+
+def _document(title: str, body: str) -> str:
+    return (
+        "<!DOCTYPE html><html><head><meta charset='utf-8'>"
+        f"<title>{html.escape(title)}</title>"
+        f"<link rel='stylesheet' href='{STYLESHEET}'></head>"
+        f"<body><h1>{html.escape(title)}</h1>{body}</body></html>"
+    )
+
+
+def _web_performance_text(summary: Optional[dict]) -> str:
+    if not summary:
+        return ""
+    return (
+        f"{summary.get('navigations', 0)} navigations, "
+        f"TTFB max {summary.get('ttfb_max', 0):.0f} ms, "
+        f"DOM ready max {summary.get('dom_content_loaded_max', 0):.0f} ms, "
+        f"{summary.get('resources', 0)} resources, "
+        f"{summary.get('transfer_size', 0) / 1024:.0f} KiB, "
+        f"{summary.get('long_tasks', 0)} long tasks"
+    )
+
+
+class IncrementalReport:
+    """
+    Compact HTML report built from stream written by ResultsSink,
+    like :   update
+            summary
+    """
+
+    def __init__(self, results_path: str, output_dir: str, page_size: int = 100):
+        """
+        :param results_path: JSONL file written by ResultsSink
+        :param output_dir: folder where index.html, pages and stylesheet are written
+        :param page_size: number of scenarios per page
+        """
+        self._results_path: str = results_path
+        self._output_dir: str = output_dir
+        self._page_size: int = max(1, page_size)
+        self._offset: int = 0
+        self._scenarios: List[dict] = []
+        self._durations: Dict[Tuple[str, str], List[float]] = {}
+        self._failures: Dict[Tuple[str, str], int] = {}
+        self._written_pages: int = 0
+
+    def _read_new_records(self) -> int:
+        try:
+            with open(self._results_path, "rb") as file:
+                file.seek(self._offset)
+                content = file.read()
+        except OSError:
+            return 0
+        # the last line may be still written by the running session
+        complete = content[: content.rfind(b"\n") + 1]
+        self._offset += len(complete)
+        count = 0
+        for line in complete.splitlines():
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            self._add(record)
+            count += 1
+        return count
+
+    def _add(self, record: dict) -> None:
+        kind = record.get("type")
+        if kind == "scenario":
+            self._scenarios.append(record)
+        elif kind in (STEP, FLOW):
+            key = (kind, str(record.get("name", "")))
+            self._durations.setdefault(key, []).append(
+                float(record.get("duration", 0.0))
+            )
+            if record.get("outcome") != "pass":
+                self._failures[key] = self._failures.get(key, 0) + 1
+
+    def _page_name(self, index: int) -> str:
+        return f"page_{index + 1:04d}.html"
+
+    def _render_page(self, index: int) -> None:
+        scenarios = self._scenarios[
+            index * self._page_size : (index + 1) * self._page_size
+        ]
+        rows = []
+        for scenario in scenarios:
+            outcome = html.escape(str(scenario.get("outcome", "")))
+            trace = scenario.get("trace")
+            trace_link = (
+                f"<a href='{html.escape(os.path.relpath(trace, self._output_dir))}'>"
+                "trace</a>"
+                if trace
+                else ""
+            )
+            browser = _web_performance_text(scenario.get("web_performance"))
+            rows.append(
+                f"<tr class='{outcome}'>"
+                f"<td>{html.escape(str(scenario.get('nodeid', '')))}</td>"
+                f"<td class='outcome'>{outcome}</td>"
+                f"<td class='number'>{float(scenario.get('duration', 0.0)):.2f}</td>"
+                f"<td>{html.escape(str(scenario.get('message', '')))}</td>"
+                f"<td>{html.escape(browser)}</td>"
+                f"<td>{trace_link}</td></tr>"
+            )
+        body = (
+            "<p><a href='index.html'>summary</a></p><table>"
+            "<tr><th>scenario</th><th>outcome</th><th>duration [s]</th>"
+            "<th>message</th><th>browser</th><th>trace</th></tr>"
+            + "".join(rows)
+            + "</table>"
+        )
+        _write_atomic(
+            os.path.join(self._output_dir, self._page_name(index)),
+            _document(f"Scenarios, page {index + 1}", body),
+        )
+
+    def _outcomes(self) -> Dict[str, int]:
+        outcomes: Dict[str, int] = {}
+        for scenario in self._scenarios:
+            outcome = str(scenario.get("outcome", ""))
+            outcomes[outcome] = outcomes.get(outcome, 0) + 1
+        return outcomes
+
+    def _render_index(self, pages: int) -> str:
+        outcomes = self._outcomes()
+        totals = ", ".join(
+            f"{count} {html.escape(outcome)}"
+            for outcome, count in sorted(outcomes.items())
+        )
+        step_rows = []
+        for (kind, name), durations in sorted(self._durations.items()):
+            step_rows.append(
+                f"<tr><td>{kind}</td><td>{html.escape(name)}</td>"
+                f"<td class='number'>{len(durations)}</td>"
+                f"<td class='number'>{self._failures.get((kind, name), 0)}</td>"
+                f"<td class='number'>{percentile(durations, 0.5) * 1000:.0f}</td>"
+                f"<td class='number'>{percentile(durations, 0.95) * 1000:.0f}</td>"
+                f"<td class='number'>{max(durations) * 1000:.0f}</td></tr>"
+            )
+        navigation = "".join(
+            f"<a href='{self._page_name(index)}'>{index + 1}</a>"
+            for index in range(pages)
+        )
+        body = (
+            f"<p>{len(self._scenarios)} scenarios: {totals or 'none yet'}</p>"
+            f"<nav>pages: {navigation}</nav>"
+            "<h2>Step latency [ms]</h2><table>"
+            "<tr><th>kind</th><th>step</th><th>count</th><th>failures</th>"
+            "<th>p50</th><th>p95</th><th>max</th></tr>"
+            + "".join(step_rows)
+            + "</table>"
+        )
+        path = os.path.join(self._output_dir, "index.html")
+        _write_atomic(path, _document("Test results", body))
+        return path
+
+    def update(self) -> str:
+        """
+        Method used for reading new records and refreshing changed files
+
+        :return: path to index.html
+        """
+        self._read_new_records()
+        os.makedirs(self._output_dir, exist_ok=True)
+        stylesheet = os.path.join(self._output_dir, STYLESHEET)
+        if not os.path.exists(stylesheet):
+            _write_atomic(stylesheet, CSS)
+        pages = -(-len(self._scenarios) // self._page_size)
+        # full pages rendered before are final, only the rest is rewritten
+        for index in range(self._written_pages, pages):
+            self._render_page(index)
+        self._written_pages = len(self._scenarios) // self._page_size
+        return self._render_index(pages)
+
+    def summary(self) -> dict:
+        """
+        Method used for reading new records and aggregating all records read so far,
+        nothing is rendered
+
+        :return: dictionary with number of scenarios per outcome
+                 and count, failures, p50 and p95 per "<kind>:<name>"
+        """
+        self._read_new_records()
+        return {
+            "scenarios": self._outcomes(),
+            "steps": {
+                f"{kind}:{name}": {
+                    "count": len(durations),
+                    "failures": self._failures.get((kind, name), 0),
+                    "p50": round(percentile(durations, 0.5), 4),
+                    "p95": round(percentile(durations, 0.95), 4),
+                }
+                for (kind, name), durations in self._durations.items()
+            },
+        }
+
+
+class EngineComparison:
+    """
+    Comparison of step latency of runs with different launch profiles,
+    like :   add_run
+            summary
+            write
+    """
+
+    def __init__(self, output_dir: str, slowdown: float = 1.5):
+        """
+        :param output_dir: folder where comparison.html and comparison.json are written
+        :param slowdown: ratio to the fastest run from which p50 of step is marked slow
+        """
+        self._output_dir: str = output_dir
+        self._slowdown: float = slowdown
+        self._runs: Dict[str, dict] = {}
+
+    def add_run(self, label: str, results_path: str) -> None:
+        """
+        Method used for adding results of one run
+
+        :param label: name of run, e.g. launch profile
+        :param results_path: JSONL file written by ResultsSink
+        """
+        self._runs[label] = IncrementalReport(results_path, self._output_dir).summary()
+
+    def summary(self) -> dict:
+        """
+        Method used for aggregation of every run
+
+        :return: dictionary keyed by label with scenario outcomes
+                 and count, failures, p50 and p95 per "<kind>:<name>"
+        """
+        return dict(self._runs)
+
+    def _row(self, key: str, summary: dict) -> str:
+        measured = {
+            label: run["steps"][key]
+            for label, run in summary.items()
+            if key in run["steps"]
+        }
+        fastest = min(step["p50"] for step in measured.values())
+        cells = []
+        for label in summary:
+            step = measured.get(label)
+            if step is None:
+                cells.append("<td></td>")
+                continue
+            if len(measured) > 1 and step["p50"] == fastest:
+                css_class = "number fastest"
+            elif fastest > 0 and step["p50"] >= fastest * self._slowdown:
+                css_class = "number slow"
+            else:
+                css_class = "number"
+            failures = f" ({step['failures']} failed)" if step["failures"] else ""
+            cells.append(
+                f"<td class='{css_class}'>{step['p50'] * 1000:.0f} / "
+                f"{step['p95'] * 1000:.0f}{failures}</td>"
+            )
+        kind, name = key.split(":", 1)
+        return (
+            f"<tr><td>{html.escape(kind)}</td><td>{html.escape(name)}</td>"
+            + "".join(cells)
+            + "</tr>"
+        )
+
+    def write(self) -> str:
+        """
+        Method used for writing comparison of all added runs
+
+        :return: path to comparison.html
+        """
+        summary = self.summary()
+        os.makedirs(self._output_dir, exist_ok=True)
+        _write_atomic(
+            os.path.join(self._output_dir, "comparison.json"),
+            json.dumps(summary, indent=2),
+        )
+        _write_atomic(os.path.join(self._output_dir, STYLESHEET), CSS)
+        labels = "".join(f"<th>{html.escape(label)}</th>" for label in summary)
+        totals = "".join(
+            "<td>"
+            + html.escape(
+                ", ".join(
+                    f"{count} {outcome}"
+                    for outcome, count in sorted(run["scenarios"].items())
+                )
+            )
+            + "</td>"
+            for run in summary.values()
+        )
+        keys = sorted({key for run in summary.values() for key in run["steps"]})
+        body = (
+            "<p>Cells show p50 / p95 in ms, the fastest run is green, runs at least "
+            f"{self._slowdown:g}&times; slower than the fastest are red.</p><table>"
+            f"<tr><th>kind</th><th>step</th>{labels}</tr>"
+            f"<tr><td colspan='2'>scenarios</td>{totals}</tr>"
+            + "".join(self._row(key, summary) for key in keys)
+            + "</table>"
+        )
+        path = os.path.join(self._output_dir, "comparison.html")
+        _write_atomic(path, _document("Comparison of launch profiles", body))
+        return path
+
+
+def main() -> None:
+    """
+    Function to render report of finished or still running session
+    """
+    parser = argparse.ArgumentParser(description="Render compact HTML report")
+    parser.add_argument("results", help="JSONL file written by ResultsSink")
+    parser.add_argument("output_dir", help="folder of rendered report")
+    parser.add_argument("--page-size", type=int, default=100)
+    arguments = parser.parse_args()
+    print(
+        IncrementalReport(
+            arguments.results, arguments.output_dir, arguments.page_size
+        ).update()
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""
+Python module for routing of browser requests, which are not needed by email flows.
+
+Router is attached to page or browser context and aborts or stubs requests
+by resource type and URL pattern, e.g. ads, trackers, images and fonts.
+"""
+
+import re
+from typing import Dict, Iterable, List, Optional
+
+from playwright.sync_api import Error, Route
+from playwright.async_api import Error as AsyncError, Route as AsyncRoute
+
+ALLOW = "allow"
+BLOCK = "block"
+STUB = "stub"
+
+AD_AND_TRACKER_HOSTS = (
+    r"^https?://([^/]*\.)?("
+    r"ssp\.seznam\.cz|h\.seznam\.cz|i\.imedia\.cz|gemius\.pl|"
+    r"doubleclick\.net|googlesyndication\.com|google-analytics\.com|"
+    r"googletagmanager\.com|facebook\.net|hotjar\.com"
+    r")/"
+)
+
+# average transfer size of blocked resources, used for estimation of saved bytes
+AVERAGE_SIZES = {
+    "image": 30_000,
+    "media": 300_000,
+    "font": 40_000,
+    "script": 50_000,
+    "stylesheet": 20_000,
+    "xhr": 2_000,
+    "fetch": 2_000,
+}
+DEFAULT_AVERAGE_SIZE = 5_000
+
+STUB_BODIES = {
+    "script": ("application/javascript", ""),
+    "stylesheet": ("text/css", ""),
+    "xhr": ("application/json", "{}"),
+    "fetch": ("application/json", "{}"),
+}
+
+
+class RouteRule:
+    """
+    Rule deciding what happens with matching request,
+    request matches when both resource type and URL pattern match
+    """
+
+    __slots__ = ("action", "resource_types", "url_pattern")
+
+    def __init__(
+        self,
+        action: str,
+        resource_types: Optional[Iterable[str]] = None,
+        url_pattern: Optional[str] = None,
+    ):
+        """
+        :param action: "allow", "block" (request is aborted) or "stub" (empty response)
+        :param resource_types: resource types of request, e.g. "image", "font"
+        :param url_pattern: regular expression searched in request URL
+        """
+        if action not in (ALLOW, BLOCK, STUB):
+            raise ValueError(f"Unknown route action: {action}")
+        self.action: str = action
+        self.resource_types: Optional[frozenset] = (
+            frozenset(resource_types) if resource_types is not None else None
+        )
+        self.url_pattern: Optional["re.Pattern"] = (
+            re.compile(url_pattern) if url_pattern is not None else None
+        )
+
+    def matches(self, resource_type: str, url: str) -> bool:
+        """
+        Method used for checking if rule is applicable on request
+
+        :param resource_type: resource type of request
+        :param url: URL of request
+        :return: True - if request matches the rule
+                 False - if request does not match the rule
+        """
+        if self.resource_types is not None and resource_type not in self.resource_types:
+            return False
+        if self.url_pattern is not None and not self.url_pattern.search(url):
+            return False
+        return True
+
+
+def default_rules() -> List[RouteRule]:
+    """
+    Function returning rules which keep only requests necessary for email flows
+
+    :return: list of rules, first matching rule is applied
+    """
+    return [
+        RouteRule(STUB, resource_types=("script",), url_pattern=AD_AND_TRACKER_HOSTS),
+        RouteRule(BLOCK, url_pattern=AD_AND_TRACKER_HOSTS),
+        RouteRule(BLOCK, resource_types=("image", "media", "font")),
+    ]
+
+
+class RequestRouter:
+    """
+    Class routing requests of page or context according to rules,
+    like :   attach
+            detach
+            attach_async
+            detach_async
+            stats
+    """
+
+    def __init__(self, rules: Optional[List[RouteRule]] = None):
+        """
+        :param rules: ordered rules, first matching rule is applied,
+                      not matched requests are allowed
+        """
+        self._rules: List[RouteRule] = default_rules() if rules is None else rules
+        self.blocked_requests: int = 0
+        self.stubbed_requests: int = 0
+        self.allowed_requests: int = 0
+        self.estimated_bytes_saved: int = 0
+        self.blocked_by_type: Dict[str, int] = {}
+
+    def _decide(self, resource_type: str, url: str) -> str:
+        for rule in self._rules:
+            if rule.matches(resource_type, url):
+                action = rule.action
+                break
+        else:
+            action = ALLOW
+        if action == ALLOW:
+            self.allowed_requests += 1
+            return action
+        if action == BLOCK:
+            self.blocked_requests += 1
+        else:
+            self.stubbed_requests += 1
+        self.blocked_by_type[resource_type] = (
+            self.blocked_by_type.get(resource_type, 0) + 1
+        )
+        self.estimated_bytes_saved += AVERAGE_SIZES.get(
+            resource_type, DEFAULT_AVERAGE_SIZE
+        )
+        return action
+
+    def _handle(self, route: Route) -> None:
+        request = route.request
+        action = self._decide(request.resource_type, request.url)
+        try:
+            if action == BLOCK:
+                route.abort("blockedbyclient")
+            elif action == STUB:
+                content_type, body = STUB_BODIES.get(
+                    request.resource_type, ("text/plain", "")
+                )
+                route.fulfill(status=200, content_type=content_type, body=body)
+            else:
+                route.fallback()
+        except Error:
+            pass
+
+    async def _handle_async(self, route: AsyncRoute) -> None:
+        request = route.request
+        action = self._decide(request.resource_type, request.url)
+        try:
+            if action == BLOCK:
+                await route.abort("blockedbyclient")
+            elif action == STUB:
+                content_type, body = STUB_BODIES.get(
+                    request.resource_type, ("text/plain", "")
+                )
+                await route.fulfill(status=200, content_type=content_type, body=body)
+            else:
+                await route.fallback()
+        except AsyncError:
+            pass
+
+    def attach(self, target) -> None:
+        """
+        Method used for routing all requests of sync page or browser context
+
+        :param target: playwright Page or BrowserContext
+        """
+        target.route("**/*", self._handle)
+
+    def detach(self, target) -> None:
+        """
+        Method used for removing routing from sync page or browser context
+
+        :param target: playwright Page or BrowserContext
+        """
+        target.unroute("**/*", self._handle)
+
+    async def attach_async(self, target) -> None:
+        """
+        Method used for routing all requests of async page or browser context
+
+        :param target: playwright Page or BrowserContext
+        """
+        await target.route("**/*", self._handle_async)
+
+    async def detach_async(self, target) -> None:
+        """
+        Method used for removing routing from async page or browser context
+
+        :param target: playwright Page or BrowserContext
+        """
+        await target.unroute("**/*", self._handle_async)
+
+    def stats(self) -> dict:
+        """
+        Method used for getting statistics of routed requests
+
+        :return: dictionary with number of allowed, blocked and stubbed requests
+                 and estimated number of saved bytes
+        """
+        return {
+            "allowed_requests": self.allowed_requests,
+            "blocked_requests": self.blocked_requests,
+            "stubbed_requests": self.stubbed_requests,
+            "blocked_by_type": dict(self.blocked_by_type),
+            "estimated_bytes_saved": self.estimated_bytes_saved,
+        }
@@ -0,0 +1,168 @@
+"""
+Python module sampling resources used by browsers and deciding when to recycle context.
+
+Webmail keeps growing in memory with every reload of the inbox, so long-lived
+SeznamEmail gets slower over hundreds of flows. ResourceMonitor samples RSS
+and CPU of browser processes (psutil is optional) and JS heap of the page
+(performance.memory exists only in Chromium) before every flow, records the
+samples into StepRecorder and tells SeznamEmail when its context should be
+replaced by a fresh one.
+"""
+
+import os
+from typing import Dict, Optional, Tuple
+
+try:
+    import psutil
+except ImportError:  # RSS and CPU are not sampled without psutil
+    psutil = None
+
+from helpers.instrumentation import RESOURCE, StepRecorder
+
+JS_HEAP_SCRIPT = """() => (
+    window.performance && performance.memory ? performance.memory.usedJSHeapSize : null
+)"""
+
+MEGABYTE = 1024 * 1024
+
+
+class ResourceSample:
+    """
+    Resources measured before one flow, None when value is not available
+    """
+
+    __slots__ = ("flows", "rss_bytes", "cpu_percent", "js_heap_bytes")
+
+    def __init__(
+        self,
+        flows: int,
+        rss_bytes: Optional[int],
+        cpu_percent: Optional[float],
+        js_heap_bytes: Optional[int],
+    ):
+        self.flows: int = flows
+        self.rss_bytes: Optional[int] = rss_bytes
+        self.cpu_percent: Optional[float] = cpu_percent
+        self.js_heap_bytes: Optional[int] = js_heap_bytes
+
+    def to_dict(self) -> dict:
+        """
+        Method used for serialization of sample into JSON compatible dictionary
+
+        :return: dictionary with all measured values
+        """
+        return {
+            "flows": self.flows,
+            "rss_mb": (
+                round(self.rss_bytes / MEGABYTE, 1)
+                if self.rss_bytes is not None
+                else None
+            ),
+            "cpu_percent": self.cpu_percent,
+            "js_heap_mb": (
+                round(self.js_heap_bytes / MEGABYTE, 1)
+                if self.js_heap_bytes is not None
+                else None
+            ),
+        }
+
+
+class ResourceMonitor:
+    """
+    Monitor of one SeznamEmail session,
+    like :   flow_started
+            recycled
+            browser_resources
+    """
+
+    def __init__(
+        self,
+        max_flows: int = 200,
+        max_rss_mb: int = 0,
+        max_js_heap_mb: int = 512,
+        min_flows: int = 10,
+        recorder: Optional[StepRecorder] = None,
+    ):
+        """
+        :param max_flows: number of flows after which context is recycled, 0 - never
+        :param max_rss_mb: RSS of all browser processes which triggers recycling, 0 - never
+        :param max_js_heap_mb: JS heap of page which triggers recycling, 0 - never
+        :param min_flows: number of flows before memory thresholds are checked,
+                          RSS shared with other sessions would recycle every flow
+        :param recorder: recorder receiving samples, shared recorder is used when missing
+        """
+        self._max_flows: int = max_flows
+        self._max_rss: int = max_rss_mb * MEGABYTE
+        self._max_js_heap: int = max_js_heap_mb * MEGABYTE
+        self._min_flows: int = min_flows
+        self._recorder: StepRecorder = (
+            recorder if recorder is not None else StepRecorder.shared()
+        )
+        # cpu_percent is measured since previous call on the same Process object
+        self._processes: Dict[int, "psutil.Process"] = {}
+        self.flows: int = 0
+        self.recycles: int = 0
+        # every sample is kept by recorder, monitor keeps only the last one
+        self.last_sample: Optional[ResourceSample] = None
+
+    def browser_resources(self) -> Tuple[Optional[int], Optional[float]]:
+        """
+        Method used for measuring all processes started by this process,
+        i.e. Playwright driver and browsers launched by it
+
+        :return: RSS in bytes and CPU in percent, None when psutil is not installed
+        """
+        if psutil is None:
+            return None, None
+        try:
+            children = psutil.Process(os.getpid()).children(recursive=True)
+        except psutil.Error:
+            return None, None
+        processes = {
+            child.pid: self._processes.get(child.pid, child) for child in children
+        }
+        self._processes = processes
+        rss, cpu = 0, 0.0
+        for process in processes.values():
+            try:
+                rss += process.memory_info().rss
+                cpu += process.cpu_percent(interval=None)
+            except psutil.Error:
+                continue
+        return rss, round(cpu, 1)
+
+    def flow_started(self, js_heap_bytes: Optional[int]) -> Optional[str]:
+        """
+        Method used for sampling resources before flow and checking thresholds
+
+        :param js_heap_bytes: result of JS_HEAP_SCRIPT evaluated in the page
+        :return: reason why context should be recycled, None when it can be kept
+        """
+        with self._recorder.measure("sample", RESOURCE) as record:
+            self.flows += 1
+            rss, cpu = self.browser_resources()
+            sample = ResourceSample(self.flows, rss, cpu, js_heap_bytes)
+            self.last_sample = sample
+            record.details.update(sample.to_dict())
+            record.outcome = "pass"
+        if self._max_flows and self.flows > self._max_flows:
+            return f"{self._max_flows} flows"
+        if self.flows < self._min_flows:
+            return None
+        if self._max_rss and rss is not None and rss > self._max_rss:
+            return f"browser RSS over {self._max_rss // MEGABYTE} MB"
+        if (
+            self._max_js_heap
+            and js_heap_bytes is not None
+            and js_heap_bytes > self._max_js_heap
+        ):
+            return f"JS heap over {self._max_js_heap // MEGABYTE} MB"
+        return None
+
+    def recycled(self) -> None:
+        """
+        Method used for starting counting of flows of new context,
+        the flow which triggered recycling is the first one of new context
+        """
+        self.flows = 1
+        self.recycles += 1
@@ -0,0 +1,130 @@
+"""
+Python module with streaming sink of test results.
+
+Every finished step, flow and scenario is appended as one JSON line,
+so results are available while the run is still going.
+ResultsStreamPlugin feeds the sink from pytest and refreshes compact report.
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional, TextIO
+
+from helpers.instrumentation import StepRecord
+from helpers.report_renderer import IncrementalReport
+
+
+class ResultsSink:
+    """
+    Append-only JSONL file with results of the run,
+    like :   write
+            write_record
+            close
+    """
+
+    def __init__(self, path: str):
+        """
+        :param path: JSONL file, existing content is replaced
+        """
+        self.path: str = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file: Optional[TextIO] = open(path, "w", encoding="utf-8")
+        self._lock = threading.Lock()
+        self.write({"type": "run", "started": time.time(), "pid": os.getpid()})
+
+    def write(self, record: dict) -> None:
+        """
+        Method used for appending one record, line is flushed immediately
+
+        :param record: JSON compatible dictionary with "type" key
+        """
+        line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(line)
+            self._file.flush()
+
+    def write_record(self, record: StepRecord) -> None:
+        """
+        Method used as StepRecorder listener
+
+        :param record: finished step or flow
+        """
+        self.write({"type": record.kind, **record.to_dict()})
+
+    def close(self) -> None:
+        """
+        Method used for closing the file, further records are ignored
+        """
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class ResultsStreamPlugin:
+    """
+    Pytest plugin streaming scenario results into ResultsSink
+    and refreshing IncrementalReport during the run
+    """
+
+    def __init__(
+        self, sink: ResultsSink, report: IncrementalReport, refresh_interval: int = 25
+    ):
+        """
+        :param sink: sink receiving scenario records
+        :param report: compact report rendered from the sink
+        :param refresh_interval: number of scenarios after which report is refreshed
+        """
+        self._sink: ResultsSink = sink
+        self._report: IncrementalReport = report
+        self._refresh_interval: int = max(1, refresh_interval)
+        self._phases: Dict[str, list] = {}
+        self._scenarios: int = 0
+
+    @staticmethod
+    def _scenario_record(phases: list) -> dict:
+        failed = [phase for phase in phases if phase.failed]
+        call = next((phase for phase in phases if phase.when == "call"), None)
+        if failed:
+            outcome = "failed"
+        elif call is None or call.skipped:
+            outcome = "skipped"
+        else:
+            outcome = "passed"
+        message = ""
+        if failed:
+            crash = getattr(failed[0].longrepr, "reprcrash", None)
+            lines = failed[0].longreprtext.strip().splitlines()
+            message = crash.message if crash is not None else (lines or [""])[-1]
+        record = {
+            "type": "scenario",
+            "nodeid": phases[-1].nodeid,
+            "outcome": outcome,
+            "duration": round(sum(phase.duration for phase in phases), 4),
+            "message": message,
+        }
+        for phase in phases:
+            record.update(
+                (name, value)
+                for name, value in phase.user_properties
+                if name in ("trace", "web_performance")
+            )
+        return record
+
+    def pytest_runtest_logreport(self, report) -> None:
+        phases = self._phases.setdefault(report.nodeid, [])
+        phases.append(report)
+        if report.when != "teardown":
+            return
+        self._sink.write(self._scenario_record(self._phases.pop(report.nodeid)))
+        self._scenarios += 1
+        if self._scenarios % self._refresh_interval == 0:
+            self._report.update()
+
+    def pytest_unconfigure(self, config) -> None:
+        self._sink.close()
+        self._report.update()
@@ -0,0 +1,98 @@
+"""
+Python module for caching authenticated browser sessions on disk.
+
+Sessions are stored as Playwright storage_state keyed by credential name,
+so SeznamEmail.login can skip the UI login while the session is fresh.
+Login restores cookies and localStorage of every stored origin, the webmail
+keeps parts of its state (e.g. selected account) in localStorage.
+"""
+
+import json
+import os
+import re
+import time
+from typing import Optional
+
+from helpers.paths import CACHE_DIR
+
+DEFAULT_SESSION_DIR = os.path.join(CACHE_DIR, "sessions")
+# path served as blank page, so localStorage of origin is written without loading it
+RESTORE_PATH = "/__session_restore__"
+RESTORE_STORAGE_SCRIPT = """(items) => {
+    for (const item of items) {
+        window.localStorage.setItem(item.name, item.value);
+    }
+}"""
+
+
+class SessionCache:
+    """
+    Class consists of methods for storing authenticated sessions,
+    like :   load
+            save
+            invalidate
+    """
+
+    def __init__(self, directory: str = DEFAULT_SESSION_DIR, max_age: float = 6 * 3600):
+        """
+        :param directory: folder where session files are stored
+        :param max_age: number of seconds after which stored session is considered stale
+        """
+        self._directory: str = directory
+        self._max_age: float = max_age
+
+    def _path(self, name: str) -> str:
+        file_name = re.sub(r"[^A-Za-z0-9_.-]", "_", name)
+        return os.path.join(self._directory, f"{file_name}.json")
+
+    def load(self, name: str) -> Optional[dict]:
+        """
+        Method used to load up stored session
+
+        :param name: name of credentials which session belongs to
+        :return: storage_state - dictionary accepted by playwright contexts
+                 None - in case session is missing, damaged or expired
+        """
+        try:
+            with open(self._path(name), encoding="utf-8") as file:
+                stored = json.load(file)
+            saved_at = stored["saved_at"]
+            storage_state = stored["storage_state"]
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        now = time.time()
+        if now - saved_at > self._max_age:
+            self.invalidate(name)
+            return None
+        cookies = storage_state.get("cookies", [])
+        if not cookies or all(
+            0 < cookie.get("expires", -1) < now for cookie in cookies
+        ):
+            self.invalidate(name)
+            return None
+        return storage_state
+
+    def save(self, name: str, storage_state: dict) -> None:
+        """
+        Method used to store session after successful login
+
+        :param name: name of credentials which session belongs to
+        :param storage_state: dictionary returned by BrowserContext.storage_state()
+        """
+        os.makedirs(self._directory, exist_ok=True)
+        path = self._path(name)
+        temporary_path = f"{path}.tmp"
+        with open(temporary_path, "w", encoding="utf-8") as file:
+            json.dump({"saved_at": time.time(), "storage_state": storage_state}, file)
+        os.replace(temporary_path, path)
+
+    def invalidate(self, name: str) -> None:
+        """
+        Method used to remove stored session, e.g. when it is not accepted anymore
+
+        :param name: name of credentials which session belongs to
+        """
+        try:
+            os.remove(self._path(name))
+        except FileNotFoundError:
+            pass
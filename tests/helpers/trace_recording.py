@@ -0,0 +1,140 @@
+"""
+Python module for failure-only Playwright tracing.
+
+Tracing runs for whole browser context and every test case is one trace chunk.
+Chunk of passing test case is thrown away, chunk of failing one is written
+into directory kept under size limit by removing the oldest traces.
+"""
+
+import os
+import re
+import time
+from typing import List, Optional
+
+from playwright.sync_api import BrowserContext, Error
+
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024
+UNSAFE_CHARACTERS = re.compile(r"[^A-Za-z0-9_.-]+")
+
+
+class TraceRingBuffer:
+    """
+    Directory of trace archives limited by total size and number of files,
+    like :   reserve
+            trim
+    """
+
+    def __init__(
+        self, directory: str, max_bytes: int = DEFAULT_MAX_BYTES, max_files: int = 50
+    ):
+        """
+        :param directory: folder where trace archives are stored
+        :param max_bytes: maximal total size of stored traces
+        :param max_files: maximal number of stored traces
+        """
+        self.directory: str = directory
+        self._max_bytes: int = max_bytes
+        self._max_files: int = max_files
+
+    def reserve(self, name: str) -> str:
+        """
+        Method used for getting path of new trace archive
+
+        :param name: name of test case, unsafe characters are replaced
+        :return: path to not yet existing .zip file
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        safe_name = UNSAFE_CHARACTERS.sub("_", name).strip("_")[:100] or "trace"
+        return os.path.join(
+            self.directory, f"{time.strftime('%Y%m%d_%H%M%S')}_{safe_name}.zip"
+        )
+
+    def _traces(self) -> List[os.DirEntry]:
+        try:
+            entries = [
+                entry
+                for entry in os.scandir(self.directory)
+                if entry.is_file() and entry.name.endswith(".zip")
+            ]
+        except OSError:
+            return []
+        return sorted(entries, key=lambda entry: entry.stat().st_mtime)
+
+    def trim(self, keep: Optional[str] = None) -> None:
+        """
+        Method used for removing the oldest traces over limits
+
+        :param keep: path to trace which is never removed, e.g. just written one
+        """
+        traces = [(entry.path, entry.stat().st_size) for entry in self._traces()]
+        total = sum(size for _, size in traces)
+        count = len(traces)
+        kept = os.path.abspath(keep) if keep is not None else None
+        for path, size in traces:
+            if total <= self._max_bytes and count <= self._max_files:
+                return
+            if os.path.abspath(path) == kept:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            count -= 1
+
+
+class FailureTracer:
+    """
+    Trace chunk per test case stored only when test case fails,
+    like :   start
+            stop
+    """
+
+    def __init__(self, ring_buffer: TraceRingBuffer):
+        """
+        :param ring_buffer: storage of traces of failing test cases
+        """
+        self._ring_buffer: TraceRingBuffer = ring_buffer
+        self._context: Optional[BrowserContext] = None
+
+    def start(self, context: BrowserContext, title: str) -> bool:
+        """
+        Method used for starting trace chunk, tracing of context is started on first use
+
+        :param context: browser context of tested SeznamEmail
+        :param title: title of chunk shown in trace viewer
+        :return: True - if chunk was started
+                 False - if tracing is not available for context
+        """
+        self._context = None
+        try:
+            context.tracing.start_chunk(title=title)
+        except Error:
+            try:
+                context.tracing.start(title=title, screenshots=True, snapshots=True)
+            except Error:
+                return False
+        self._context = context
+        return True
+
+    def stop(self, failed: bool, name: str) -> Optional[str]:
+        """
+        Method used for finishing trace chunk
+
+        :param failed: True - chunk is stored, False - chunk is discarded
+        :param name: name of test case used in file name
+        :return: path to stored trace, None if nothing was stored
+        """
+        context, self._context = self._context, None
+        if context is None:
+            return None
+        try:
+            if not failed:
+                context.tracing.stop_chunk()
+                return None
+            path = self._ring_buffer.reserve(name)
+            context.tracing.stop_chunk(path=path)
+        except Error:
+            return None
+        self._ring_buffer.trim(keep=path)
+        return path
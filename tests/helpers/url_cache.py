@@ -0,0 +1,91 @@
+"""
+Python module for caching resolved navigation targets on disk.
+
+Login page is found by loading the whole seznam.cz portal and reading href
+of its login link. The resolved URL is stored, so next logins navigate
+directly and the portal is loaded again only when cached URL stops working.
+"""
+
+import json
+import os
+import time
+from typing import Dict, Optional
+
+from helpers.paths import CACHE_DIR
+
+DEFAULT_URL_CACHE_FILE = os.path.join(CACHE_DIR, "urls.json")
+
+
+class UrlCache:
+    """
+    Class consists of methods for storing resolved URLs,
+    like :   get
+            put
+            invalidate
+    """
+
+    def __init__(
+        self, path: str = DEFAULT_URL_CACHE_FILE, max_age: float = 7 * 24 * 3600
+    ):
+        """
+        :param path: JSON file where URLs are stored
+        :param max_age: number of seconds after which stored URL is resolved again
+        """
+        self._path: str = path
+        self._max_age: float = max_age
+        self._entries: Optional[Dict[str, dict]] = None
+
+    def _load(self) -> Dict[str, dict]:
+        if self._entries is None:
+            try:
+                with open(self._path, encoding="utf-8") as file:
+                    entries = json.load(file)
+            except (OSError, ValueError):
+                entries = {}
+            self._entries = entries if isinstance(entries, dict) else {}
+        return self._entries
+
+    def _store(self) -> None:
+        try:
+            os.makedirs(os.path.dirname(self._path), exist_ok=True)
+            temporary_path = f"{self._path}.tmp"
+            with open(temporary_path, "w", encoding="utf-8") as file:
+                json.dump(self._load(), file)
+            os.replace(temporary_path, self._path)
+        except OSError:
+            pass
+
+    def get(self, name: str) -> Optional[str]:
+        """
+        Method used to get stored URL
+
+        :param name: name of navigation target, e.g. "login_page"
+        :return: URL - in case it is stored and fresh
+                 None - in case it is missing, damaged or expired
+        """
+        entry = self._load().get(name)
+        try:
+            if time.time() - entry["saved_at"] <= self._max_age:
+                return str(entry["url"])
+        except (KeyError, TypeError):
+            pass
+        return None
+
+    def put(self, name: str, url: str) -> None:
+        """
+        Method used to store URL resolved by navigation
+
+        :param name: name of navigation target
+        :param url: absolute URL of the target
+        """
+        self._load()[name] = {"url": url, "saved_at": time.time()}
+        self._store()
+
+    def invalidate(self, name: str) -> None:
+        """
+        Method used to remove stored URL, e.g. when navigation to it failed
+
+        :param name: name of navigation target
+        """
+        if self._load().pop(name, None) is not None:
+            self._store()
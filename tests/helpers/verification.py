@@ -0,0 +1,245 @@
+"""
+Python module with backends verifying received emails without the browser UI.
+
+SeznamEmail.check_last_received_email uses the backend when it is configured,
+otherwise the email is verified through the webmail UI.
+"""
+
+import email
+import email.policy
+import imaplib
+import time
+from abc import ABC, abstractmethod
+from email.message import EmailMessage
+from email.utils import parseaddr
+from typing import Dict, List, Optional, Set, Tuple, Union
+
+from helpers.attachments import Attachment, as_attachment, digest
+from helpers.deadline import clamp_timeout
+
+
+class VerificationBackend(ABC):
+    """
+    Interface of received email verification,
+    like :   use_credentials
+            record_baseline
+            check_received_email
+            close
+    """
+
+    def use_credentials(self, email_address: str, password: str) -> None:
+        """
+        Method called by SeznamEmail.login with credentials of the mailbox
+
+        :param email_address: email address of the mailbox
+        :param password: password of the mailbox
+        """
+
+    def record_baseline(self, receiver_email: str, subject: str) -> None:
+        """
+        Method called by SeznamEmail.send_email before the email is sent,
+        emails already in the mailbox must not satisfy the next check
+
+        :param receiver_email: email address where email should be sent
+        :param subject: subject of email
+        """
+
+    @abstractmethod
+    def check_received_email(
+        self,
+        receiver_email: str,
+        subject: str,
+        message: str,
+        path: Union[str, Attachment],
+    ) -> Tuple[bool, str]:
+        """
+        Method used for checking if email was correctly received
+
+        :param receiver_email: email address where email should be sent
+        :param subject: define subject of email
+        :param message: define message of email
+        :param path: define path to file or Attachment which should be attached to the email
+        :return: True - if the received email has correct attributes
+                 False - if the received email has not correct attributes
+                 message - provide more information, like reason of fail, etc.
+        """
+
+    def close(self) -> None:
+        """
+        Method used to release resources of the backend
+        """
+
+
+def _quote(value: str) -> str:
+    return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+class ImapVerificationBackend(VerificationBackend):
+    """
+    Verification over IMAP with reused connection and server side SEARCH
+    """
+
+    def __init__(
+        self,
+        host: str = "imap.seznam.cz",
+        port: int = 993,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        use_ssl: bool = True,
+        mailbox: str = "INBOX",
+        timeout: float = 120,
+        poll_interval: float = 1.0,
+    ):
+        """
+        :param host: IMAP server
+        :param port: IMAP port
+        :param username: login of the mailbox, can be provided later by use_credentials
+        :param password: password of the mailbox, can be provided later by use_credentials
+        :param use_ssl: True - IMAP over TLS, False - plain IMAP (e.g. local stand-in)
+        :param mailbox: mailbox where received emails are searched
+        :param timeout: maximal number of seconds spent by waiting for email
+        :param poll_interval: number of seconds between searches, doubled up to 10 s
+        """
+        self._host: str = host
+        self._port: int = port
+        self._username: Optional[str] = username
+        self._password: Optional[str] = password
+        self._use_ssl: bool = use_ssl
+        self._mailbox: str = mailbox
+        self._timeout: float = timeout
+        self._poll_interval: float = poll_interval
+        self._connection: Optional[imaplib.IMAP4] = None
+        self._verified_uids: Set[bytes] = set()
+        # the highest UID matching sender and subject before the email was sent
+        self._baselines: Dict[Tuple[str, str], int] = {}
+
+    def use_credentials(self, email_address: str, password: str) -> None:
+        if (email_address, password) != (self._username, self._password):
+            self.close()
+        if email_address != self._username:
+            # UIDs of other mailbox mean nothing in this one
+            self._verified_uids.clear()
+            self._baselines.clear()
+        self._username = email_address
+        self._password = password
+
+    def _connect(self) -> imaplib.IMAP4:
+        if self._connection is not None:
+            try:
+                self._connection.noop()
+                return self._connection
+            except (imaplib.IMAP4.abort, OSError):
+                self._connection = None
+        if self._use_ssl:
+            connection = imaplib.IMAP4_SSL(self._host, self._port)
+        else:
+            connection = imaplib.IMAP4(self._host, self._port)
+        connection.login(self._username or "", self._password or "")
+        self._connection = connection
+        return connection
+
+    def _search(
+        self, connection: imaplib.IMAP4, sender: str, subject: str
+    ) -> List[bytes]:
+        connection.select(self._mailbox, readonly=True)
+        criteria = ["FROM", _quote(sender), "SUBJECT"]
+        if subject.isascii():
+            status, data = connection.uid("SEARCH", *criteria, _quote(subject))
+        else:
+            connection.literal = subject.encode("utf-8")
+            status, data = connection.uid("SEARCH", "CHARSET", "UTF-8", *criteria)
+        if status != "OK" or not data or not data[0]:
+            return []
+        return data[0].split()
+
+    @staticmethod
+    def _fetch(connection: imaplib.IMAP4, uid: bytes) -> Optional[EmailMessage]:
+        status, data = connection.uid("FETCH", uid, "(BODY.PEEK[])")
+        if status != "OK":
+            return None
+        for part in data:
+            if isinstance(part, tuple):
+                return email.message_from_bytes(part[1], policy=email.policy.default)
+        return None
+
+    def record_baseline(self, receiver_email: str, subject: str) -> None:
+        try:
+            uids = self._search(self._connect(), receiver_email, subject)
+        except (imaplib.IMAP4.error, OSError):
+            self.close()
+            return
+        self._baselines[(receiver_email, subject)] = max(map(int, uids), default=0)
+
+    def _find(
+        self, receiver_email: str, subject: str, timeout: float
+    ) -> Optional[EmailMessage]:
+        deadline = time.monotonic() + timeout
+        delay = self._poll_interval
+        baseline = self._baselines.pop((receiver_email, subject), 0)
+        while True:
+            connection = self._connect()
+            uids = [
+                uid
+                for uid in self._search(connection, receiver_email, subject)
+                if uid not in self._verified_uids and int(uid) > baseline
+            ]
+            if uids:
+                newest = max(uids, key=int)
+                self._verified_uids.add(newest)
+                return self._fetch(connection, newest)
+            if time.monotonic() + delay > deadline:
+                return None
+            time.sleep(delay)
+            delay = min(delay * 2, 10.0)
+
+    @staticmethod
+    def _body(received: EmailMessage) -> str:
+        body = received.get_body(preferencelist=("plain", "html"))
+        return body.get_content().strip() if body is not None else ""
+
+    @staticmethod
+    def _attachment_digest(received: EmailMessage, file_name: str) -> Optional[str]:
+        for attachment in received.iter_attachments():
+            if attachment.get_filename() == file_name:
+                return digest([attachment.get_payload(decode=True) or b""])
+        return None
+
+    def check_received_email(
+        self,
+        receiver_email: str,
+        subject: str,
+        message: str,
+        path: Union[str, Attachment],
+    ) -> Tuple[bool, str]:
+        # flow deadline limits waiting, DeadlineExceeded fails the calling flow
+        timeout = clamp_timeout(self._timeout * 1000) / 1000
+        try:
+            received = self._find(receiver_email, subject, timeout)
+        except (imaplib.IMAP4.error, OSError) as error:
+            self.close()
+            return False, f"Not able to search emails over IMAP: {error}"
+        if received is None:
+            return False, "Email was not received"
+        if parseaddr(received.get("From", ""))[1] != receiver_email:
+            return False, "Invalid email sender"
+        if received.get("Subject", "") != subject:
+            return False, "Invalid email subject"
+        if self._body(received) != message.strip():
+            return False, "Invalid email message context"
+        expected = as_attachment(path)
+        try:
+            expected_digest = expected.sha256()
+        except OSError:
+            return False, "Not able to read expected attachment file"
+        if self._attachment_digest(received, expected.name) != expected_digest:
+            return False, "Invalid email attachment file"
+        return True, "Received email is valid"
+
+    def close(self) -> None:
+        if self._connection is None:
+            return
+        try:
+            self._connection.logout()
+        except (imaplib.IMAP4.error, OSError):
+            pass
+        self._connection = None
@@ -0,0 +1,198 @@
+"""
+Python module collecting browser-side performance metrics of SeznamEmail steps.
+
+Python timers of steps can not tell whether time was spent by server,
+rendering or waiting. WebPerformanceCollector is StepHook which reads
+Navigation Timing, Resource Timing, paint and long task entries from the page
+after navigations and major actions, stores them into details of step record
+and sums them up per scenario. Long tasks are reported only by Chromium.
+"""
+
+from typing import Iterable, Optional
+
+from playwright.sync_api import Error
+from playwright.async_api import Error as AsyncError
+
+from helpers.instrumentation import StepHook, StepRecord
+
+DEFAULT_STEPS = (
+    "_go_to_seznam_page",
+    "_go_to_login",
+    "_go_to_cached_login",
+    "_click_login_button",
+    "_open_new_email",
+    "_click_to_send_email",
+    "_load_last_received_email",
+    "_scan_inbox",
+    "_open_listed_email",
+)
+
+# entries older than previous collection in the same document are skipped,
+# long tasks are not kept by performance timeline, so observer is installed on first use
+COLLECT_SCRIPT = """([origin, since]) => {
+    const sameDocument = performance.timeOrigin === origin;
+    const from = sameDocument ? since : 0;
+    if (!window.__seznamLongTasks) {
+        window.__seznamLongTasks = [];
+        try {
+            const observer = new PerformanceObserver((list) => {
+                window.__seznamLongTasks.push(...list.getEntries());
+            });
+            observer.observe({type: "longtask", buffered: true});
+            window.__seznamLongTaskObserver = observer;
+        } catch (e) {}
+    }
+    if (window.__seznamLongTaskObserver) {
+        window.__seznamLongTasks.push(...window.__seznamLongTaskObserver.takeRecords());
+    }
+    const longTasks = window.__seznamLongTasks.splice(0).filter((e) => e.startTime >= from);
+    const resources = performance.getEntriesByType("resource")
+        .filter((e) => e.startTime >= from);
+    const navigation = performance.getEntriesByType("navigation")[0];
+    const paint = {};
+    for (const entry of performance.getEntriesByType("paint")) {
+        paint[entry.name] = entry.startTime;
+    }
+    return {
+        origin: performance.timeOrigin,
+        now: performance.now(),
+        navigation: sameDocument || !navigation ? null : {
+            url: navigation.name,
+            ttfb: navigation.responseStart - navigation.requestStart,
+            dom_content_loaded: navigation.domContentLoadedEventEnd,
+            load: navigation.loadEventEnd,
+            transfer_size: navigation.transferSize || 0,
+            first_contentful_paint: paint["first-contentful-paint"] ?? null,
+        },
+        resources: resources.length,
+        transfer_size: resources.reduce((sum, e) => sum + (e.transferSize || 0), 0),
+        slowest_resources: resources
+            .sort((a, b) => b.duration - a.duration)
+            .slice(0, 3)
+            .map((e) => ({url: e.name, duration: Math.round(e.duration)})),
+        long_tasks: longTasks.length,
+        long_task_time: longTasks.reduce((sum, e) => sum + e.duration, 0),
+    };
+}"""
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return round(value, 1) if value is not None else None
+
+
+class WebPerformanceCollector(StepHook):
+    """
+    StepHook reading web performance entries of SeznamEmail page,
+    like :   after_step
+            take_summary
+    """
+
+    def __init__(self, steps: Optional[Iterable[str]] = DEFAULT_STEPS):
+        """
+        :param steps: names of steps after which entries are read, None - every step
+        """
+        self._steps: Optional[frozenset] = (
+            frozenset(steps) if steps is not None else None
+        )
+        self._origin: float = 0.0
+        self._since: float = 0.0
+        self._summary: dict = {}
+        self.take_summary()
+
+    def _wanted(self, name: str) -> bool:
+        return self._steps is None or name in self._steps
+
+    def _store(self, entries: Optional[dict], record: StepRecord) -> None:
+        if not isinstance(entries, dict):
+            return
+        self._origin = entries["origin"]
+        self._since = entries["now"]
+        metrics = {
+            "resources": entries["resources"],
+            "transfer_size": entries["transfer_size"],
+            "slowest_resources": entries["slowest_resources"],
+            "long_tasks": entries["long_tasks"],
+            "long_task_time": _round(entries["long_task_time"]),
+        }
+        navigation = entries["navigation"]
+        summary = self._summary
+        if navigation is not None:
+            metrics["navigation"] = {
+                name: _round(value) if isinstance(value, float) else value
+                for name, value in navigation.items()
+            }
+            summary["navigations"] += 1
+            summary["transfer_size"] += navigation["transfer_size"]
+            summary["ttfb_max"] = max(summary["ttfb_max"], _round(navigation["ttfb"]))
+            summary["dom_content_loaded_max"] = max(
+                summary["dom_content_loaded_max"],
+                _round(navigation["dom_content_loaded"]),
+            )
+        summary["resources"] += entries["resources"]
+        summary["transfer_size"] += entries["transfer_size"]
+        summary["long_tasks"] += entries["long_tasks"]
+        summary["long_task_time"] = _round(
+            summary["long_task_time"] + entries["long_task_time"]
+        )
+        record.details["web_performance"] = metrics
+
+    def take_summary(self) -> dict:
+        """
+        Method used for getting metrics summed up since previous call, e.g. per scenario,
+        times are in milliseconds and sizes in bytes
+
+        :return: navigations, max TTFB, max DOM ready, resources, transferred bytes
+                 and long tasks
+        """
+        summary, self._summary = self._summary, {
+            "navigations": 0,
+            "ttfb_max": 0.0,
+            "dom_content_loaded_max": 0.0,
+            "resources": 0,
+            "transfer_size": 0,
+            "long_tasks": 0,
+            "long_task_time": 0.0,
+        }
+        return summary
+
+    def after_step(self, owner, name: str, record: StepRecord) -> None:
+        """
+        Method used for reading entries added since previous collection into record
+
+        :param owner: SeznamEmail running the step
+        :param name: name of the step
+        :param record: record of the step
+        """
+        if not self._wanted(name):
+            return
+        try:
+            entries = owner.page.evaluate(COLLECT_SCRIPT, [self._origin, self._since])
+        except Error:  # page may be closed or navigating, metrics are optional
+            return
+        self._store(entries, record)
+
+
+class AsyncWebPerformanceCollector(WebPerformanceCollector):
+    """
+    Asyncio variant of WebPerformanceCollector for AsyncSeznamEmail,
+    like :   after_step
+            take_summary
+    """
+
+    async def after_step(self, owner, name: str, record: StepRecord) -> None:
+        """
+        Method used for reading entries added since previous collection into record
+
+        :param owner: AsyncSeznamEmail running the step
+        :param name: name of the step
+        :param record: record of the step
+        """
+        if not self._wanted(name):
+            return
+        try:
+            entries = await owner.page.evaluate(
+                COLLECT_SCRIPT, [self._origin, self._since]
+            )
+        except AsyncError:  # page may be closed or navigating, metrics are optional
+            return
+        self._store(entries, record)
@@ -2,33 +2,70 @@
 Representing steps, which can be used for testing seznam email
 corresponding feature file : email_test_1.feature
 """
+import os
+
 from pytest_bdd import scenarios, given, when, then, parsers
 
 from helpers.email_manipulation import EmailInputs
+from helpers.paths import BASEDIR
 
 # Load all scenarios from the feature file
 scenarios("../features/email_test_1.feature")
 
 
+def _load_credentials(context, testing_email, worker_credential) -> bool:
+    credential_name = worker_credential or testing_email
+    result = EmailInputs.get_email_login(credential_name)
+    if result is None:
+        return False
+    context["email"], context["password"] = result
+    context["credential_name"] = credential_name
+    return True
+
+
 @given(parsers.parse("load email login credentials from {testing_email}"))
-def get_email_credentials(context, testing_email):
+def get_email_credentials(context, testing_email, worker_credential):
     """
     Step used for getting access credentials for email and store them into context variable
 
     :param context: variable which could be access in all steps
     :param testing_email: email used for testing
+    :param worker_credential: credential assigned to this worker, replaces testing_email
     :return:
     """
-    result = EmailInputs.get_email_login(testing_email)
-    if result is not None:
-        email, password = result
-        context["email"] = email
-        context["password"] = password
+    if _load_credentials(context, testing_email, worker_credential):
         assert True, f"Valid credential used: {testing_email}"
     else:
         assert False, f"Invalid credential used: {testing_email}"
 
 
+@given(parsers.parse("logged into email with credentials from {testing_email}"))
+def logged_in_email(context, testing_email, worker_credential):
+    """
+    Step used for making scenario independent of previous ones,
+    sign up is done only when this worker is not signed in yet
+
+    :param context: variable which could be access in all steps
+    :param testing_email: email used for testing
+    :param worker_credential: credential assigned to this worker, replaces testing_email
+    :return:
+    """
+    if context.get("logged_in"):
+        return
+    if not _load_credentials(context, testing_email, worker_credential):
+        assert False, f"Invalid credential used: {testing_email}"
+    result, message = context["testing_email"].login(
+        context["email"], context["password"], context["credential_name"]
+    )
+    if result:
+        result, message = context["testing_email"].check_successful_login()
+    context["logged_in"] = result
+    if not result:
+        assert False, message
+    else:
+        assert True, message
+
+
 @when("log into email")
 def log_in_to_email(context):
     """
@@ -38,7 +75,7 @@ def log_in_to_email(context):
     :return:
     """
     result, message = context["testing_email"].login(
-        context["email"], context["password"]
+        context["email"], context["password"], context.get("credential_name")
     )
     if not result:
         assert False, message
@@ -55,6 +92,7 @@ def login_validation(context):
     :return:
     """
     result, message = context["testing_email"].check_successful_login()
+    context["logged_in"] = result
     if not result:
         assert False, message
     else:
@@ -67,10 +105,13 @@ def load_email_context(context, email_context_path):
     Step used to load up context of email from .json file and store it into context variable
 
     :param context: variable which could be access in all steps
-    :param email_context_path: define path to file which should be attached to the email
+    :param email_context_path: path to json file with email context,
+                               relative path is resolved against project folder
     :return:
     """
-    result = EmailInputs.load_email_context(email_context_path)
+    result = EmailInputs.load_email_context(
+        os.path.join(BASEDIR, email_context_path)
+    )
     if result is not None:
         context["email_context"] = {
             "subject": result[0],
@@ -132,6 +173,8 @@ def log_out(context):
     :return:
     """
     result, message = context["testing_email"].logout()
+    if result:
+        context["logged_in"] = False
     if not result:
         assert False, message
     else:
@@ -0,0 +1,92 @@
+"""
+Unit tests of attachment payloads, staging of large content and digests
+"""
+
+import hashlib
+import os
+
+import pytest
+
+from helpers import attachments
+from helpers.attachments import (
+    Attachment,
+    FileAttachment,
+    GeneratedAttachment,
+    as_attachment,
+    digest,
+    iter_file,
+)
+
+
+@pytest.fixture
+def small_limits(monkeypatch):
+    monkeypatch.setattr(attachments, "CHUNK_SIZE", 4)
+    monkeypatch.setattr(attachments, "MAX_BUFFER_PAYLOAD", 10)
+
+
+def test_content_up_to_limit_is_passed_as_buffer(small_limits):
+    """
+    Test checking buffer payload of content exactly at MAX_BUFFER_PAYLOAD
+    """
+    payload = Attachment("note.txt", b"0123456789").payload()
+    assert payload == {
+        "name": "note.txt",
+        "mimeType": "text/plain",
+        "buffer": b"0123456789",
+    }
+
+
+def test_content_over_limit_is_staged_under_its_digest(small_limits, tmp_path):
+    """
+    Test checking that larger content is written to staging file by chunks
+    """
+    attachment = Attachment("big.bin", b"0123456789A")
+    attachment.staging_dir = str(tmp_path)
+    path = attachment.payload()
+    expected_digest = hashlib.sha256(b"0123456789A").hexdigest()
+    assert path == os.path.join(str(tmp_path), expected_digest, "big.bin")
+    with open(path, "rb") as file:
+        assert file.read() == b"0123456789A"
+    assert attachment.payload() == path
+    assert sorted(os.listdir(str(tmp_path))) == [expected_digest]
+
+
+def test_generated_content_is_staged_without_buffer(small_limits, tmp_path):
+    """
+    Test checking that generated attachment over limit is streamed into file
+    """
+    attachment = GeneratedAttachment("big.bin", 25, seed=7)
+    attachment.staging_dir = str(tmp_path)
+    path = attachment.payload()
+    assert os.path.getsize(path) == 25
+    assert digest(iter_file(path)) == attachment.sha256()
+    assert GeneratedAttachment("big.bin", 25, seed=7).sha256() == attachment.sha256()
+    assert GeneratedAttachment("big.bin", 25, seed=8).sha256() != attachment.sha256()
+
+
+def test_digest_does_not_depend_on_chunking(small_limits, tmp_path):
+    """
+    Test checking digest of memory, file and chunked content
+    """
+    content = b"content split into several chunks"
+    path = tmp_path / "note.txt"
+    path.write_bytes(content)
+    expected = hashlib.sha256(content).hexdigest()
+    assert len(list(iter_file(str(path)))) == 9
+    assert digest(iter_file(str(path))) == expected
+    assert Attachment("note.txt", content).sha256() == expected
+    assert FileAttachment(str(path)).sha256() == expected
+    assert digest([]) == hashlib.sha256(b"").hexdigest()
+
+
+def test_file_attachment_is_passed_by_path(tmp_path):
+    """
+    Test checking that path of email context is sent as file
+    """
+    path = str(tmp_path / "report.pdf")
+    attachment = as_attachment(path)
+    assert isinstance(attachment, FileAttachment)
+    assert attachment.name == "report.pdf"
+    assert attachment.mime_type == "application/pdf"
+    assert attachment.payload() == path
+    assert as_attachment(attachment) is attachment
@@ -0,0 +1,122 @@
+"""
+Unit tests of Deadline budget, its nesting and expiry inside recorded flows
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from helpers.batch_report import BatchReport
+from helpers.deadline import Deadline, DeadlineExceeded, clamp_timeout
+from helpers.instrumentation import FLOW, StepRecorder, recorded
+
+
+class _Flows:
+    """
+    Owner of recorded methods waiting through clamp_timeout
+    """
+
+    def __init__(self):
+        self._recorder = StepRecorder()
+
+    @recorded()
+    def _wait(self, milliseconds: float) -> bool:
+        time.sleep(clamp_timeout(milliseconds) / 1000)
+        return True
+
+    @recorded(FLOW, budget=0.2)
+    def inner_flow(self) -> tuple:
+        return True, f"{Deadline.current().budget:g}"
+
+    @recorded(FLOW, budget=0.1)
+    def waiting_flow(self) -> tuple:
+        ok = self._wait(200) and self._wait(200)
+        return ok, "waited"
+
+    @recorded(FLOW, budget=5)
+    def outer_flow(self) -> tuple:
+        return self.inner_flow()
+
+    @recorded(FLOW, on_deadline=BatchReport.aborted)
+    def batch_flow(self) -> BatchReport:
+        clamp_timeout(1000)
+        return BatchReport()
+
+    @recorded(FLOW, budget=0.5)
+    async def async_flow(self) -> tuple:
+        remaining = await asyncio.to_thread(clamp_timeout, 10000)
+        return remaining <= 500, "clamped in thread"
+
+
+def test_clamp_is_limited_by_remaining_budget():
+    """
+    Test checking that wait gets at most the remaining budget
+    """
+    deadline = Deadline(1)
+    assert deadline.clamp(100) == 100
+    assert 900 < deadline.clamp(5000) <= 1000
+    assert not deadline.expired
+
+
+def test_expired_deadline_refuses_further_waits():
+    """
+    Test checking that no wait starts once the budget is used up
+    """
+    deadline = Deadline(0)
+    assert deadline.expired
+    assert deadline.remaining() == 0.0
+    with pytest.raises(DeadlineExceeded, match="Deadline of 0 s exceeded"):
+        deadline.clamp(100)
+
+
+def test_clamp_timeout_uses_innermost_active_deadline():
+    """
+    Test checking that nested activation is undone when its block ends
+    """
+    assert clamp_timeout(5000) == 5000
+    outer = Deadline(10)
+    with outer.activate():
+        with Deadline(0.1).activate():
+            assert clamp_timeout(5000) <= 100
+        assert Deadline.current() is outer
+        assert clamp_timeout(5000) == 5000
+    assert Deadline.current() is None
+
+
+def test_nested_flow_shares_deadline_of_calling_flow():
+    """
+    Test checking that budget of nested flow is ignored inside another flow
+    """
+    flows = _Flows()
+    assert flows.inner_flow() == (True, "0.2")
+    assert flows.outer_flow() == (True, "5")
+
+
+def test_flow_fails_when_step_exhausts_budget():
+    """
+    Test checking that flow names the step which used up the budget
+    """
+    flows = _Flows()
+    started = time.monotonic()
+    ok, message = flows.waiting_flow()
+    assert time.monotonic() - started < 0.5
+    assert not ok
+    assert "deadline of 0.1 s exhausted by step _wait" in message
+
+
+def test_expired_flow_keeps_declared_result_type():
+    """
+    Test checking on_deadline result of flow given expired deadline
+    """
+    report = _Flows().batch_flow(deadline=Deadline(0))
+    assert isinstance(report, BatchReport)
+    assert not report
+    assert "Deadline of 0 s exceeded" in report.error
+
+
+def test_deadline_is_propagated_into_worker_thread():
+    """
+    Test checking that asyncio.to_thread keeps deadline of async flow
+    """
+    assert asyncio.run(_Flows().async_flow()) == (True, "clamped in thread")
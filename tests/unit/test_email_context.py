@@ -0,0 +1,142 @@
+"""
+Unit tests of lazy loading and validation of email contexts
+"""
+
+import json
+import os
+
+import pytest
+
+from helpers.attachments import Attachment, GeneratedAttachment
+from helpers.email_context import (
+    InvalidEmailContext,
+    iter_email_contexts,
+    load_first_email_context,
+    parse_email_context,
+)
+
+RECORD = {
+    "subject": "Just test",
+    "message": "Hello",
+    "attachment": "note.txt",
+    "receiver_email": "receiver@seznam.cz",
+}
+
+
+def _write_jsonl(path, *lines: str) -> str:
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return str(path)
+
+
+def test_relative_attachment_is_resolved_against_context_file(tmp_path):
+    """
+    Test checking that attachment path is relative to the file of the record
+    """
+    path = tmp_path / "contexts.json"
+    path.write_text(json.dumps(RECORD), encoding="utf-8")
+    context = load_first_email_context(str(path))
+    assert context is not None
+    assert context.as_tuple() == (
+        "Just test",
+        "Hello",
+        os.path.join(str(tmp_path), "note.txt"),
+        "receiver@seznam.cz",
+    )
+
+
+def test_jsonl_records_are_loaded_lazily(tmp_path):
+    """
+    Test checking that records before malformed line are yielded first
+    """
+    path = _write_jsonl(
+        tmp_path / "contexts.jsonl",
+        json.dumps(RECORD),
+        "",
+        json.dumps(dict(RECORD, subject="Second")),
+        "{not json",
+    )
+    contexts = iter_email_contexts(path)
+    assert next(contexts).subject == "Just test"
+    second = next(contexts)
+    assert second.subject == "Second"
+    assert second.source == f"{path}:3"
+    with pytest.raises(InvalidEmailContext, match=":4:"):
+        next(contexts)
+
+
+def test_invalid_records_are_skipped_on_request(tmp_path):
+    """
+    Test checking skip_invalid with malformed line and record missing a key
+    """
+    missing = dict(RECORD)
+    del missing["receiver_email"]
+    path = _write_jsonl(
+        tmp_path / "contexts.jsonl",
+        "{not json",
+        json.dumps(missing),
+        json.dumps(RECORD),
+    )
+    subjects = [context.subject for context in iter_email_contexts(path, True)]
+    assert subjects == ["Just test"]
+    assert load_first_email_context(path) is None
+
+
+def test_directory_is_read_in_file_name_order(tmp_path):
+    """
+    Test checking that only .json and .jsonl files of directory are read
+    """
+    (tmp_path / "b.json").write_text(
+        json.dumps([dict(RECORD, subject="B1"), dict(RECORD, subject="B2")]),
+        encoding="utf-8",
+    )
+    _write_jsonl(tmp_path / "a.jsonl", json.dumps(dict(RECORD, subject="A")))
+    (tmp_path / "c.txt").write_text(json.dumps(RECORD), encoding="utf-8")
+    contexts = list(iter_email_contexts(str(tmp_path)))
+    assert [context.subject for context in contexts] == ["A", "B1", "B2"]
+    assert contexts[2].source.endswith("b.json[1]")
+
+
+@pytest.mark.parametrize(
+    "record, message",
+    [
+        (["not", "object"], "has to be JSON object"),
+        ({"subject": "Just test"}, "missing key 'message'"),
+        (dict(RECORD, subject=1), "key 'subject' has to be str"),
+        (dict(RECORD, attachment=1), "key 'attachment' has to be str or dict"),
+        (dict(RECORD, attachment={"name": "note.txt"}), "needs 'generate'"),
+        (dict(RECORD, attachment={"generate": {"size": -1}}), "non-negative int"),
+    ],
+)
+def test_schema_violation_names_source_and_key(record, message):
+    """
+    Test checking error message of records not matching SCHEMA
+    """
+    with pytest.raises(InvalidEmailContext, match=message) as error:
+        parse_email_context(record, "/base", "contexts.json[0]")
+    assert str(error.value).startswith("contexts.json[0]: ")
+
+
+def test_attachment_object_is_parsed():
+    """
+    Test checking in-memory and generated attachment of record
+    """
+    inline = parse_email_context(
+        dict(RECORD, attachment={"name": "note.txt", "content": "text"}), "/base"
+    )
+    assert isinstance(inline.attachment, Attachment)
+    assert inline.attachment.content == b"text"
+    generated = parse_email_context(
+        dict(RECORD, attachment={"generate": {"name": "big.bin", "size": 10}}),
+        "/base",
+    )
+    assert isinstance(generated.attachment, GeneratedAttachment)
+    assert generated.attachment.size == 10
+
+
+def test_missing_file_is_reported():
+    """
+    Test checking missing context file
+    """
+    with pytest.raises(OSError):
+        list(iter_email_contexts("/nonexistent/contexts.json"))
+    assert load_first_email_context("/nonexistent/contexts.json") is None
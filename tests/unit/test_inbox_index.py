@@ -0,0 +1,81 @@
+"""
+Unit tests of InboxIndex, subjects have to be matched as whole words
+"""
+
+from helpers.inbox_index import InboxIndex, subject_pattern
+
+
+def _index(*texts: str) -> InboxIndex:
+    return InboxIndex([{"text": text, "senders": []} for text in texts])
+
+
+def test_prefix_subject_does_not_match_longer_subject():
+    """
+    Test checking that "Load test 1" is not matched by "Load test 10" message
+    """
+    index = _index(
+        "sender@seznam.cz\nLoad test 10\nbody", "sender@seznam.cz\nLoad test 1\nbody"
+    )
+    entry = index.match("Load test 1", "sender@seznam.cz")
+    assert entry is not None
+    assert entry.text.endswith("Load test 1\nbody")
+    assert index.occurrence("Load test 1", entry) == 0
+
+
+def test_longer_subject_stays_available_after_prefix_match():
+    """
+    Test checking that matching of shorter subject does not use up longer one
+    """
+    index = _index("Load test 10", "Load test 1")
+    assert index.match("Load test 1", "sender@seznam.cz") is not None
+    entry = index.match("Load test 10", "sender@seznam.cz")
+    assert entry is not None
+    assert entry.text == "Load test 10"
+    assert index.match("Load test 1", "sender@seznam.cz") is None
+
+
+def test_subject_is_matched_between_punctuation_and_diacritics():
+    """
+    Test checking word boundaries around subject
+    """
+    pattern = subject_pattern("Test")
+    assert pattern.search("Re: Test, body")
+    assert pattern.search("Test")
+    assert not pattern.search("Testování")
+    assert not pattern.search("ÚTest")
+
+
+def test_message_with_visible_sender_is_preferred():
+    """
+    Test checking that message from expected sender is used first
+    """
+    index = InboxIndex(
+        [
+            {"text": "Report", "senders": ["other@seznam.cz"]},
+            {"text": "Report", "senders": ["sender@seznam.cz"]},
+        ]
+    )
+    entry = index.match("Report", "sender@seznam.cz")
+    assert entry is not None
+    assert entry.senders == ["sender@seznam.cz"]
+    assert index.occurrence("Report", entry) == 1
+
+
+def test_messages_listed_before_sending_are_not_matched():
+    """
+    Test checking that the oldest known messages are skipped
+    """
+    index = _index("sender@seznam.cz Report", "sender@seznam.cz Report")
+    assert index.count("Report", "sender@seznam.cz") == 2
+    assert index.match("Report", "sender@seznam.cz", known=2) is None
+    assert index.match("Report", "sender@seznam.cz", known=1) is not None
+    assert index.match("Report", "sender@seznam.cz", known=1) is None
+
+
+def test_sender_is_required_only_when_addresses_are_listed():
+    """
+    Test checking subject only matching for list showing display names
+    """
+    assert _index("Jan Novák Report").match("Report", "sender@seznam.cz")
+    index = _index("other@seznam.cz Report", "Jan Novák Report")
+    assert index.match("Report", "sender@seznam.cz") is None
@@ -0,0 +1,34 @@
+"""
+Unit tests of instrumentation helpers, percentile uses nearest-rank method
+"""
+
+import pytest
+
+from helpers.instrumentation import percentile
+
+
+@pytest.mark.parametrize(
+    "fraction, expected",
+    [(0.0, 1), (0.2, 1), (0.21, 2), (0.5, 3), (0.6, 3), (0.95, 5), (1.0, 5)],
+)
+def test_percentile_is_nearest_rank(fraction, expected):
+    """
+    Test checking that percentile rounds the rank up, never half to even
+    """
+    assert percentile([5, 3, 1, 4, 2], fraction) == expected
+
+
+def test_percentile_of_exact_rank_is_not_shifted_by_float_error():
+    """
+    Test checking that 0.07 * 100 is rank 7, not 8
+    """
+    assert percentile(list(range(1, 101)), 0.07) == 7
+    assert percentile(list(range(1, 101)), 0.95) == 95
+
+
+def test_percentile_of_no_values_is_zero():
+    """
+    Test checking percentile of empty values
+    """
+    assert percentile([], 0.95) == 0.0
+    assert percentile([0.25], 0.5) == 0.25
@@ -0,0 +1,86 @@
+"""
+Unit tests of SessionCache storing authenticated sessions on disk
+"""
+
+import json
+import os
+import time
+
+import pytest
+
+from helpers.session_cache import SessionCache
+
+STATE = {
+    "cookies": [{"name": "ds", "value": "token", "expires": -1}],
+    "origins": [
+        {
+            "origin": "https://email.seznam.cz",
+            "localStorage": [{"name": "account", "value": "1"}],
+        }
+    ],
+}
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return SessionCache(str(tmp_path), max_age=60)
+
+
+def _store(tmp_path, name: str, content) -> None:
+    with open(
+        os.path.join(str(tmp_path), f"{name}.json"), "w", encoding="utf-8"
+    ) as file:
+        file.write(content if isinstance(content, str) else json.dumps(content))
+
+
+def test_saved_session_is_loaded_with_local_storage(cache, tmp_path):
+    """
+    Test checking that whole storage_state is stored under sanitized name
+    """
+    cache.save("user@seznam.cz/1", STATE)
+    assert os.listdir(str(tmp_path)) == ["user_seznam.cz_1.json"]
+    assert cache.load("user@seznam.cz/1") == STATE
+    assert cache.load("other") is None
+
+
+def test_session_older_than_max_age_is_removed(cache, tmp_path):
+    """
+    Test checking expiry of stored session by max_age
+    """
+    _store(tmp_path, "user", {"saved_at": time.time() - 61, "storage_state": STATE})
+    assert cache.load("user") is None
+    assert os.listdir(str(tmp_path)) == []
+
+
+@pytest.mark.parametrize(
+    "cookies",
+    [[], [{"name": "ds", "value": "token", "expires": time.time() - 1}]],
+)
+def test_session_without_valid_cookie_is_removed(cache, tmp_path, cookies):
+    """
+    Test checking that session with missing or expired cookies is not used
+    """
+    cache.save("user", dict(STATE, cookies=cookies))
+    assert cache.load("user") is None
+    assert os.listdir(str(tmp_path)) == []
+
+
+@pytest.mark.parametrize(
+    "content", ["{damaged", {"storage_state": STATE}, {"saved_at": "now"}]
+)
+def test_damaged_session_is_ignored(cache, tmp_path, content):
+    """
+    Test checking that damaged session file is treated as missing session
+    """
+    _store(tmp_path, "user", content)
+    assert cache.load("user") is None
+
+
+def test_invalidated_session_is_not_loaded(cache):
+    """
+    Test checking invalidation of stored and missing session
+    """
+    cache.save("user", STATE)
+    cache.invalidate("user")
+    cache.invalidate("user")
+    assert cache.load("user") is None
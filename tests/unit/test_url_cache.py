@@ -0,0 +1,69 @@
+"""
+Unit tests of UrlCache storing resolved navigation targets on disk
+"""
+
+import json
+import os
+import time
+
+import pytest
+
+from helpers.url_cache import UrlCache
+
+LOGIN_URL = "https://login.szn.cz/"
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "cache" / "urls.json")
+
+
+def _write(path: str, content: str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as file:
+        file.write(content)
+
+
+def test_stored_url_is_shared_through_file(path):
+    """
+    Test checking that URL put by one cache is read by another one
+    """
+    UrlCache(path).put("login_page", LOGIN_URL)
+    cache = UrlCache(path)
+    assert cache.get("login_page") == LOGIN_URL
+    assert cache.get("inbox") is None
+
+
+def test_url_older_than_max_age_is_not_returned(path):
+    """
+    Test checking expiry of stored URL by max_age
+    """
+    entry = {"url": LOGIN_URL, "saved_at": time.time() - 61}
+    _write(path, json.dumps({"login_page": entry}))
+    assert UrlCache(path, max_age=60).get("login_page") is None
+    assert UrlCache(path, max_age=120).get("login_page") == LOGIN_URL
+
+
+def test_invalidated_url_is_removed_from_file(path):
+    """
+    Test checking that invalidation is persisted
+    """
+    cache = UrlCache(path)
+    cache.put("login_page", LOGIN_URL)
+    cache.invalidate("login_page")
+    cache.invalidate("login_page")
+    assert UrlCache(path).get("login_page") is None
+
+
+@pytest.mark.parametrize(
+    "content", ["{damaged", "[]", '{"login_page": "https://login.szn.cz/"}']
+)
+def test_damaged_cache_file_is_ignored(path, content):
+    """
+    Test checking that damaged cache behaves as empty cache and can be rewritten
+    """
+    _write(path, content)
+    cache = UrlCache(path)
+    assert cache.get("login_page") is None
+    cache.put("login_page", LOGIN_URL)
+    assert UrlCache(path).get("login_page") == LOGIN_URL
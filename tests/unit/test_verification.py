@@ -0,0 +1,132 @@
+"""
+Unit tests of ImapVerificationBackend running against local ImapStandIn
+"""
+
+import time
+
+import pytest
+
+from helpers.attachments import Attachment
+from helpers.deadline import Deadline
+from helpers.imap_stand_in import ImapStandIn, build_message
+from helpers.verification import ImapVerificationBackend, VerificationBackend
+
+SENDER = "sender@seznam.cz"
+ATTACHMENT = Attachment("note.txt", b"attached content")
+
+
+@pytest.fixture
+def stand_in():
+    with ImapStandIn() as server:
+        yield server
+
+
+@pytest.fixture
+def backend(stand_in):
+    verification = ImapVerificationBackend(
+        stand_in.host, stand_in.port, use_ssl=False, timeout=0.5, poll_interval=0.1
+    )
+    verification.use_credentials("user", "password")
+    yield verification
+    verification.close()
+
+
+def _deliver(stand_in: ImapStandIn, subject: str, message: str = "Hello") -> None:
+    stand_in.add_message(
+        build_message(
+            SENDER, SENDER, subject, message, (ATTACHMENT.name, ATTACHMENT.content)
+        )
+    )
+
+
+def test_interface_can_not_be_instantiated():
+    """
+    Test checking that backend has to implement check_received_email
+    """
+    with pytest.raises(TypeError):
+        VerificationBackend()
+
+
+def test_received_email_is_valid(stand_in, backend):
+    """
+    Test checking that delivered email passes all checks
+    """
+    _deliver(stand_in, "Report")
+    assert backend.check_received_email(SENDER, "Report", "Hello", ATTACHMENT) == (
+        True,
+        "Received email is valid",
+    )
+
+
+def test_non_ascii_subject_is_found(stand_in, backend):
+    """
+    Test checking search of subject with diacritics
+    """
+    _deliver(stand_in, "Příliš žluťoučký kůň")
+    result, message = backend.check_received_email(
+        SENDER, "Příliš žluťoučký kůň", "Hello", ATTACHMENT
+    )
+    assert result, message
+
+
+def test_invalid_message_and_attachment_are_reported(stand_in, backend):
+    """
+    Test checking that different body and attachment content fail the check
+    """
+    _deliver(stand_in, "Body", message="Other text")
+    assert backend.check_received_email(SENDER, "Body", "Hello", ATTACHMENT) == (
+        False,
+        "Invalid email message context",
+    )
+    _deliver(stand_in, "File")
+    changed = Attachment(ATTACHMENT.name, b"changed content")
+    assert backend.check_received_email(SENDER, "File", "Hello", changed) == (
+        False,
+        "Invalid email attachment file",
+    )
+
+
+def test_email_is_verified_only_once(stand_in, backend):
+    """
+    Test checking that already verified email does not satisfy next check
+    """
+    _deliver(stand_in, "Once")
+    assert backend.check_received_email(SENDER, "Once", "Hello", ATTACHMENT)[0]
+    assert backend.check_received_email(SENDER, "Once", "Hello", ATTACHMENT) == (
+        False,
+        "Email was not received",
+    )
+
+
+def test_email_received_before_baseline_is_not_accepted(stand_in, backend):
+    """
+    Test checking that older email with the same subject does not satisfy the check
+    """
+    _deliver(stand_in, "Just test", message="Yesterday")
+    backend.record_baseline(SENDER, "Just test")
+    assert backend.check_received_email(SENDER, "Just test", "Hello", ATTACHMENT) == (
+        False,
+        "Email was not received",
+    )
+    backend.record_baseline(SENDER, "Just test")
+    _deliver(stand_in, "Just test")
+    result, message = backend.check_received_email(
+        SENDER, "Just test", "Hello", ATTACHMENT
+    )
+    assert result, message
+
+
+def test_waiting_is_limited_by_flow_deadline(stand_in):
+    """
+    Test checking that backend does not wait longer than remaining budget of the flow
+    """
+    backend = ImapVerificationBackend(
+        stand_in.host, stand_in.port, use_ssl=False, timeout=30, poll_interval=0.1
+    )
+    backend.use_credentials("user", "password")
+    started = time.monotonic()
+    with Deadline(0.3).activate():
+        result, _ = backend.check_received_email(SENDER, "Late", "Hello", ATTACHMENT)
+    backend.close()
+    assert not result
+    assert time.monotonic() - started < 5